@@ -1,14 +1,25 @@
-from math import sqrt
 import tkinter as tk  # Gui
-from tkinter import ttk  # Gui
+from collections import deque
+from tkinter import filedialog, ttk  # Gui
 import pygame  # Main Window
 import clipboard  # Copy and Paste
 from tktooltip import ToolTip  # Tool tips
-import colorsys as colors
+import numpy as np  # Pixel buffers
+from pathfinder.grid import EMPTY, PATH, Grid
+from pathfinder.cache import PathCache
+from pathfinder.dstar import DStarLite
+from pathfinder.flowfield import FlowField
+from pathfinder import gridfile
+from pathfinder.heuristics import get_heuristic
+from pathfinder.hpa import HierarchicalMap
+from pathfinder.landmarks import Landmarks
+from pathfinder.search import ALGORITHMS, CLOSED, path_length
+from pathfinder.tasks import BackgroundSearch
 
 DYNAMIC_WEIGHT = False
 OPTIMALITY_BOUND = 10
 METHOD = "Manhattan"
+ALGORITHM = "A*"
 
 """
 A great help from:
@@ -23,6 +34,9 @@ SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 800
 FPS = 120  # Frames per second
 VISUALIZE = True
+VISUAL_FPS = 30  # Batches of search events shown per second
+EVENTS_PER_FRAME = 300  # Search events shown in each of those frames
+SOLUTION_MS = 400  # How long each of ARA*'s paths is shown before the next
 
 # Define colors
 WHITE = (255, 255, 255)
@@ -34,7 +48,6 @@ FONT_ALT = (90, 160, 90)
 
 ROWS = 50
 COLS = 50
-SPACE = int(0)  # Space between tiles
 # ----- PYGAME --------------------------- #
 pygame.init()  # Start up pygame
 screen = pygame.display.set_mode(
@@ -66,6 +79,24 @@ def drawText(text, font, color, x, y, align="c"):
     screen.blit(img, rect)
 
 
+def hsv_to_rgb(h, s, v):
+    """
+    colorsys.hsv_to_rgb for a NumPy array of hues, as rows of 0-255 RGB.
+    Usage: hsv_to_rgb(hues, 0.84, 1)
+    """
+    h = np.asarray(h, dtype=np.float64) % 1.0
+    i = (h * 6).astype(np.int64)  # Sector of the color wheel
+    f = h * 6 - i
+    p = np.full_like(h, v * (1 - s))
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1 - f))
+    v = np.full_like(h, v)
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=-1) * 255
+
+
 # ----- CLASSES -------------------------- #
 
 
@@ -77,356 +108,393 @@ class GameState:
 
     def __init__(self):
 
-        self.grid = [
-            [0 for col in range(COLS)] for row in range(ROWS)
-        ]  # Create empty grid
+        self.cells = Grid(COLS, ROWS)  # Cell values, one byte each
+        self.hierarchy = None  # Built on the first HPA* search
+        self.planner = None  # Kept between D* Lite searches
+        self.cache = PathCache(self.cells)  # Results of earlier searches
+        self.flow = None  # Flow field towards the destination
+        self.landmarks = None  # Built on the first ALT search
+        self.showField = False  # Draw the flow field behind the path
+        self.visual = False
+        self.job = None  # Search running in the background
+        self.events = deque()  # Its events, see show_events()
+        self.solutions = deque()  # ARA*'s paths so far, see follow_search()
+        self.parents = {}
+        self.nextFrame = 0  # Ticks when the next batch of events is shown
+        self.nextSolution = 0  # Ticks when the next of ARA*'s paths is shown
+
+        # Live indexes of the cells that matter, kept by set_cell(), so
+        # input handling never has to scan the grid
+        self.start = None  # (x, y) of the start, or None
+        self.dest = None
+        self.pathCells = set()  # Cell ids showing the path
+        self.walls = set()  # Cell ids of walls
 
         self.phase = "START"
 
-        # Fit whichever value is bigger to screen
-        if ROWS > COLS:
-            self.size = SCREEN_WIDTH / ROWS
-        else:
-            self.size = SCREEN_HEIGHT / COLS
-
-        self.size = int(self.size - SPACE)  # Round and account for spacing
-
         self.clicked = False
         self.square = 0
         self.pressed = False
 
-        for y in range(COLS):
-            for x in range(ROWS):
-                # pos= position---margin---offset------
-                posx = x * self.size + x * SPACE + 5  # Position X
-                posy = y * self.size + y * SPACE + 5  # Position Y
-                tile = Tile((posx, posy), (x, y), self.size, self)
-                self.grid[y][x] = tile
+        self.renderer = GridRenderer(self, (5, 5))
 
     def render(self):
         """
-        Draws screen and handles inputs
+        Handles inputs and draws the cells that changed.
+        Returns the screen rects to pass to pygame.display.update().
         """
-        self.flatGrid = self.flatten(self.grid)
-        self.hasPath = "@" in self.flatGrid
         self.mousePos = pygame.mouse.get_pos()
         self.mouseClicked = pygame.mouse.get_pressed()
 
-        if self.phase == "BUSY":
-            return
-
-        for row in self.grid:
-            for tile in row:
-                tile.update()  # Update tile
-
-                if tile.get_val() == "O":
-                    self.start = tile.get_coords()
-                if tile.get_val() == "X":
-                    self.dest = tile.get_coords()
+        if self.phase != "BUSY":
+            if not self.mouseClicked[0]:
+                self.clicked = False
+            if self.mouseClicked[0] or self.mouseClicked[2]:
+                tile = self.tile_at(self.mousePos)
+                if tile is not None:
+                    tile.update()  # Only the tile under the mouse
+
+        return self.renderer.draw()
+
+    def tile_at(self, pos):
+        """The tile under a screen position, or None"""
+        x, y = self.renderer.cell_at(pos)
+        if self.cells.in_bounds(x, y):
+            return Tile((x, y), self)  # Tiles are only views onto self.cells
+        return None
+
+    def index_cells(self):
+        """Rebuilds the cell indexes from the grid, after loading one"""
+        cells = self.cells
+        self.start = cells.find("O")
+        self.dest = cells.find("X")
+        self.pathCells = set(cells.indexes("@"))
+        self.walls = set(cells.indexes("#"))
+
+    @property
+    def wall_count(self):
+        return len(self.walls)
+
+    def set_cell(self, x, y, value):
+        """
+        Changes one cell, keeping the indexes up to date.
 
-                tile.draw()
+        Usage: set_cell(3, 4, "#")
+        """
+        old = self.cells.get(x, y)
+        if old == value:
+            return
+        i = self.cells.index(x, y)
+        self.cells.set(x, y, value)
+        if old == "O":
+            self.start = None
+        elif old == "X":
+            self.dest = None
+        elif old == "@":
+            self.pathCells.discard(i)
+        elif old == "#":
+            self.walls.discard(i)
+
+        if value == "O":
+            self.start = (x, y)
+        elif value == "X":
+            self.dest = (x, y)
+        elif value == "@":
+            self.pathCells.add(i)
+        elif value == "#":
+            self.walls.add(i)
+
+        if old == "#" or value == "#":
+            self.cell_changed(x, y)
+
+    def set_grid(self, grid):
+        """Starts over on another grid, of any size"""
+        self.cells = grid
+        self.index_cells()
+        self.hierarchy = None
+        self.planner = None
+        self.flow = None
+        self.landmarks = None
+        self.showField = False
+        self.cache = PathCache(grid)
+        self.renderer = GridRenderer(self, (5, 5))
+        screen.fill(BLACK)  # A differently shaped grid leaves a border
+        pygame.display.update()
+        self.remove_all_of("@")  # Incase it contains the path
+        if self.start is None:
+            self.phase = "START"
+        elif self.dest is None:
+            self.phase = "DEST"
+        else:
+            self.phase = "WALLS"
 
     def pathfinder(self):
+        if self.job is not None:
+            return  # One search at a time
         self.remove_all_of("@")  # Clear path that was there
-        temp = self.phase
         # Verify a start and end has been chosen
-        try:
-            if len(self.start) > 0 and len(self.dest) > 0:
-                pass
-        except AttributeError:
+        if self.start is None or self.dest is None:
             gui.log("")
             gui.log("have not been chosen.")
             gui.log("Start and end points")
             return
 
-        self.phase = "BUSY"
-        path = self.A_Star(self.start, self.dest)  # Returns a path to destination
-        self.phase = temp
-        self.visual = False
-        if path == "Failure":
-            return  # If failed, stop
-
-        self.remove_all_of("@")  # Clear path if was visualized
-        self.apply_path_to_grid(path, "@")  # Show path on screen
-
-    def flatten(self, array):
-        """Flatten a 2D array"""
-        return [item.get_val() for row in array for item in row]
+        rejected = self.cache.reject(self.start, self.dest, self.method(), ALGORITHM)
+        if rejected is not None:
+            self.finish_search(rejected)  # Walled off, no need to search
+        elif ALGORITHM in ALGORITHMS:
+            self.start_search(self.start, self.dest)
+        else:
+            self.finish_search(self.plan(self.start, self.dest))
 
     def save_to_clip(self):
         """
-        Turns a grid to a string and copies it to the clipboard
+        Turns a grid to text, one line per row, and copies it to the clipboard
         """
-        code = self.grid  # Copy
-        code = self.flatten(code)  # Flatten
-        code = "".join(code)  # Turn to string
-        code.replace(" ", "")  # Remove white space
-        clipboard.copy(code)  # Copy to clipboard
+        clipboard.copy(self.cells.to_text())  # Copy to clipboard
 
     def load_from_clip(self):
         """
-        Load a grid from the clipboard.
+        Load a grid of any size from the clipboard.
         """
         code = clipboard.paste()
-        size = ROWS * COLS
-        if "X" in code and "O" in code:
-            self.phase = "WALLS"
-        else:
+        if not ("X" in code and "O" in code):
             return
-        if len(code) == size:
-            for i in range(len(code)):
-                x = i % ROWS  # Solve for x
-                y = int(i / ROWS)  # and y
-                self.grid[y][x].set_val(code[i])
-        self.remove_all_of("@")  # Incase it contains the path
+        try:
+            grid = Grid.from_text(code)
+        except ValueError as error:
+            gui.log(str(error))
+            gui.log("Clipboard is not a grid:")
+            return
+        self.set_grid(grid)
+
+    def save_to_file(self):
+        """
+        Saves the grid as a compact binary file, see pathfinder.gridfile
+        """
+        path = filedialog.asksaveasfilename(
+            defaultextension=".grid", filetypes=[("Grid files", "*.grid")]
+        )
+        if path:
+            gridfile.save(self.cells, path, gridfile.RLE)
+
+    def load_from_file(self):
+        """
+        Loads a grid file of any size
+        """
+        path = filedialog.askopenfilename(filetypes=[("Grid files", "*.grid")])
+        if not path:
+            return
+        try:
+            grid = gridfile.load(path)
+        except (OSError, ValueError) as error:
+            gui.log(str(error))
+            gui.log("Could not load grid file:")
+            return
+        self.set_grid(grid)
 
     def heuristic(self, start, end):
         """
         Usage: Tuple inputs for start and end coords.
-        Calculate distance from point to point.
-        Used to calculate "H" in A* algorithm.
-
-        METHODS: ---------------------------------
-
-        Manhattan Method:
-            h= |xstart - xdestination| + |ystart - ydestination|
-
-        Euclidean Method:
-            h= sqrt of ( xstart - xdestination )^2+( ystart - ydestination )^2
-
-        Chebyshev Method:
-            D = 1 and D2 = 1:
-                dx = abs(node.x - goal.x)
-                dy = abs(node.y - goal.y)
-                h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
-
-        Octile Method:
-            D = 1 and D2 = sqrt(2):
-                dx = abs(node.x - goal.x)
-                dy = abs(node.y - goal.y)
-                h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
-        WEIGHTING: -------------------------------
-        USES:
-
-        Weighted A* (pwXD)
-            [h > g]: f = g+h; [h ≤ g]: f = (g+(2w-1)h)/w
-        """
-        x_start, y_start = start
-        x_end, y_end = end
-
-        if METHOD == "Manhattan":
-            h = abs(x_start - x_end) + abs(y_start - y_end)
-        elif METHOD == "Euclidean":
-            h = sqrt((x_start - x_end) ** 2 + (y_start - y_end) ** 2)
-        elif METHOD == "Chebyshev":
-            dx = abs(x_start - x_end)
-            dy = abs(y_start - y_end)
-            D = 1
-            D2 = 1
-            h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
-        elif METHOD == "Octile Dist":
-            dx = abs(x_start - x_end)
-            dy = abs(y_start - y_end)
-            D = 1
-            D2 = sqrt(2)
-            h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
-            # h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
-        elif METHOD == "Dijkstra":
-            h = 0
-        else:
-            gui.log("")
-            gui.log("(none selected?)")
-            gui.log("Method error")
+        Calculate distance from point to point with the selected METHOD.
+        """
+        return get_heuristic(self.method())(start, end)
+
+    def heuristic_field(self):
+        """
+        h for every cell towards the destination, indexed by cell id.
+        Cached, so drawing the path every frame does not recompute it.
+        """
+        return get_heuristic(self.method()).field(
+            self.cells.width, self.cells.height, self.dest
+        )
 
-        return h
+    def method(self):
+        """
+        The selected METHOD, as searches take it. ALT's landmarks are built
+        when first needed, and again once walls have changed.
+        """
+        if METHOD != "ALT":
+            return METHOD
+        if self.landmarks is None or not self.landmarks.current:
+            self.landmarks = Landmarks.build(self.cells)
+        return self.landmarks
 
-    def calcCost(self, start, end):
-        sx, sy = start
-        ex, ey = end
-        if (sx == ex) or (sy == ey):
-            return 1.0
-        else:
-            return sqrt(2)
-
-    def findNeighbors(self, node):
-        def tryAdd(nx, ny):
-            if self.grid[ny][nx].get_val() != "#":  # If it is not a wall,
-                neighbors.append((nx, ny))  # add to neighbors list
-
-        neighbors = []
-        x, y = node
-        if not x == 0:  # Account for left edge
-            tryAdd(x - 1, y)  # Left
-            # DIAGONALS
-            if not y == 0:  # Account for top edge
-                tryAdd(x - 1, y - 1)  # Top
-            if not y == 49:  # Account for bottom edge
-                tryAdd(x - 1, y + 1)  # Bottom
-        if not x == 49:  # Account for right edge
-            tryAdd(x + 1, y)  # Right
-            # DIAGONALS
-            if not y == 0:  # Account for top edge
-                tryAdd(x + 1, y - 1)  # Top
-            if not y == 49:  # Account for bottom edge
-                tryAdd(x + 1, y + 1)  # Bottom
-        if not y == 0:  # Account for top edge
-            tryAdd(x, y - 1)  # Top
-        if not y == 49:  # Account for bottom edge
-            tryAdd(x, y + 1)  # Bottom
-
-        return neighbors
-
-    def reconstruct_path(self, cameFrom, current):
-        """
-        Reconstructs the path to the current node.
-
-        Requires a dict that contains the node before it on the fastest path.
-        """
-        totalPath = [current]
-        while current in cameFrom.keys():
-            current = cameFrom[current]
-            totalPath.insert(0, current)
-        return totalPath
-
-    def A_Star(self, start, dest):
-        """
-        The A* pathfinding algorithm.
-
-        Takes a starting point and ending point and calculates the fastest path between them
-        """
-
-        ## heuristic() is used as h() ##
-        ## Inspired by https://en.wikipedia.org/wiki/A*_search_algorithm
-        # Tuples unpacked to coordinates
-        startX, startY = start
-        # The set of discovered nodes that may need to be (re-)expanded.
-        # Initially, only the start node is known.
-        # This is usually implemented as a min-heap or priority queue rather than a hash-set.
-        openSet = [start]
-        openSetFScores = [self.heuristic(start, dest)]
-
-        # For node n, cameFrom[n] is the node immediately preceding it
-        # on the cheapest path from start to n currently known.
-        cameFrom = {}
-
-        # The set of discovered nodes
-        closedSet = [start]
-
-        # For node n, gScore[n] is the cost of the cheapest path from
-        # start to n currently known.
-        gScore = [[99999 for col in range(COLS)] for row in range(ROWS)]
-        gScore[startY][startX] = 0
-
-        # For node n, fScore[n] := gScore[n] + h(n). fScore[n] represents our
-        # current best guess as to how short a path from start to finish can
-        # be if it goes through n.
-        fScore = [[99999 for col in range(COLS)] for row in range(ROWS)]
-        fScore[startY][startX] = self.heuristic(start, dest)
-
-        # To record the loop cycles
-        cycles = 0
-
-        if VISUALIZE:
-            self.visual = True
-        else:
+    def start_search(self, start, dest):
+        """
+        Starts a search with the selected ALGORITHM in a worker thread, so
+        the window keeps its frame rate. follow_search() picks it up.
+        """
+        self.visual = bool(VISUALIZE)
+        query = (
+            start,
+            dest,
+            self.method(),
+            DYNAMIC_WEIGHT,
+            ALGORITHM,
+            OPTIMALITY_BOUND,
+        )
+        if not self.visual:
+            result = self.cache.lookup(*query)
+            if result is not None:
+                self.finish_search(result, cached=True)
+                return
+
+        self.events.clear()
+        self.solutions.clear()
+        self.parents = {}
+        options = {"events": self.events if self.visual else None}
+        if ALGORITHM == "ARA*":
+            # Called from the worker thread, so only queued here
+            options["on_solution"] = self.solutions.append
+        search = self.cache.search(*query, **options)
+        self.lastPhase = self.phase
+        self.phase = "BUSY"
+        self.job = BackgroundSearch(search).start()
+
+    def follow_search(self):
+        """
+        Called every frame. Shows the events of a search running in the
+        background a frame's worth at a time, then its result.
+        """
+        job = self.job
+        if job is None:
+            return
+        running = job.running  # Before showing, so no late events are missed
+
+        # ___----*** VISUALIZE ***----___ #
+        if self.visual:
+            now = pygame.time.get_ticks()
+            if now < self.nextFrame:
+                return
+            self.nextFrame = now + 1000 // VISUAL_FPS
+            self.show_events()
+            if self.events:
+                return  # Still catching up with the search
+
+        # ARA*'s paths as they improve, each shown for SOLUTION_MS
+        if self.solutions:
+            now = pygame.time.get_ticks()
+            if now < self.nextSolution:
+                return
+            self.nextSolution = now + SOLUTION_MS
+            self.show_solution(self.solutions.popleft())
+            return
+
+        if running:
+            return
+        self.job = None
+        self.phase = self.lastPhase
+        if job.search.cancelled:
+            self.remove_all_of("@")
             self.visual = False
+            gui.log("")
+            gui.log("")
+            gui.log("Search cancelled.")
+            return
+        self.finish_search(job.search.result)
 
-        oldtime = pygame.time.get_ticks()
-        while openSet:  # While not empty
-            # Find the node in the openSet with the lowest f value
-            lowest = 99999
-            i = 0  # Start at the end of the list
-            for node in openSet:  # Reversed means it reversed the set
-                temp_fScore = openSetFScores[i]
-                if temp_fScore < lowest:  # If it is the lowest value so far,
-                    current = node  # Set the current node to it
-                    lowest = temp_fScore
-                i += 1
-
-            if current == dest:
-                # We found the destination
-                path = self.reconstruct_path(cameFrom, current)
-
-                gui.log("")
-                gui.log(f"{pygame.time.get_ticks()-oldtime} ms, {cycles} cycles")
-                gui.log(f"Path is {self.get_length_of_path(path)} blocks long.")
-                return path  # Recreate path to destination
-
-            currentIDX = openSet.index(current)
-            openSet.remove(current)  # Remove current from open set
-            openSetFScores.pop(currentIDX)  # And remove its fScore value
-            # Go through all valid neighbors
-            for neighbor in self.findNeighbors(current):
-                if neighbor in closedSet:
-                    continue
-                closedSet.append(neighbor)
-
-                currentX, currentY = current
-                neighborX, neighborY = neighbor
-                if self.grid[neighborY][neighborX].get_val() == "#":
-                    continue  # if it is a wall, stop
-                # tempG is the distance from the start to the neighbor, through current node
-                tempG = gScore[currentY][currentX] + self.calcCost(current, neighbor)
-                if tempG < gScore[neighborY][neighborX]:
-                    # This is the best path so far to the neighbor
-                    # Record values
-                    cameFrom[neighbor] = current
-                    gScore[neighborY][neighborX] = tempG
-                    if not DYNAMIC_WEIGHT:
-                        tempF = tempG + self.heuristic(neighbor, dest)
-                    else:
-                        """
-                        (A* pwXD)
-                        [h > g]: f = g+h;
-                        [h ≤ g]: f = (g+(2w-1)h)/w
-                        """
-                        tempH = self.heuristic(neighbor, dest)
-                        if tempH > tempG:
-                            tempF = tempG + tempH
-                        else:
-                            w = OPTIMALITY_BOUND
-                            tempF = (tempG + (2 * w - 1) * tempH) / w
-
-                    fScore[neighborY][neighborX] = tempF
-
-                    if not neighbor in openSet:
-                        openSet.append(neighbor)  # Add to set
-                        openSetFScores.append(tempF)  # and add value
-
-            cycles += 1
-            if cycles > ROWS * COLS * 10:
-                gui.log("")
-                gui.log("(blocked off?)")
-                gui.log("Path took too long.")
-
-                return "Failure"
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    global run
-                    run = False
-                    pygame.quit()
-                    raise SystemExit()
-
-            # ___----*** VISUALIZE ***----___ #
-            if self.visual == False:
-                continue
-
-            clock.tick(30)  # Render half speed
-
-            self.apply_path_to_grid(
-                self.reconstruct_path(cameFrom, current), "@"
-            )  # Show changes
-            self.render()
-
-            # --- PyGame Display --- #
-            pygame.display.update()
-            gui.update()
+    def show_events(self):
+        """
+        Shades the next EVENTS_PER_FRAME search events, and shows the path
+        to the last cell expanded, so drawing costs the same however fast
+        the search runs.
+        """
+        events = self.events
+        batch = [events.popleft() for _ in range(min(EVENTS_PER_FRAME, len(events)))]
+        if not batch:
+            return
+        self.renderer.mark(batch)
 
+        parents = self.parents
+        current = None
+        for kind, cell, parent in batch:
+            if kind == CLOSED:
+                current = cell
+            else:
+                parents[cell] = parent
+        if current is None:
+            return
+        path = []
+        # Bidirectional searches share one parent map, the limit stops loops
+        while current != -1 and len(path) <= len(parents):
+            path.append(self.cells.coords(current))
+            current = parents.get(current, -1)
+        self.clear_path()
+        self.apply_path_to_grid(path, "@")
+
+    def show_solution(self, result):
+        """Shows one of ARA*'s paths, and how far from the best it can be"""
+        self.clear_path()
+        self.apply_path_to_grid(result.path, "@")
+        gui.log(
+            f"Path {result.length} long, at most "
+            f"{result.stats.extra['bound']:.2f}x the best"
+        )
+
+    def cancel_search(self):
+        """Stops a search running in the background, or skips to its result"""
+        if self.job is not None:
+            self.job.cancel()
+            self.events.clear()
+            self.solutions.clear()
+
+    def plan(self, start, dest):
+        """
+        Runs one of the planners that keep their work between searches,
+        HPA*, D* Lite or Flow Field, and returns its SearchResult.
+        """
+        if ALGORITHM == "HPA*":
+            if self.hierarchy is None:
+                self.hierarchy = HierarchicalMap(self.cells)
+            return self.hierarchy.find_path(start, dest)
+        elif ALGORITHM == "D* Lite":
+            if self.planner is None or self.planner.dest != self.cells.index(*dest):
+                self.planner = DStarLite(self.cells, start, dest)
+            return self.planner.find_path(start)
+        else:
+            if (
+                self.flow is None
+                or not self.flow.current
+                or self.flow.dest != tuple(dest)
+            ):
+                self.flow = FlowField(self.cells, dest)
+            return self.flow.path_from(start)
+
+    def finish_search(self, result, cached=False):
+        """Logs the result of a search, and shows its path"""
+        self.remove_all_of("@")  # Clear path if was visualized
+        self.visual = False
         gui.log("")
-        gui.log("(blocked off?)")
-        gui.log("Path not found.")
-        return "Failure"
+        if not result.found:
+            gui.log("(blocked off?)")
+            gui.log(result.reason)
+            return
+
+        if cached:
+            gui.log(f"From cache, {self.cache.hits} hits so far")
+        elif "sweeps" in result.stats.extra:
+            extra = result.stats.extra
+            gui.log(f"{extra['build_ms']} ms field, {extra['sweeps']} sweeps")
+        elif "solutions" in result.stats.extra:
+            extra = result.stats.extra
+            gui.log(
+                f"{result.ms} ms, {result.cycles} cycles, {extra['solutions']} paths"
+            )
+        elif "iterations" in result.stats.extra:
+            extra = result.stats.extra
+            gui.log(
+                f"{result.ms} ms, {result.cycles} cycles, "
+                f"peak {extra['peak_nodes']} tiles"
+            )
+        elif "forward" in result.stats.extra:
+            extra = result.stats.extra
+            gui.log(f"{result.ms} ms, {extra['forward']}+{extra['backward']} cycles")
+        else:
+            gui.log(f"{result.ms} ms, {result.cycles} cycles")
+        gui.log(f"Path is {result.length} blocks long.")
+        self.apply_path_to_grid(result.path, "@")  # Show path on screen
+        self.showField = ALGORITHM == "Flow Field"
 
     def apply_path_to_grid(self, path, value):
         """
@@ -438,50 +506,63 @@ class GameState:
             return
         for node in path:
             x, y = node
-            if self.grid[y][x].get_val() != "X" and self.grid[y][x].get_val() != "O":
-                self.grid[y][x].set_val(value)
+            if node != self.start and node != self.dest:
+                self.set_cell(x, y, value)
+
+    def clear_path(self):
+        """Empties the cells showing the path, and only those"""
+        cells = self.cells.cells
+        for i in self.pathCells:
+            cells[i] = EMPTY
+        self.pathCells = set()
 
     def remove_all_of(self, value):
         """
-        Removes all instances of a value in the grid.
+        Removes all instances of a value in the grid, through the indexes
+        so only those cells are touched.
 
         Usage: remove_all_of("@")
         """
-        for row in self.grid:
-            for tile in row:
-                if tile.get_val() == value:
-                    tile.set_val(".")
+        if value == "@":
+            self.showField = False
+            self.renderer.clear_marks()
+            self.clear_path()
+        elif value == "#":
+            walls = self.walls
+            self.walls = set()
+            for i in walls:
+                x, y = self.cells.coords(i)
+                self.cells.set(x, y, ".")
+                self.cell_changed(x, y)
+        elif value == "O":
+            if self.start is not None:
+                self.set_cell(*self.start, ".")
+        elif value == "X":
+            if self.dest is not None:
+                self.set_cell(*self.dest, ".")
+
+    def cell_changed(self, x, y):
+        """Called after a cell becomes or stops being a wall"""
+        self.cache.cell_changed(x, y)
+        if self.hierarchy is not None:
+            self.hierarchy.cell_changed(x, y)
+        if self.planner is not None:
+            self.planner.cell_changed(x, y)
 
     def get_length_of_path(self, path):
-        length = 0
-        oldnode = path[0]
-        for node in path:
-            if node == path[0]:
-                continue
-            length += self.calcCost(oldnode, node)
-            oldnode = node
-
-        return round(length * 1000) / 1000  # Round to nearest 100
+        return path_length(path)
 
 
 class Tile:
-
-    BORDER_RADIUS = 2
-
-    def __init__(self, screenPos, gridPos, size, game):
+    def __init__(self, gridPos, game):
         self.game = game
 
-        self.xpos, self.ypos = screenPos
         self.gridx, self.gridy = gridPos
-        self.size = size
-        self.value = "."
-
-        self.square = pygame.rect.Rect(self.xpos, self.ypos, self.size, self.size)
 
     def update(self):
         """
-        Usage: tile.update((mouseClicked, mousePos), gamePhase, gridValues, hasPath, clicked)
-        Handles inputs to each square
+        Usage: game.tile_at(mousePos).update()
+        Handles inputs to the square under the mouse
 
             "." = Empty space
             "#" = Wall/Barrier
@@ -491,28 +572,26 @@ class Tile:
         """
         """
 
-                If a tile is clicked, check if it is open.
+                If the tile is clicked, check if it is open.
                     If it is open, check if we have already clicked last frame.
                         Place the corresponding square for each phase.
                     If we have already clicked last frame, check if we are placing a wall
                         Place the wall
         """
 
-        if (
-            self.square.collidepoint(self.game.mousePos) and self.game.mouseClicked[0]
-        ):  # If clicked
-            if self.game.hasPath:
+        if self.game.mouseClicked[0]:  # If clicked
+            if self.game.pathCells:
                 self.game.remove_all_of("@")
             if self.value != "X" and self.value != "O":  # And empty space
 
                 if not self.game.clicked:
-                    if not "O" in self.game.flatGrid:
+                    if self.game.start is None:
                         self.value = "O"
                         self.game.phase = "DEST"
                         gui.log("")
                         gui.log("")
                         gui.log("Click a tile as an end point.")
-                    elif not "X" in self.game.flatGrid:
+                    elif self.game.dest is None:
                         self.value = "X"
                         self.game.phase = "WALLS"
                         gui.log("")
@@ -523,42 +602,16 @@ class Tile:
                     self.value = "#"
 
                 self.game.clicked = True
-        elif self.square.collidepoint(self.game.mousePos) and self.game.mouseClicked[2]:
+        elif self.game.mouseClicked[2]:
             self.value = "."
 
-        if self.game.mouseClicked[0] == False:
-            self.game.clicked = False
+    @property
+    def value(self):
+        return self.game.cells.get(self.gridx, self.gridy)
 
-    def draw(self):
-        if self.value == ".":
-            color = DGREY
-        elif self.value == "#":
-            color = LGREY
-        elif self.value == "O":
-            color = (3, 252, 161)
-        elif self.value == "X":
-            color = (255, 33, 107)
-        elif self.value == "@":
-            dist = self.game.heuristic(self.get_coords(), self.game.dest)
-
-            if self.game.visual == True:
-                h = (dist) / 360
-                s = 0.84
-                v = 1
-                r, g, b = colors.hsv_to_rgb(h, s, v)
-                r *= 255
-                g *= 255
-                b *= 255
-                color = (r, g, b)
-            else:
-                color = (90, 150, 255)
-        # Render square
-        pygame.draw.rect(
-            screen,
-            color,
-            self.square,
-            border_radius=2 if self.value != "@" else 10,
-        )
+    @value.setter
+    def value(self, value):
+        self.game.set_cell(self.gridx, self.gridy, value)
 
     def set_val(self, value):
         self.value = value
@@ -570,6 +623,148 @@ class Tile:
         return (self.gridx, self.gridy)
 
 
+class GridRenderer:
+    """
+    Draws the grid straight from the cell array. Every cell is one pixel of
+    an offscreen image, which is scaled up to the window. Each frame only
+    the cells that changed since the last one are redrawn, so an idle frame
+    costs one comparison of the cells.
+
+    Usage: pygame.display.update(renderer.draw())
+    """
+
+    # Colors by cell code: empty, wall, start, destination, path
+    PALETTE = np.array(
+        [DGREY, LGREY, (3, 252, 161), (255, 33, 107), (90, 150, 255)], dtype=np.uint8
+    )
+    # Colors of empty cells a visualized search has opened, and closed
+    OPENED = 1
+    CLOSED = 2
+    MARKS = {OPENED: (70, 120, 100), CLOSED: (70, 85, 130)}
+    FEW = 32  # Up to this many changed cells get a rect each, more share one
+
+    def __init__(self, game, origin):
+        self.game = game
+        self.width = game.cells.width
+        self.height = game.cells.height
+        self.origin = origin
+
+        # Fit whichever side is longer to screen, in whole pixels if they fit
+        scale = min(SCREEN_WIDTH / self.width, SCREEN_HEIGHT / self.height)
+        self.scale = int(scale) if scale >= 1 else scale
+
+        self.image = pygame.Surface((self.width, self.height))
+        self.drawn = None  # Cells as last drawn
+        self.look = None  # Everything else the colors depend on
+        self.marks = bytearray(self.width * self.height)  # See mark()
+        self.marked = False  # Whether any mark is set
+        self.drawnMarks = bytes(self.marks)
+
+    def cell_at(self, pos):
+        """Grid coords under a screen position, may be out of bounds"""
+        return (
+            int((pos[0] - self.origin[0]) // self.scale),
+            int((pos[1] - self.origin[1]) // self.scale),
+        )
+
+    def mark(self, events):
+        """Shades the cells in a batch of search events, as (kind, cell, parent)"""
+        marks = self.marks
+        for kind, cell, _ in events:
+            marks[cell] = self.CLOSED if kind == CLOSED else self.OPENED
+        self.marked = self.marked or bool(events)
+
+    def clear_marks(self):
+        if self.marked:
+            self.marks[:] = bytes(len(self.marks))
+            self.marked = False
+
+    def draw(self):
+        """Redraws what changed, and returns the screen rects it covered"""
+        game = self.game
+        cells = game.cells.cells
+        look = (
+            game.visual and (METHOD, game.dest),
+            game.showField and game.flow.current and id(game.flow),
+        )
+        if look != self.look or self.drawn is None:
+            self.look = look
+            self.drawn = bytes(cells)
+            self.drawnMarks = bytes(self.marks)
+            return [self._draw_box(0, 0, self.width, self.height)]
+
+        if cells == self.drawn and self.marks == self.drawnMarks:
+            return []  # Idle frame
+
+        changed = np.flatnonzero(
+            (
+                np.frombuffer(cells, dtype=np.uint8)
+                != np.frombuffer(self.drawn, dtype=np.uint8)
+            )
+            | (
+                np.frombuffer(self.marks, dtype=np.uint8)
+                != np.frombuffer(self.drawnMarks, dtype=np.uint8)
+            )
+        )
+        self.drawn = bytes(cells)
+        self.drawnMarks = bytes(self.marks)
+        xs = changed % self.width
+        ys = changed // self.width
+        if len(changed) <= self.FEW:
+            boxes = [(x, y, x + 1, y + 1) for x, y in zip(xs.tolist(), ys.tolist())]
+        else:
+            boxes = [
+                (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+            ]
+        return [self._draw_box(*box) for box in boxes]
+
+    def _draw_box(self, left, top, right, bottom):
+        """Recolors cells in a box, right and bottom exclusive, and blits them"""
+        game = self.game
+        shape = (self.height, self.width)
+        codes = np.frombuffer(game.cells.cells, dtype=np.uint8).reshape(shape)
+        codes = codes[top:bottom, left:right]
+        rgb = self.PALETTE[codes]
+
+        marks = np.frombuffer(self.marks, dtype=np.uint8).reshape(shape)
+        marks = marks[top:bottom, left:right]
+        for mark, color in self.MARKS.items():
+            rgb[(codes == EMPTY) & (marks == mark)] = color
+
+        if game.visual:
+            # Path shaded by its distance to the destination
+            path = codes == PATH
+            if path.any():
+                h = np.asarray(game.heuristic_field()).reshape(shape)
+                rgb[path] = hsv_to_rgb(h[top:bottom, left:right][path] / 360, 0.84, 1)
+
+        if game.showField and game.flow.current:
+            # Empty tiles shaded by their distance in the flow field
+            flow = game.flow
+            dist = flow.distance.reshape(shape)[top:bottom, left:right]
+            shade = (codes == EMPTY) & np.isfinite(dist)
+            rgb[shade] = hsv_to_rgb(
+                0.75 * dist[shade] / max(flow.max_distance, 1), 0.6, 0.55
+            )
+
+        pixels = pygame.surfarray.pixels3d(self.image)  # Indexed [x, y]
+        pixels[left:right, top:bottom] = rgb.transpose(1, 0, 2)
+        del pixels  # Unlocks the image
+
+        scale = self.scale
+        x = int(left * scale)
+        y = int(top * scale)
+        rect = pygame.Rect(
+            self.origin[0] + x,
+            self.origin[1] + y,
+            int(-(-right * scale // 1)) - x,  # Round up
+            int(-(-bottom * scale // 1)) - y,
+        )
+        area = self.image.subsurface((left, top, right - left, bottom - top))
+        screen.blit(pygame.transform.scale(area, rect.size), rect)
+        return rect
+
+
 class GuiState:
     def __init__(self):
         self.root = tk.Tk()
@@ -597,13 +792,22 @@ class GuiState:
                 "A*: Octile Dist",
                 "A*: Euclidean",
                 "A*: Chebyshev",
+                "A*: ALT",
                 "Dijkstra",
+                "JPS: Octile Dist",
+                "HPA*: Octile Dist",
+                "D* Lite: Octile Dist",
+                "Bidirectional A*: Octile Dist",
+                "Bidirectional Dijkstra",
+                "ARA*: Octile Dist",
+                "IDA*: Octile Dist",
+                "Flow Field",
             ),
         )
         self.heur_box.grid(column=0, row=2)
         ToolTip(
             self.heur_box,
-            msg="Select a pathfinding algorithm to use. \n\nManhattan and Octile are usually the most efficient.",
+            msg="Select a pathfinding algorithm to use. \n\nManhattan and Octile are usually the most efficient.\nALT measures around walls from a few landmarks, best on mazes.\nJPS finds the same paths as Octile with far fewer cycles on open maps.\nHPA* searches between map regions first, paths may be a little longer.\nD* Lite keeps its search and only repairs it after walls change.\nBidirectional searches from both ends and meets in the middle.\nARA* finds a rough path fast, then shows it improving until it is the best.\nIDA* uses little memory, and pays for it in cycles.\nFlow Field finds the way to the end from every tile at once, and shows it.",
         )
 
         # Visualize check box
@@ -653,10 +857,6 @@ class GuiState:
             game.remove_all_of("O")
             game.remove_all_of("@")
             game.phase = "START"
-            if hasattr(game, "start"):
-                del game.start
-            if hasattr(game, "dest"):
-                del game.dest
 
         # Remove target points
         self.start_end_button = ttk.Button(
@@ -676,6 +876,17 @@ class GuiState:
         )
         self.load_button.grid(column=3, row=4)
 
+        # Grid files
+        self.save_file_button = ttk.Button(
+            frame, text="Save to File", command=game.save_to_file
+        )
+        self.save_file_button.grid(column=4, row=3)
+        self.load_file_button = ttk.Button(
+            frame, text="Load from File", command=game.load_from_file
+        )
+        self.load_file_button.grid(column=4, row=4)
+        ToolTip(self.load_file_button, msg="Maps of any size can be loaded.")
+
         # PATHFIND BUTTON
         boldStyle = ttk.Style()
         boldStyle.configure("Bold.TButton", font=("Sans", "12", "bold"))
@@ -689,11 +900,21 @@ class GuiState:
         self.path_button.grid(column=3, row=6)
         ToolTip(self.path_button, msg="Start pathfinding process.")
 
+        # Cancel button, only enabled while a search runs
+        self.cancel_button = ttk.Button(
+            frame, text="Cancel Search", command=game.cancel_search
+        )
+        self.cancel_button.grid(column=3, row=5)
+        self._config_widget_state(self.cancel_button, tk.DISABLED)
+        ToolTip(self.cancel_button, msg="Stop the search that is running.")
+
         self.widgets = [
             self.wall_button,
             self.start_end_button,
             self.save_button,
             self.load_button,
+            self.save_file_button,
+            self.load_file_button,
             self.path_button,
             self.dyn_weight_box,
             self.visual_box,
@@ -711,6 +932,7 @@ class GuiState:
             # Disable all widgets
             for widget in self.widgets:
                 self._config_widget_state(widget, tk.DISABLED)
+            self._config_widget_state(self.cancel_button, "")
             self.disabled = True
             self.root.update()
             return  # Stop
@@ -718,11 +940,15 @@ class GuiState:
         if self.disabled:  # If widgets are disabled, enable them
             for widget in self.widgets:
                 self._config_widget_state(widget, "")
+            self._config_widget_state(self.cancel_button, tk.DISABLED)
+            self.disabled = False
 
         global METHOD
+        global ALGORITHM
         global VISUALIZE
         global DYNAMIC_WEIGHT
         method = self.heuristic.get().replace(" ", "")
+        ALGORITHM = "A*"
         if "Manhattan" in method:
             METHOD = "Manhattan"
 
@@ -735,8 +961,33 @@ class GuiState:
         if "Chebyshev" in method:
             METHOD = "Chebyshev"
 
-        if "Dijkstra" in method:
-            METHOD = "Dijkstra"
+        if "ALT" in method:
+            METHOD = "ALT"
+
+        if "JPS" in method:
+            ALGORITHM = "JPS"
+
+        if "HPA*" in method:
+            ALGORITHM = "HPA*"
+
+        if "D*Lite" in method:
+            ALGORITHM = "D* Lite"
+
+        if "Bidirectional" in method:
+            ALGORITHM = "Bidirectional"
+
+        if "ARA*" in method:
+            ALGORITHM = "ARA*"
+
+        if "IDA*" in method:
+            ALGORITHM = "IDA*"
+
+        if "FlowField" in method:
+            ALGORITHM = "Flow Field"
+
+        if "Dijkstra" in method or ALGORITHM != "A*":
+            if "Dijkstra" in method:
+                METHOD = "Dijkstra"
             self.dyn_weight.set("")  # Set it to blank
             self._config_widget_state(
                 self.dyn_weight_box, tk.DISABLED
@@ -777,21 +1028,20 @@ def main():
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             run = False
-    # --- Game logic --- #
-    game.render()
-
-    # --- PyGame Display --- #
-    pygame.display.update()
+    # --- Game logic and display --- #
+    game.follow_search()
+    pygame.display.update(game.render())  # Only what changed
     clock.tick(FPS)  # Set frame rate
 
 
-game = GameState()
-gui = GuiState()
-run = True
+if __name__ == "__main__":
+    game = GameState()
+    gui = GuiState()
+    run = True
 
-while run:
-    gui.update()  # Update gui
-    main()
+    while run:
+        gui.update()  # Update gui
+        main()
 
-# ----- END ------------------------ #
-pygame.quit()  # Close
+    # ----- END ------------------------ #
+    pygame.quit()  # Close
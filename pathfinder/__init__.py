@@ -0,0 +1,38 @@
+"""
+pyPathfinding's headless search engine.
+
+Usage:
+    from pathfinder import solve
+    result = solve(["O..", ".#.", "..X"], (0, 0), (2, 2), "Octile Dist")
+    result.path, result.length, result.cycles, result.ms
+
+Heavier parts are left out of this namespace so importing it stays cheap:
+    pathfinder.batch.solve_many    many queries across processes
+    pathfinder.flowfield.FlowField    every start to one destination at once
+    pathfinder.landmarks.Landmarks    ALT heuristic, saved and memory mapped
+    pathfinder.pathdb.PathDatabase    first moves between all cells, no search
+"""
+
+from .cache import PathCache
+from .components import ComponentIndex
+from .context import ContextPool, SearchContext
+from .graph import Graph
+from .grid import Grid
+from .heuristics import HEURISTICS, Heuristic, get_heuristic
+from .search import (
+    ALGORITHMS,
+    CLOSED,
+    METHODS,
+    OPENED,
+    REPARENTED,
+    SearchResult,
+    a_star,
+    calc_cost,
+    find_neighbors,
+    heuristic,
+    path_length,
+    solve,
+    solve_steps,
+)
+from .stats import SearchStats, StatsAggregator, add_hook, remove_hook
+from .tasks import BackgroundSearch, CancelToken, Search
@@ -0,0 +1,286 @@
+"""
+Anytime Repairing A* (ARA*).
+
+Runs weighted A*, f = g + w * h, as a series of passes. The first pass
+uses w = optimality_bound and finds a path quickly, then every pass lowers
+w and improves the path. Passes reuse the g-values of the last one: the
+cells still open, and the cells whose g improved after they had been
+expanded (INCONS), are carried over and re-keyed for the new w, and
+nothing else is searched again. The last pass runs at w = 1 and gives an
+optimal path.
+
+Each pass ends with a path whose cost is proven to be within a factor,
+bound, of optimal:
+
+    bound = min(w, g(dest) / min over open and INCONS cells of (g + h))
+
+The bounds only hold for consistent heuristics (Octile Dist, Euclidean,
+Chebyshev, Dijkstra). Manhattan overestimates diagonal moves.
+
+Based on: Likhachev, Gordon & Thrun, "ARA*: Anytime A* with Provable
+Bounds on Sub-Optimality" (NIPS 2003).
+
+Usage:
+    result = ara_star(grid, (0, 0), (49, 49), deadline_ms=5, on_solution=print)
+    result.stats.extra["bound"]  # 1.0 once optimal
+"""
+
+from heapq import heapify, heappop, heappush
+from math import inf as INFINITY
+
+from .context import POOL
+from .grid import WALL, as_grid
+from .heuristics import get_heuristic
+from .search import (
+    CLOSED,
+    DIRECTIONS,
+    NOT_FOUND,
+    OPENED,
+    REPARENTED,
+    TOO_LONG,
+    SearchResult,
+)
+from .stats import SearchStats, clock, elapsed, publish
+
+MAX_PASS = 255  # Pass numbers are stamped into a bytearray
+
+
+def ara_star(
+    grid,
+    start,
+    dest,
+    method="Octile Dist",
+    optimality_bound=10,
+    decrease=0.5,
+    deadline_ms=None,
+    on_solution=None,
+    events=None,
+):
+    """
+    Finds a path from start to dest, then better ones until the path is
+    optimal or deadline_ms have passed. Returns the best SearchResult found,
+    or one with reason TOO_LONG if the deadline came before any path.
+
+    on_solution(result) is called with every path as it is found. Results
+    carry the pass's weight, its proven bound, and the number of solutions
+    so far in stats.extra.
+    """
+    from .tasks import Search  # tasks imports search, which imports this lazily
+
+    started = clock()
+    best = []
+
+    def found(result):
+        best.append(result)
+        if on_solution is not None:
+            on_solution(result)
+
+    search = Search(
+        grid,
+        start,
+        dest,
+        method,
+        algorithm="ARA*",
+        optimality_bound=optimality_bound,
+        decrease=decrease,
+        events=events,
+        on_solution=found,
+    )
+    result = search.run(deadline_ms)
+    if result is not None:
+        return result
+    search.cancel()
+    if not best:
+        # Still in the first pass, so only the expansions are known
+        stats = SearchStats(
+            "ARA*",
+            get_heuristic(method).name,
+            extra={"weight": optimality_bound, "bound": None, "solutions": 0},
+            expanded=search.expansions,
+        )
+        return SearchResult.finish(stats, started, reason=TOO_LONG)
+    publish(best[-1].stats)  # Only finished searches publish by themselves
+    return best[-1]
+
+
+def ara_star_steps(
+    grid,
+    start,
+    dest,
+    method="Octile Dist",
+    optimality_bound=10,
+    decrease=0.5,
+    context=None,
+    events=None,
+    on_solution=None,
+):
+    """
+    ara_star() as a generator, see a_star_steps(). Runs every pass down
+    to w = 1, and returns the optimal result.
+    """
+    if optimality_bound < 1:
+        raise ValueError(f"optimality_bound must be at least 1, got {optimality_bound}")
+    if decrease <= 0:
+        raise ValueError(f"decrease must be positive, got {decrease}")
+    method = get_heuristic(method)
+    grid = as_grid(grid)
+    args = (optimality_bound, decrease, events, on_solution)
+    if context is None:
+        with POOL.context(grid.width * grid.height) as context:
+            return (yield from _search(grid, start, dest, method, context, *args))
+    return (yield from _search(grid, start, dest, method, context, *args))
+
+
+def _search(grid, start, dest, method, context, weight, decrease, events, on_solution):
+    started = clock()
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    startID = grid.index(*start)
+    destID = grid.index(*dest)
+    hField = method.lookup(width, height, dest)
+
+    # g and parents last across passes, so they use the context's stamps.
+    # Cells are closed again in every pass, so closedSet holds the number of
+    # the pass that expanded them instead.
+    gScore = context.g
+    cameFrom = context.parent
+    seen = context.seen
+    gen = context.begin()
+    closedSet = bytearray(width * height)
+    passNumber = 1
+
+    seen[startID] = gen
+    gScore[startID] = 0
+    cameFrom[startID] = -1
+
+    w = float(weight)
+    startH = hField[startID]
+    # (f, h, cell) entries with lazy deletion, as in a_star()
+    openSet = [(w * startH, startH, startID)]
+    incons = []  # Cells improved after being expanded in this pass
+    solutions = 0
+
+    # Counters for SearchStats
+    cycles = 0
+    generated = 0
+    improved = 0  # Generated cells that got a cheaper g
+    pushes = 1
+    peakOpen = 1
+    reopened = 0
+    boundEvals = 0  # h lookups to prove bounds
+
+    emit = events.append if events is not None else None
+    if emit is not None:
+        emit((OPENED, startID, -1))
+
+    while True:
+        # ----- Improve the path ----------------- #
+        while openSet:
+            f, _, current = openSet[0]
+            if closedSet[current] == passNumber:
+                heappop(openSet)  # Stale entry
+                continue
+            if seen[destID] == gen and gScore[destID] <= f:
+                break  # Nothing open can lead to a cheaper path at this w
+            heappop(openSet)
+            closedSet[current] = passNumber
+            if emit is not None:
+                emit((CLOSED, current, cameFrom[current]))
+            cycles += 1
+            if current == destID:
+                continue
+
+            currentX = current % width
+            currentY = current // width
+            currentG = gScore[current]
+            for dx, dy, cost in DIRECTIONS:
+                neighborX = currentX + dx
+                neighborY = currentY + dy
+                if not (0 <= neighborX < width and 0 <= neighborY < height):
+                    continue
+                neighbor = neighborY * width + neighborX
+                if cells[neighbor] == WALL:
+                    continue
+                generated += 1
+                tempG = currentG + cost
+                if seen[neighbor] != gen or tempG < gScore[neighbor]:
+                    improved += 1
+                    if emit is not None:
+                        kind = OPENED if seen[neighbor] != gen else REPARENTED
+                        emit((kind, neighbor, current))
+                    seen[neighbor] = gen
+                    cameFrom[neighbor] = current
+                    gScore[neighbor] = tempG
+                    if closedSet[neighbor] != passNumber:
+                        tempH = hField[neighbor]
+                        heappush(openSet, (tempG + w * tempH, tempH, neighbor))
+                        pushes += 1
+                    else:
+                        incons.append(neighbor)  # Waits for the next pass
+
+            if len(openSet) > peakOpen:
+                peakOpen = len(openSet)
+            yield context, current
+
+        if seen[destID] != gen:
+            stats = SearchStats(
+                "ARA*",
+                method.name,
+                extra={"weight": w, "bound": None, "solutions": 0},
+                expanded=cycles,
+                generated=generated,
+                pushes=pushes,
+                peak_open=peakOpen,
+                heuristic_evals=pushes,
+                duplicates=generated - improved,
+            )
+            return SearchResult.finish(stats, started, reason=NOT_FOUND)
+
+        # ----- Prove a bound -------------------- #
+        # Any cheaper path must pass through a cell still open or in INCONS
+        frontier = {cell for _, _, cell in openSet if closedSet[cell] != passNumber}
+        frontier.update(incons)
+        reopened += len(set(incons))
+        boundEvals += len(frontier)
+        lower = min(
+            (gScore[cell] + hField[cell] for cell in frontier), default=INFINITY
+        )
+        destG = gScore[destID]
+        bound = max(1.0, min(w, destG / lower)) if destG > 0 else 1.0
+
+        solutions += 1
+        path = context.path_to(destID, grid)
+        stats = SearchStats(
+            "ARA*",
+            method.name,
+            extra={"weight": w, "bound": bound, "solutions": solutions},
+            expanded=cycles,
+            generated=generated,
+            pushes=pushes,
+            reopened=reopened,
+            peak_open=peakOpen,
+            heuristic_evals=pushes + boundEvals,
+            duplicates=generated - improved,
+        )
+        if w <= 1.0 or bound <= 1.0:
+            result = SearchResult.finish(stats, started, path)
+            if on_solution is not None:
+                on_solution(result)
+            return result
+        if on_solution is not None:
+            elapsed(stats, started)
+            on_solution(SearchResult(path, cycles, round(stats.wall_ms), stats=stats))
+
+        # ----- Lower w and carry over ----------- #
+        w = max(1.0, min(w - decrease, bound))
+        passNumber += 1
+        if passNumber > MAX_PASS:
+            closedSet[:] = bytes(len(closedSet))
+            passNumber = 1
+        openSet = [
+            (gScore[cell] + w * hField[cell], hField[cell], cell) for cell in frontier
+        ]
+        heapify(openSet)
+        pushes += len(openSet)
+        incons = []
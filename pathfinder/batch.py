@@ -0,0 +1,133 @@
+"""
+Batch queries over one grid, spread across processes.
+
+The grid's cells are copied into multiprocessing.shared_memory once, and
+every worker maps that block as its own Grid. Only the (start, dest) pairs
+and the results travel between processes, never the map.
+
+Usage:
+    results = solve_many(grid, [((0, 0), (49, 49)), ((3, 4), (20, 1))], workers=4)
+
+    for i, result in iter_solve(grid, pairs, workers=4, ordered=False):
+        ...  # Results as soon as they are ready
+
+    # Pairs that can't be joined are answered without searching
+    results = solve_many(grid, pairs, components=ComponentIndex(grid))
+"""
+
+import os
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+from .grid import Grid, as_grid
+from .search import SearchResult, a_star
+from .stats import clear_hooks, publish
+
+# Set in each worker by _attach()
+_shared = None
+_grid = None
+_options = None
+
+
+def _attach(name, width, height, options):
+    """Worker initializer, maps the shared cells as a Grid"""
+    global _shared, _grid, _options
+    clear_hooks()  # Forked workers inherit them, but stats are published here
+    _shared = SharedMemory(name)
+    _grid = Grid(width, height, _shared.buf[: width * height])
+    _options = options
+
+
+def _solve_one(task):
+    i, (start, dest) = task
+    return i, a_star(_grid, start, dest, **_options)
+
+
+def iter_solve(
+    grid,
+    pairs,
+    workers=None,
+    method="Manhattan",
+    dynamic_weight=False,
+    optimality_bound=10,
+    chunksize=None,
+    ordered=True,
+    components=None,
+):
+    """
+    Solves every (start, dest) pair and yields (index, SearchResult).
+
+    With ordered=True results come back in the order of pairs, otherwise
+    as soon as each one is done. workers defaults to the number of CPUs;
+    with a single worker everything runs in this process. Either way the
+    stats hooks see every search, from this process.
+
+    components, a pathfinder.components.ComponentIndex of the grid, lets
+    pairs that can't be joined skip the search. They come first when
+    ordered=False.
+    """
+    grid = as_grid(grid)
+    pairs = list(pairs)
+    rejected = set()
+    if components is not None:
+        rejected = {
+            i
+            for i, (start, dest) in enumerate(pairs)
+            if not components.connected(start, dest)
+        }
+    options = {
+        "method": method,
+        "dynamic_weight": dynamic_weight,
+        "optimality_bound": optimality_bound,
+    }
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(pairs) - len(rejected)))
+
+    if workers == 1:
+        for i, (start, dest) in enumerate(pairs):
+            if i in rejected:
+                yield i, SearchResult.rejected("A*", method)
+            else:
+                yield i, a_star(grid, start, dest, **options)
+        return
+
+    tasks = [(i, pair) for i, pair in enumerate(pairs) if i not in rejected]
+    if not ordered:
+        for i in rejected:
+            yield i, SearchResult.rejected("A*", method)
+
+    if chunksize is None:
+        # A few chunks per worker keeps them busy without much overhead
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    size = grid.width * grid.height
+    shared = SharedMemory(create=True, size=size)
+    try:
+        shared.buf[:size] = grid.cells
+        initargs = (shared.name, grid.width, grid.height, options)
+        with Pool(workers, initializer=_attach, initargs=initargs) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            results = imap(_solve_one, tasks, chunksize)
+            for i in range(len(pairs)):
+                if i in rejected:
+                    if ordered:
+                        yield i, SearchResult.rejected("A*", method)
+                    continue
+                i, result = next(results)
+                publish(result.stats)
+                yield i, result
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def solve_many(grid, pairs, workers=None, **kwargs):
+    """
+    Solves every (start, dest) pair on the same grid.
+    Returns a list of SearchResults in the order of pairs.
+
+    Takes the same options as iter_solve().
+    """
+    kwargs["ordered"] = True
+    return [result for i, result in iter_solve(grid, pairs, workers, **kwargs)]
@@ -0,0 +1,296 @@
+"""
+Benchmarks for the search engine.
+
+Usage:
+    python -m pathfinder.benchmark [--budget SECONDS]
+    python -m pathfinder.benchmark --scen FILE.scen [--maps DIR] [--format csv|json]
+
+Without --scen, compares the heap-based open set in a_star() against the
+original list-scan open set on empty (open) 50x50 and 1000x1000 grids,
+corner to corner. Runs of the list-scan version that go over the time
+budget are stopped and reported as such.
+
+With --scen, runs every problem of a MovingAI scenario file with each
+algorithm, method and weighting option, and writes one row per run with
+wall time, expansions, and path length against the scenario's optimal
+length, as CSV or JSON.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from time import perf_counter
+
+from .grid import Grid
+from .heuristics import get_heuristic
+from .movingai import read_map, read_scen
+from .search import (
+    ALGORITHMS,
+    METHODS,
+    calc_cost,
+    find_neighbors,
+    heuristic,
+    a_star,
+    solve,
+)
+
+# Columns of a scenario benchmark row
+FIELDS = (
+    "map",
+    "bucket",
+    "start_x",
+    "start_y",
+    "goal_x",
+    "goal_y",
+    "optimal",
+    "algorithm",
+    "method",
+    "dynamic_weight",
+    "found",
+    "length",
+    "ratio",
+    "expansions",
+    "generated",
+    "pushes",
+    "peak_open",
+    "wall_ms",
+    "cpu_ms",
+)
+
+
+class _OverBudget(Exception):
+    pass
+
+
+def _list_scan_a_star(grid, start, dest, method, on_step):
+    """
+    The open set as it was before it became a heap: a list scanned for
+    the lowest f on every cycle, with list membership checks.
+    Kept only to measure against.
+    """
+    rows = grid.height
+    cols = grid.width
+    startX, startY = start
+    openSet = [start]
+    openSetFScores = [heuristic(start, dest, method)]
+    cameFrom = {}
+    closedSet = [start]
+    gScore = [[99999 for col in range(cols)] for row in range(rows)]
+    gScore[startY][startX] = 0
+
+    while openSet:
+        lowest = 99999
+        i = 0
+        for node in openSet:
+            temp_fScore = openSetFScores[i]
+            if temp_fScore < lowest:
+                current = node
+                lowest = temp_fScore
+            i += 1
+
+        if current == dest:
+            return current
+
+        currentIDX = openSet.index(current)
+        openSet.remove(current)
+        openSetFScores.pop(currentIDX)
+        for neighbor in find_neighbors(grid, current):
+            if neighbor in closedSet:
+                continue
+            closedSet.append(neighbor)
+
+            currentX, currentY = current
+            neighborX, neighborY = neighbor
+            tempG = gScore[currentY][currentX] + calc_cost(current, neighbor)
+            if tempG < gScore[neighborY][neighborX]:
+                cameFrom[neighbor] = current
+                gScore[neighborY][neighborX] = tempG
+                tempF = tempG + heuristic(neighbor, dest, method)
+                if not neighbor in openSet:
+                    openSet.append(neighbor)
+                    openSetFScores.append(tempF)
+
+        on_step()
+
+    return None
+
+
+def open_grid(width, height):
+    """An empty grid with no walls"""
+    return Grid(width, height)
+
+
+def _time_list_scan(grid, start, dest, method, budget):
+    oldtime = perf_counter()
+
+    def on_step():
+        if perf_counter() - oldtime > budget:
+            raise _OverBudget()
+
+    try:
+        _list_scan_a_star(grid, start, dest, method, on_step)
+    except _OverBudget:
+        return None
+    return perf_counter() - oldtime
+
+
+def _time_heap(grid, start, dest, method):
+    oldtime = perf_counter()
+    a_star(grid, start, dest, method)
+    return perf_counter() - oldtime
+
+
+def open_set(sizes=(50, 1000), methods=("Octile Dist", "Dijkstra"), budget=10.0):
+    """
+    Times both open sets on each size and method.
+    Returns a list of (size, method, list_scan_seconds, heap_seconds),
+    with list_scan_seconds as None when it went over budget.
+    """
+    rows = []
+    get_heuristic(methods[0]).field(1, 1, (0, 0))  # Warm up NumPy import
+    for size in sizes:
+        grid = open_grid(size, size)
+        start = (0, 0)
+        dest = (size - 1, size - 1)
+        for method in methods:
+            heap = _time_heap(grid, start, dest, method)
+            scan = _time_list_scan(grid, start, dest, method, budget)
+            rows.append((size, method, scan, heap))
+    return rows
+
+
+def configurations(algorithms=ALGORITHMS, methods=METHODS):
+    """
+    (algorithm, method, dynamic_weight) for every option worth running.
+    JPS always searches with Octile Dist, and only A* has weighting, which
+    does nothing for Dijkstra. IDA* is not run as Dijkstra, which would
+    take a pass for every distance.
+    """
+    for algorithm in algorithms:
+        if algorithm == "JPS":
+            yield algorithm, "Octile Dist", False
+            continue
+        for method in methods:
+            if algorithm == "IDA*" and method == "Dijkstra":
+                continue
+            yield algorithm, method, False
+            if algorithm == "A*" and method != "Dijkstra":
+                yield algorithm, method, True
+
+
+def scenarios(scen, maps=None, algorithms=ALGORITHMS, methods=METHODS, limit=None):
+    """
+    Runs the problems of a .scen file with every configuration.
+    Maps are looked up by file name in maps, or next to the .scen file.
+    Yields one dict per run, with the keys in FIELDS.
+    """
+    if maps is None:
+        maps = os.path.dirname(scen)
+    options = list(configurations(algorithms, methods))
+    grids = {}
+    get_heuristic("Octile Dist").field(1, 1, (0, 0))  # Warm up NumPy import
+    for scenario in read_scen(scen)[:limit]:
+        name = os.path.basename(scenario.map_name)
+        if name not in grids:
+            grids[name] = read_map(os.path.join(maps, name))
+        grid = grids[name]
+
+        for algorithm, method, dynamic_weight in options:
+            result = solve(
+                grid, scenario.start, scenario.goal, method, dynamic_weight, algorithm
+            )
+            stats = result.stats
+            length = result.length
+            if length is None:
+                ratio = None
+            elif scenario.optimal:
+                ratio = round(length / scenario.optimal, 4)
+            else:
+                ratio = 1.0  # Start and goal are the same cell
+            yield {
+                "map": name,
+                "bucket": scenario.bucket,
+                "start_x": scenario.start[0],
+                "start_y": scenario.start[1],
+                "goal_x": scenario.goal[0],
+                "goal_y": scenario.goal[1],
+                "optimal": scenario.optimal,
+                "algorithm": algorithm,
+                "method": method,
+                "dynamic_weight": dynamic_weight,
+                "found": result.found,
+                "length": length,
+                "ratio": ratio,
+                "expansions": stats.expanded,
+                "generated": stats.generated,
+                "pushes": stats.pushes,
+                "peak_open": stats.peak_open,
+                "wall_ms": round(stats.wall_ms, 3),
+                "cpu_ms": round(stats.cpu_ms, 3),
+            }
+
+
+def write_rows(rows, file, format="csv"):
+    """Writes scenario benchmark rows as CSV, or as a JSON list"""
+    if format == "json":
+        json.dump(list(rows), file, indent=1)
+        file.write("\n")
+        return
+    writer = csv.DictWriter(file, FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="\n\n".join(__doc__.split("\n\n")[2:]),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=10.0,
+        help="seconds before a list-scan run is stopped (default 10)",
+    )
+    parser.add_argument("--scen", help="MovingAI .scen file to run")
+    parser.add_argument(
+        "--maps", help="directory holding the .map files (default: next to --scen)"
+    )
+    parser.add_argument(
+        "--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS
+    )
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS)
+    parser.add_argument("--limit", type=int, help="only run the first LIMIT problems")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--output", help="file to write to (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.scen is not None:
+        rows = scenarios(
+            args.scen, args.maps, args.algorithms, args.methods, args.limit
+        )
+        if args.output is None:
+            write_rows(rows, sys.stdout, args.format)
+        else:
+            with open(args.output, "w", newline="") as file:
+                write_rows(rows, file, args.format)
+        return
+
+    print(f"{'grid':>11}  {'method':<12} {'list scan':>10} {'heap':>9} {'speedup':>8}")
+    for size, method, scan, heap in open_set(budget=args.budget):
+        grid = f"{size}x{size}"
+        if scan is None:
+            print(
+                f"{grid:>11}  {method:<12} {'>' + str(args.budget) + 's':>10} {heap:>8.3f}s {'':>8}"
+            )
+        else:
+            print(
+                f"{grid:>11}  {method:<12} {scan:>9.3f}s {heap:>8.3f}s {scan / heap:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
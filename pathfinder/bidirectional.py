@@ -0,0 +1,210 @@
+"""
+Bidirectional search.
+
+Two searches run at once, one forward from the start and one backward
+from the destination, and the side with the smaller open set is expanded
+next. Whenever a cell has been reached from both sides, the path through
+it is a candidate, and the best one so far is kept as mu.
+
+Stopping (meet in the middle):
+    Bidirectional Dijkstra (h = 0)
+        stop when topF + topB >= mu, the smallest g on each side
+    Bidirectional A*
+        stop when the smallest f on either side is >= mu
+
+Both are exact for consistent heuristics (Octile Dist, Euclidean,
+Chebyshev, Dijkstra), so paths are optimal. With Manhattan, which can
+overestimate diagonal moves, they are not.
+"""
+
+from heapq import heappop, heappush
+from math import inf as INFINITY
+
+from .context import POOL
+from .grid import WALL, as_grid
+from .heuristics import Zero, get_heuristic
+from .search import (
+    CLOSED,
+    DIRECTIONS,
+    NOT_FOUND,
+    OPENED,
+    REPARENTED,
+    SearchResult,
+    run_steps,
+)
+from .stats import SearchStats, clock
+
+
+def bidirectional_search(
+    grid, start, dest, method="Octile Dist", on_step=None, events=None
+):
+    """
+    Finds a path from start to dest, searching from both ends.
+
+    Returns a SearchResult whose cycles counts expansions on both sides.
+    result.stats.extra["forward"] and ["backward"] give each side.
+
+    on_step(context, current) works as in a_star(), with the context of
+    whichever side just expanded. events works as in a_star(), with the
+    events of both sides mixed together; parents on the backward side
+    point towards the destination.
+    """
+    return run_steps(bidirectional_steps(grid, start, dest, method, events), on_step)
+
+
+def bidirectional_steps(grid, start, dest, method="Octile Dist", events=None):
+    """bidirectional_search() as a generator, see a_star_steps()"""
+    method = get_heuristic(method)
+    grid = as_grid(grid)
+    size = grid.width * grid.height
+    with POOL.context(size) as forward, POOL.context(size) as backward:
+        return (
+            yield from _search(grid, start, dest, method, events, forward, backward)
+        )
+
+
+class _Side:
+    """The open set and arrays of one direction"""
+
+    def __init__(self, context, source, target, method, grid):
+        self.context = context
+        self.g = context.g
+        self.parent = context.parent
+        self.seen = context.seen
+        self.closed = context.closed
+        self.gen = context.begin()
+        # h towards the other end, see Heuristic.lookup()
+        self.hField = method.lookup(grid.width, grid.height, target)
+
+        i = grid.index(*source)
+        self.seen[i] = self.gen
+        self.g[i] = 0
+        self.parent[i] = -1
+        h = self.hField[i]
+        # Entries are (f, h, cell, g)
+        self.openSet = [(h, h, i, 0.0)]
+        self.expanded = 0
+
+    def top(self):
+        """The smallest (f, g) still open, dropping closed entries"""
+        openSet = self.openSet
+        while openSet:
+            f, _, i, g = openSet[0]
+            if self.closed[i] != self.gen:
+                return f, g
+            heappop(openSet)
+        return INFINITY, INFINITY
+
+
+def _search(grid, start, dest, method, events, forwardContext, backwardContext):
+    started = clock()
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    zero = isinstance(method, Zero)
+    if WALL in (cells[grid.index(*start)], cells[grid.index(*dest)]):
+        stats = SearchStats("Bidirectional", method.name)
+        return SearchResult.finish(stats, started, reason=NOT_FOUND)
+
+    forward = _Side(forwardContext, start, dest, method, grid)
+    backward = _Side(backwardContext, dest, start, method, grid)
+
+    # Cost of the best path found so far, and the cell where it meets
+    mu = INFINITY
+    meet = -1
+    if start == dest:
+        mu = 0.0
+        meet = grid.index(*start)
+
+    # Counters for SearchStats, over both sides
+    generated = 0
+    pushes = 2
+    peakOpen = 2
+
+    emit = events.append if events is not None else None
+    if emit is not None:
+        emit((OPENED, grid.index(*start), -1))
+        emit((OPENED, grid.index(*dest), -1))
+
+    while True:
+        forwardF, forwardG = forward.top()
+        backwardF, backwardG = backward.top()
+        if forwardF == INFINITY or backwardF == INFINITY:
+            break  # One side ran out of cells
+
+        # Lower bound on any path not yet seen
+        if zero:
+            bound = forwardG + backwardG
+        else:
+            bound = max(forwardF, backwardF)
+        if bound >= mu:
+            break
+
+        # Grow the side with the smaller frontier
+        if len(forward.openSet) <= len(backward.openSet):
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+
+        _, _, current, currentG = heappop(side.openSet)
+        side.closed[current] = side.gen
+        side.expanded += 1
+        if emit is not None:
+            emit((CLOSED, current, side.parent[current]))
+
+        gScore = side.g
+        seen = side.seen
+        currentX = current % width
+        currentY = current // width
+        for dx, dy, cost in DIRECTIONS:
+            neighborX = currentX + dx
+            neighborY = currentY + dy
+            if not (0 <= neighborX < width and 0 <= neighborY < height):
+                continue
+            neighbor = neighborY * width + neighborX
+            if cells[neighbor] == WALL:
+                continue
+            generated += 1
+            if side.closed[neighbor] == side.gen:
+                continue
+            tempG = currentG + cost
+            if seen[neighbor] != side.gen or tempG < gScore[neighbor]:
+                pushes += 1
+                if emit is not None:
+                    kind = OPENED if seen[neighbor] != side.gen else REPARENTED
+                    emit((kind, neighbor, current))
+                seen[neighbor] = side.gen
+                side.parent[neighbor] = current
+                gScore[neighbor] = tempG
+                tempH = side.hField[neighbor]
+                heappush(side.openSet, (tempG + tempH, tempH, neighbor, tempG))
+
+                # Reached from both ends, a candidate path
+                if other.seen[neighbor] == other.gen:
+                    total = tempG + other.g[neighbor]
+                    if total < mu:
+                        mu = total
+                        meet = neighbor
+
+        openSize = len(forward.openSet) + len(backward.openSet)
+        if openSize > peakOpen:
+            peakOpen = openSize
+        yield side.context, current
+
+    stats = SearchStats(
+        "Bidirectional",
+        method.name,
+        extra={"forward": forward.expanded, "backward": backward.expanded},
+        expanded=forward.expanded + backward.expanded,
+        generated=generated,
+        pushes=pushes,
+        peak_open=peakOpen,
+        heuristic_evals=pushes,  # One hField lookup per push
+        duplicates=generated - (pushes - 2),
+    )
+    if meet == -1:
+        return SearchResult.finish(stats, started, reason=NOT_FOUND)
+
+    path = forwardContext.path_to(meet, grid)
+    path.extend(reversed(backwardContext.path_to(meet, grid)[:-1]))
+    return SearchResult.finish(stats, started, path)
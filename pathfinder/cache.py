@@ -0,0 +1,268 @@
+"""
+Path cache for repeated queries on a grid that rarely changes.
+
+Results are kept per (start, dest, algorithm, method, weighting) in an LRU
+bounded by entry count, and optionally by the total number of path cells.
+The cache is valid for one grid version. Tell it about edits with
+cell_changed() and it drops only the entries the edit can affect:
+
+    A cell became a wall
+        entries whose path runs through it. Walls only make other paths
+        longer, so those stay optimal.
+    A cell stopped being a wall
+        entries whose explored region contains it: the bounding box of
+        every cell the search reached, grown by one cell for the walls
+        around them. A search that never looked at the cell already
+        proved nothing through it is shorter. This only holds for A*;
+        other algorithms scan past cells without recording them, so any
+        removed wall drops their entries.
+
+If the grid's version moves on without cell_changed() being called, the
+whole cache is dropped on the next lookup, or the next cell_changed().
+
+Queries whose start and destination are not connected at all are answered
+from a ComponentIndex without searching, and never take up an entry.
+"""
+
+from collections import OrderedDict
+
+from .components import ComponentIndex
+from .context import SearchContext
+from .grid import WALL, as_grid
+from .search import SearchResult
+from .tasks import Search
+
+
+class _Entry:
+    def __init__(self, key, result, region, cells):
+        self.key = key
+        self.result = result
+        self.region = region  # (left, top, right, bottom), inclusive
+        self.cells = cells  # Cell ids on the path
+
+
+class PathCache:
+    """
+    Caches search results for one grid.
+
+    Usage:
+        cache = PathCache(grid)
+        result = cache.find_path((0, 0), (49, 49), "Octile Dist")
+        grid.set(5, 5, "#")
+        cache.cell_changed(5, 5)
+        cache.hits, cache.misses, cache.evictions, cache.invalidations,
+        cache.rejections
+    """
+
+    def __init__(self, grid, limit=256, max_cells=None):
+        self.grid = as_grid(grid)
+        self.limit = limit  # Most entries kept
+        self.max_cells = max_cells  # Most path cells kept, over all entries
+        self.version = self.grid.version
+
+        self._entries = OrderedDict()
+        self._cells = 0
+        # Used for A* so the explored region can be read back
+        self._context = SearchContext(self.grid.width * self.grid.height)
+        self._components = None  # Built on the first lookup
+
+        self.rejections = 0  # Queries answered as unreachable
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Dropped to stay within limit or max_cells
+        self.invalidations = 0  # Dropped because the grid changed
+
+    def find_path(
+        self,
+        start,
+        dest,
+        method="Manhattan",
+        dynamic_weight=False,
+        algorithm="A*",
+        optimality_bound=10,
+    ):
+        """Same as solve(), answered from the cache when possible"""
+        query = (start, dest, method, dynamic_weight, algorithm, optimality_bound)
+        result = self.lookup(*query)
+        if result is None:
+            result = self.search(*query).run()
+        return result
+
+    def lookup(
+        self,
+        start,
+        dest,
+        method="Manhattan",
+        dynamic_weight=False,
+        algorithm="A*",
+        optimality_bound=10,
+    ):
+        """The cached result for a query, or None"""
+        rejected = self.reject(start, dest, method, algorithm)
+        if rejected is not None:
+            return rejected
+        entry = self._entries.get(
+            self._key(start, dest, method, dynamic_weight, algorithm, optimality_bound)
+        )
+        if entry is None:
+            return None
+        self._entries.move_to_end(entry.key)
+        self.hits += 1
+        return entry.result
+
+    def reject(self, start, dest, method="Manhattan", algorithm="A*"):
+        """
+        A not found result if no path can join start and dest, or None
+        when a search is needed.
+        """
+        if self._components is None:
+            self._components = ComponentIndex(self.grid)
+        if self._components.connected(start, dest):
+            return None
+        self.rejections += 1
+        return SearchResult.rejected(algorithm, method)
+
+    def search(
+        self,
+        start,
+        dest,
+        method="Manhattan",
+        dynamic_weight=False,
+        algorithm="A*",
+        optimality_bound=10,
+        events=None,
+        **options,
+    ):
+        """
+        A pathfinder.tasks.Search for a query that missed, whose result is
+        cached once it finishes. Only run one at a time, A* searches share
+        the cache's arrays. options go to the search as they are, like
+        ARA*'s on_solution.
+        """
+        key = self._key(
+            start, dest, method, dynamic_weight, algorithm, optimality_bound
+        )
+        self.misses += 1
+        kwargs = {"optimality_bound": optimality_bound, "events": events, **options}
+        if algorithm == "A*":
+            kwargs["context"] = self._context
+
+        def finished(result):
+            self._store(key, result)
+
+        return Search(
+            self.grid,
+            start,
+            dest,
+            method,
+            dynamic_weight,
+            algorithm,
+            on_finish=finished,
+            **kwargs,
+        )
+
+    def _key(self, start, dest, method, dynamic_weight, algorithm, optimality_bound):
+        if self.grid.version != self.version:
+            self.invalidations += len(self._entries)
+            self.clear()
+        return (
+            tuple(start),
+            tuple(dest),
+            algorithm,
+            method,
+            bool(dynamic_weight),
+            optimality_bound,
+        )
+
+    def _store(self, key, result):
+        grid = self.grid
+        if grid.version != self.version:
+            return  # The grid changed under the search
+        if key[2] == "A*":
+            region = self._explored_region()
+        else:
+            region = (0, 0, grid.width - 1, grid.height - 1)  # Unknown, assume all
+
+        cells = set()
+        if result.found:
+            cells = {grid.index(x, y) for x, y in result.path}
+        self._entries[key] = _Entry(key, result, region, cells)
+        self._cells += len(cells)
+        self._evict()
+
+    def _explored_region(self):
+        """Bounding box of every cell the last search reached, plus one"""
+        import numpy as np  # Only needed once something is cached
+
+        grid = self.grid
+        context = self._context
+        seen = np.frombuffer(context.seen, dtype=np.uint8).reshape(
+            grid.height, grid.width
+        )
+        reached = seen == context.generation
+        rows = np.flatnonzero(reached.any(axis=1))
+        cols = np.flatnonzero(reached.any(axis=0))
+        return (
+            int(cols[0]) - 1,
+            int(rows[0]) - 1,
+            int(cols[-1]) + 1,
+            int(rows[-1]) + 1,
+        )
+
+    def _evict(self):
+        while len(self._entries) > self.limit or (
+            self.max_cells is not None
+            and self._cells > self.max_cells
+            and len(self._entries) > 1
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._cells -= len(entry.cells)
+            self.evictions += 1
+
+    def cell_changed(self, x, y):
+        """Drops the entries a change to cell (x, y) can affect"""
+        if self.grid.version not in (self.version, self.version + 1):
+            # Other edits went unreported, so anything may be out of date
+            self.invalidations += len(self._entries)
+            self._components = None
+            self.clear()
+            return
+        i = self.grid.index(x, y)
+        if self.grid.cells[i] == WALL:
+
+            def affected(entry):
+                return i in entry.cells
+
+        else:
+
+            def affected(entry):
+                left, top, right, bottom = entry.region
+                return left <= x <= right and top <= y <= bottom
+
+        for key in [key for key, entry in self._entries.items() if affected(entry)]:
+            entry = self._entries.pop(key)
+            self._cells -= len(entry.cells)
+            self.invalidations += 1
+        if self._components is not None:
+            self._components.cell_changed(x, y)
+        self.version = self.grid.version
+
+    def clear(self):
+        self._entries.clear()
+        self._cells = 0
+        self.version = self.grid.version
+
+    def stats(self):
+        """Counters as a dict"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "rejections": self.rejections,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,290 @@
+"""
+Connected components of free cells.
+
+Every free cell is labelled with the component it belongs to, using the
+grid's moves (8 neighbors, diagonals included), so two cells are connected
+exactly when some path joins them. A query whose start and destination
+are in different components can be answered "not found" in O(1), before
+any search runs.
+
+The labels are kept up to date as walls change:
+
+    A wall is removed
+        the cell joins the components around it, merging them if there
+        are several. Components are merged with union-find, so no cell is
+        relabelled.
+    A wall is added
+        the component can only split if the free cells around the new wall
+        fall into more than one group. Then a search runs from each group
+        at once, taking turns, until they meet or all but one run out. A
+        group that runs out is a new component, and only its cells are
+        relabelled, so the cost is the size of the smaller pieces.
+
+If the grid's version moves on without cell_changed() being called, the
+labels are rebuilt on the next query.
+"""
+
+from array import array
+from collections import deque
+
+from .grid import WALL, as_grid
+from .search import DIRECTIONS
+
+# bytes.translate table from cell codes to 1 for free cells, 0 for walls
+_FREE = bytes(0 if i == WALL else 1 for i in range(256))
+
+# The 8 cells around a cell in clockwise order, starting top left. Every
+# cell is 8-connected to the next one, and the edge cells (odd places) to
+# the edge cell after the next one as well, across the corner.
+_RING = ((-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0))
+
+
+class ComponentIndex:
+    """
+    Component labels for every free cell of a grid.
+
+    Usage:
+        components = ComponentIndex(grid)
+        components.connected((0, 0), (49, 49))
+        grid.set(5, 5, "#")
+        components.cell_changed(5, 5)
+    """
+
+    def __init__(self, grid):
+        self.grid = as_grid(grid)
+        self.splits = 0  # Components split by added walls, since creation
+        self.rebuild()
+
+    # ----- Building ------------------------- #
+
+    def rebuild(self):
+        """Labels every cell from scratch, one row of runs at a time"""
+        grid = self.grid
+        width = grid.width
+        free = bytes(grid.cells).translate(_FREE)
+
+        # Runs of free cells are unioned with the runs they touch in the row
+        # above, diagonally included
+        runParent = []
+        runs = []  # (first cell, end cell, run)
+        above = []
+        for y in range(grid.height):
+            offset = y * width
+            row = []
+            j = 0
+            x = free.find(1, offset, offset + width)
+            while x != -1:
+                end = free.find(0, x, offset + width)
+                if end == -1:
+                    end = offset + width
+                run = len(runParent)
+                runParent.append(run)
+                # Runs above that reach from x - 1 to end, one row up
+                left = x - width - 1
+                right = end - width + 1
+                while j < len(above) and above[j][1] <= left:
+                    j += 1
+                k = j
+                while k < len(above) and above[k][0] < right:
+                    _union(runParent, above[k][2], run)
+                    k += 1
+                row.append((x, end, run))
+                x = free.find(1, end, offset + width)
+            runs.extend(row)
+            above = row
+
+        self.labels = array("i", [-1]) * (width * grid.height)
+        self._parent = []
+        self._size = []
+        ids = {}
+        labels = self.labels
+        for first, end, run in runs:
+            root = _find(runParent, run)
+            label = ids.get(root)
+            if label is None:
+                label = ids[root] = len(self._parent)
+                self._parent.append(label)
+                self._size.append(0)
+            labels[first:end] = array("i", [label]) * (end - first)
+            self._size[label] += end - first
+        self.version = grid.version
+
+    # ----- Queries -------------------------- #
+
+    def component(self, x, y):
+        """Id of the component of cell (x, y), or None for a wall"""
+        if self.grid.version != self.version:
+            self.rebuild()
+        label = self.labels[self.grid.index(x, y)]
+        if label == -1:
+            return None
+        return _find(self._parent, label)
+
+    def connected(self, start, dest):
+        """Whether any path joins two cells"""
+        a = self.component(*start)
+        return a is not None and a == self.component(*dest)
+
+    def size(self, x, y):
+        """Number of cells in the component of cell (x, y), 0 for a wall"""
+        label = self.component(x, y)
+        return 0 if label is None else self._size[label]
+
+    def count(self):
+        """Number of components"""
+        if self.grid.version != self.version:
+            self.rebuild()
+        parent = self._parent
+        return sum(
+            1
+            for label in range(len(parent))
+            if parent[label] == label and self._size[label] > 0
+        )
+
+    # ----- Updates -------------------------- #
+
+    def cell_changed(self, x, y):
+        """Brings the labels up to date after cell (x, y) changed"""
+        grid = self.grid
+        i = grid.index(x, y)
+        wall = grid.cells[i] == WALL
+        if wall != (self.labels[i] == -1):
+            if wall:
+                self._add_wall(i)
+            else:
+                self._remove_wall(i)
+        self.version = grid.version
+
+    def _neighbors(self, i):
+        """Free cells around cell i"""
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        labels = self.labels
+        x = i % width
+        y = i // width
+        for dx, dy, _ in DIRECTIONS:
+            nx = x + dx
+            ny = y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                neighbor = ny * width + nx
+                if labels[neighbor] != -1:
+                    yield neighbor
+
+    def _remove_wall(self, i):
+        parent = self._parent
+        size = self._size
+        roots = {_find(parent, self.labels[n]) for n in self._neighbors(i)}
+        if not roots:
+            label = len(parent)
+            parent.append(label)
+            size.append(0)
+        else:
+            # Merge into the biggest, so paths through the union stay short
+            label = max(roots, key=size.__getitem__)
+            for root in roots:
+                if root != label:
+                    parent[root] = label
+                    size[label] += size[root]
+        self.labels[i] = label
+        size[label] += 1
+
+    def _add_wall(self, i):
+        labels = self.labels
+        old = _find(self._parent, labels[i])
+        labels[i] = -1
+        self._size[old] -= 1
+
+        starts = self._ring_groups(i)
+        if len(starts) <= 1:
+            return  # Everything around is still joined around the wall
+
+        # One search per group, taking turns. owner[cell] is the search
+        # that reached it, merged through searchParent when two meet.
+        count = len(starts)
+        searchParent = list(range(count))
+        queues = [deque([cell]) for cell in starts]
+        reached = [[cell] for cell in starts]
+        owner = {cell: s for s, cell in enumerate(starts)}
+        live = count  # Merged groups still searching
+        while live > 1:
+            for s in range(count):
+                if searchParent[s] != s or not queues[s]:
+                    continue
+                current = queues[s].popleft()
+                for neighbor in self._neighbors(current):
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = s
+                        reached[s].append(neighbor)
+                        queues[s].append(neighbor)
+                        continue
+                    other = _find(searchParent, other)
+                    if other != s:
+                        # Two groups met, they are one piece
+                        searchParent[other] = s
+                        queues[s].extend(queues[other])
+                        reached[s].extend(reached[other])
+                        queues[other] = reached[other] = None
+                        live -= 1
+                if not queues[s] and live > 1:
+                    # Ran out without meeting the rest, a piece of its own
+                    self._relabel(old, reached[s])
+                    searchParent[s] = -1
+                    live -= 1
+                if live <= 1:
+                    break
+
+    def _ring_groups(self, i):
+        """One free cell from each group of joined free cells around cell i"""
+        grid = self.grid
+        width = grid.width
+        x = i % width
+        y = i // width
+        ring = []
+        for dx, dy in _RING:
+            nx = x + dx
+            ny = y + dy
+            free = grid.in_bounds(nx, ny) and self.labels[ny * width + nx] != -1
+            ring.append(ny * width + nx if free else -1)
+
+        groupParent = list(range(8))
+        for place in range(8):
+            if ring[place] == -1:
+                continue
+            joined = [(place + 1) % 8]
+            if place % 2:
+                joined.append((place + 2) % 8)
+            for other in joined:
+                if ring[other] != -1:
+                    _union(groupParent, place, other)
+        starts = {}
+        for place in range(8):
+            if ring[place] != -1:
+                starts.setdefault(_find(groupParent, place), ring[place])
+        return list(starts.values())
+
+    def _relabel(self, old, cells):
+        label = len(self._parent)
+        self._parent.append(label)
+        self._size.append(len(cells))
+        self._size[old] -= len(cells)
+        labels = self.labels
+        for cell in cells:
+            labels[cell] = label
+        self.splits += 1
+
+
+def _find(parent, i):
+    """Root of i in a union-find list, halving the path on the way"""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent, a, b):
+    a = _find(parent, a)
+    b = _find(parent, b)
+    if a != b:
+        parent[b] = a
@@ -0,0 +1,107 @@
+"""
+Reusable search state.
+
+A SearchContext holds the per-cell arrays a search needs, indexed by cell
+id (y * width + x):
+
+    g       float32  cost of the cheapest known path from the start
+    parent  int32    the cell before it on that path, -1 for the start
+    seen    byte     generation in which g and parent were last written
+    closed  byte     generation in which the cell was expanded
+
+Instead of clearing the arrays between queries, each query bumps the
+generation counter. A value only counts when its stamp matches the
+current generation, so starting a new query is O(1). Stamps are one byte,
+so every 255 queries the stamps are zeroed once and the counter restarts.
+"""
+
+from array import array
+from contextlib import contextmanager
+from threading import Lock
+
+MAX_GENERATION = 255
+
+
+class SearchContext:
+    """
+    Preallocated search arrays for grids of a given number of cells.
+
+    Usage:
+        context = SearchContext(grid.width * grid.height)
+        gen = context.begin()
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.g = array("f", bytes(4 * size))
+        self.parent = array("i", bytes(4 * size))
+        self.seen = bytearray(size)
+        self.closed = bytearray(size)
+        self.generation = 0
+
+    def begin(self):
+        """Starts a new query and returns its generation"""
+        self.generation += 1
+        if self.generation > MAX_GENERATION:
+            self.seen[:] = bytes(self.size)
+            self.closed[:] = bytes(self.size)
+            self.generation = 1
+        return self.generation
+
+    def path_to(self, i, grid):
+        """
+        Follows parents back from cell i to the start.
+        Returns a list of (x, y) tuples from the start to i.
+        """
+        parent = self.parent
+        width = grid.width
+        path = []
+        while i != -1:
+            path.append((i % width, i // width))
+            i = parent[i]
+        path.reverse()
+        return path
+
+
+class ContextPool:
+    """
+    Hands out SearchContexts so repeated queries reuse the same arrays
+    instead of allocating new ones. Safe to share between threads.
+
+    Usage:
+        with pool.context(size) as context:
+            ...
+    """
+
+    def __init__(self, limit=4):
+        self.limit = limit  # Idle contexts kept per size
+        self._free = {}
+        self._lock = Lock()
+
+    def acquire(self, size):
+        with self._lock:
+            free = self._free.get(size)
+            if free:
+                return free.pop()
+        return SearchContext(size)
+
+    def release(self, context):
+        with self._lock:
+            free = self._free.setdefault(context.size, [])
+            if len(free) < self.limit:
+                free.append(context)
+
+    @contextmanager
+    def context(self, size):
+        context = self.acquire(size)
+        try:
+            yield context
+        finally:
+            self.release(context)
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+
+
+POOL = ContextPool()  # Shared by searches that are not given a context
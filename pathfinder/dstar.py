@@ -0,0 +1,286 @@
+"""
+Incremental replanning with D* Lite.
+
+D* Lite searches backwards from the destination and keeps its g-values
+between calls. When cells change, only the cells around them are put back
+on the queue, and the next plan repairs the g-values that actually
+changed instead of searching from scratch. The start may also move
+between plans, as it would for a unit walking the path.
+
+Costs are the grid's usual 1 and sqrt(2). A move into or out of a wall
+costs infinity, so it is skipped wherever neighbors are read.
+
+g and rhs live in flat lists indexed by cell id. When a cell's g drops,
+each neighbor's rhs is only compared against it. When it rises, only the
+neighbors whose rhs came through it look at all their neighbors again.
+Each expansion costs about what an A* expansion does, so a repair that
+expands a fraction of the cells is that much faster than planning anew.
+
+Based on: Koenig & Likhachev, "D* Lite" (AAAI 2002), optimized version.
+"""
+
+from heapq import heappop, heappush
+from math import inf as INFINITY
+
+from .grid import WALL, as_grid
+from .heuristics import Octile
+from .search import DIRECTIONS, NOT_FOUND, SQRT2, SearchResult
+from .stats import SearchStats, clock
+
+_OCTILE = Octile()
+_DIAGONAL = SQRT2 - 2  # Octile Dist is dx + dy + _DIAGONAL * min(dx, dy)
+
+EPSILON = 1e-6  # Keys closer than this count as equal
+
+
+class DStarLite:
+    """
+    A planner for one destination that keeps its search between plans.
+
+    Usage:
+        planner = DStarLite(grid, start, dest)
+        result = planner.find_path()
+        grid.set(5, 5, "#")
+        planner.cell_changed(5, 5)
+        result = planner.find_path()  # Only repairs around (5, 5)
+    """
+
+    def __init__(self, grid, start, dest):
+        self.grid = as_grid(grid)
+        self.start = self.grid.index(*start)
+        self.dest = self.grid.index(*dest)
+        self.km = 0.0  # Key modifier, grows as the start moves
+
+        # g and rhs per cell, flat and indexed by cell id like SearchContext
+        size = self.grid.width * self.grid.height
+        self.g = [INFINITY] * size
+        self.rhs = [INFINITY] * size
+        self.rhs[self.dest] = 0.0
+        # The queue is a heap of (k1, k2, cell) with lazy deletion.
+        # queued[u] is u's live entry, or None, and entries that aren't
+        # their cell's live one are skipped.
+        self.queue = []
+        self.queued = [None] * size
+        self.pushes = 0  # Queue pushes since creation
+        self._push(self.dest)
+
+        self.cycles = 0  # Expansions in the most recent plan
+        self.stats = SearchStats("D* Lite")  # Counters of the most recent plan
+
+    # ----- Helpers -------------------------- #
+
+    def _h(self, i):
+        """Octile distance from the start to cell i"""
+        width = self.grid.width
+        dx = abs(i % width - self.start % width)
+        dy = abs(i // width - self.start // width)
+        return dx + dy + _DIAGONAL * (dx if dx < dy else dy)
+
+    def _push(self, i):
+        """Queues cell i with its current key"""
+        g = self.g[i]
+        rhs = self.rhs[i]
+        best = g if g < rhs else rhs
+        entry = (best + self._h(i) + self.km, best, i)
+        self.pushes += 1
+        self.queued[i] = entry
+        heappush(self.queue, entry)
+
+    def _update(self, i):
+        """Recalculates rhs for a cell from all its neighbors, and requeues it"""
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        cells = grid.cells
+        if i != self.dest:
+            best = INFINITY
+            if cells[i] != WALL:
+                g = self.g
+                x = i % width
+                y = i // width
+                for dx, dy, cost in DIRECTIONS:
+                    nx = x + dx
+                    ny = y + dy
+                    if 0 <= nx < width and 0 <= ny < height:
+                        neighbor = ny * width + nx
+                        if cells[neighbor] != WALL and cost + g[neighbor] < best:
+                            best = cost + g[neighbor]
+            self.rhs[i] = best
+        if self.g[i] != self.rhs[i]:
+            self._push(i)
+        else:
+            self.queued[i] = None
+
+    # ----- Planning ------------------------- #
+
+    def cell_changed(self, x, y):
+        """
+        Tells the planner a cell became or stopped being a wall.
+        Every edge touching it changed cost, so it and its neighbors are
+        brought up to date.
+        """
+        width = self.grid.width
+        height = self.grid.height
+        self._update(y * width + x)
+        for dx, dy, _ in DIRECTIONS:
+            nx = x + dx
+            ny = y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                self._update(ny * width + nx)
+
+    def move_start(self, start):
+        """Moves the start, keeping the search so far"""
+        i = self.grid.index(*start)
+        if i == self.start:
+            return
+        self.km += self._h(i)  # h between the old start and the new one
+        self.start = i
+
+    def compute(self):
+        """
+        Expands cells until the start's g-value is settled.
+        Returns the number of expansions, and leaves the counters in stats.
+        """
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        cells = grid.cells
+        g = self.g
+        rhs = self.rhs
+        queue = self.queue
+        queued = self.queued
+        km = self.km
+        start = self.start
+        startX = start % width
+        startY = start // width
+        dest = self.dest
+        cycles = 0
+        generated = 0
+        pushes = self.pushes
+        peakOpen = len(queue)
+        reopened = 0
+        while queue:
+            entry = queue[0]
+            if queued[entry[2]] is not entry:
+                heappop(queue)
+                continue
+            k1, k2, u = entry
+            # Keys that tie with the start's are expanded too. In floats
+            # a sum like g + h can land a hair above the start's key, and
+            # stopping there could leave a stale g-value on the path.
+            startG = g[start]
+            startRhs = rhs[start]
+            if k1 > min(startG, startRhs) + km + EPSILON and startRhs == startG:
+                break
+            heappop(queue)
+            queued[u] = None
+            cycles += 1
+
+            oldG = g[u]
+            best = oldG if oldG < rhs[u] else rhs[u]
+            x = u % width
+            y = u // width
+            dx = abs(x - startX)
+            dy = abs(y - startY)
+            # The same sums as _push(), so an unchanged key compares equal
+            h = dx + dy + _DIAGONAL * (dx if dx < dy else dy)
+            newK1 = best + h + km
+            if (k1, k2) < (newK1, best):
+                self._push(u)  # Key was out of date
+                continue
+
+            blocked = cells[u] == WALL
+            if oldG > rhs[u]:
+                # Overconsistent: settle g, and offer it to the neighbors
+                newG = g[u] = rhs[u]
+                for dx, dy, cost in DIRECTIONS:
+                    nx = x + dx
+                    ny = y + dy
+                    if not (0 <= nx < width and 0 <= ny < height):
+                        continue
+                    generated += 1
+                    neighbor = ny * width + nx
+                    if blocked or neighbor == dest or cells[neighbor] == WALL:
+                        continue
+                    tentative = newG + cost
+                    if tentative < rhs[neighbor]:
+                        rhs[neighbor] = tentative
+                        if g[neighbor] != tentative:
+                            self._push(neighbor)
+                        else:
+                            queued[neighbor] = None
+            else:
+                # Underconsistent, settled too low before: neighbors whose
+                # rhs came through it look for another way
+                g[u] = INFINITY
+                reopened += 1
+                self._update(u)
+                for dx, dy, cost in DIRECTIONS:
+                    nx = x + dx
+                    ny = y + dy
+                    if not (0 <= nx < width and 0 <= ny < height):
+                        continue
+                    generated += 1
+                    neighbor = ny * width + nx
+                    if blocked or cells[neighbor] == WALL:
+                        continue
+                    if rhs[neighbor] == oldG + cost:
+                        self._update(neighbor)
+            if len(queue) > peakOpen:
+                peakOpen = len(queue)
+        pushes = self.pushes - pushes
+        self.cycles = cycles
+        self.stats = SearchStats(
+            "D* Lite",
+            _OCTILE.name,
+            expanded=cycles,
+            generated=generated,
+            pushes=pushes,
+            reopened=reopened,
+            peak_open=peakOpen,
+            heuristic_evals=pushes,  # One key per push
+        )
+        return cycles
+
+    def find_path(self, start=None):
+        """
+        Plans from the start, or from a new start if given, to the
+        destination. Returns a SearchResult, with cycles counting the
+        expansions this plan needed.
+        """
+        started = clock()
+        if start is not None:
+            self.move_start(start)
+        self.compute()
+
+        g = self.g
+        current = self.start
+        if g[current] == INFINITY:
+            return SearchResult.finish(self.stats, started, reason=NOT_FOUND)
+
+        # Walk downhill on g from the start
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        cells = grid.cells
+        path = [grid.coords(current)]
+        limit = width * height
+        while current != self.dest and len(path) <= limit:
+            x = current % width
+            y = current // width
+            best = INFINITY
+            for dx, dy, cost in DIRECTIONS:
+                nx = x + dx
+                ny = y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    neighbor = ny * width + nx
+                    if cells[neighbor] != WALL and cost + g[neighbor] < best:
+                        best = cost + g[neighbor]
+                        current = neighbor
+            if best == INFINITY:
+                break
+            path.append(grid.coords(current))
+        if current != self.dest:
+            # Stuck, or going round in circles: g no longer fits the grid
+            return SearchResult.finish(self.stats, started, reason=NOT_FOUND)
+        return SearchResult.finish(self.stats, started, path)
@@ -0,0 +1,203 @@
+"""
+Flow fields, for many units heading to one destination.
+
+A FlowField holds the distance from every cell to the destination and
+the first move towards it, both built in one go. Any start can then read
+its path in O(path length), with no search at all.
+
+Costs are the grid's usual 1 and sqrt(2), so distances match A* with
+Octile Dist exactly. The field is built with chamfer-style NumPy sweeps:
+passes run down, up, right and left across the grid, and each row (or
+column) is relaxed from the one before it, then along itself both ways
+with a running minimum that restarts at each wall. One round of passes
+settles every path that doubles back at most once in each axis, so open
+and lightly cluttered maps take a few rounds, and mazes one per switchback.
+
+Usage:
+    field = FlowField(grid, (49, 49))
+    result = field.path_from((0, 0))
+    field.distance[grid.index(3, 4)], field.next_step(3, 4)
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from .grid import WALL, as_grid
+from .search import DIRECTIONS, NOT_FOUND, SQRT2, SearchResult
+from .stats import SearchStats, clock, record
+
+NO_MOVE = -1  # direction of the destination, walls and unreachable cells
+
+TOLERANCE = 1e-6  # Smaller improvements count as settled
+
+
+class FlowField:
+    """
+    Distance and direction fields towards one destination.
+
+    distance is a flat float32 array indexed by cell id, inf where the
+    destination can't be reached. direction holds the index into
+    DIRECTIONS of the best first move, or NO_MOVE.
+    """
+
+    def __init__(self, grid, dest):
+        oldtime = perf_counter()
+        self.grid = as_grid(grid)
+        self.dest = tuple(dest)
+        self.version = self.grid.version
+
+        width = self.grid.width
+        height = self.grid.height
+        free = np.frombuffer(self.grid.cells, dtype=np.uint8) != WALL
+        dist, self.sweeps = _distances(width, height, free, self.grid.index(*dest))
+        self.direction = _directions(width, height, dist)
+
+        reached = np.isfinite(dist)
+        self.distance = dist.astype(np.float32)
+        self.max_distance = float(dist[reached].max()) if reached.any() else 0.0
+        self.ms = round((perf_counter() - oldtime) * 1000)
+
+    @property
+    def current(self):
+        """False once walls have changed since the field was built"""
+        return self.grid.version == self.version
+
+    def next_step(self, x, y):
+        """The cell to move to from (x, y), or None at the destination"""
+        move = self.direction[self.grid.index(x, y)]
+        if move == NO_MOVE:
+            return None
+        dx, dy, _ = DIRECTIONS[move]
+        return (x + dx, y + dy)
+
+    def path_from(self, start):
+        """
+        Reads the path from start by following the field.
+        Returns a SearchResult, with cycles counting the steps taken.
+        Its stats time the walk only, and carry the field's sweeps and
+        build_ms as extras.
+        """
+        started = clock()
+        stats = SearchStats(
+            "Flow Field",
+            "Octile Dist",
+            extra={"sweeps": self.sweeps, "build_ms": self.ms},
+        )
+        x, y = start
+        if self.distance[self.grid.index(x, y)] == np.inf:
+            record(stats, started)
+            return SearchResult(None, 0, round(stats.wall_ms), NOT_FOUND, stats)
+
+        path = [(x, y)]
+        step = self.next_step(x, y)
+        while step is not None:
+            path.append(step)
+            step = self.next_step(*step)
+        record(stats, started)
+        return SearchResult(path, len(path) - 1, round(stats.wall_ms), stats=stats)
+
+
+# ----- Building ------------------------- #
+
+
+def _large(width, height):
+    """Stands in for infinity, more than any path can cost"""
+    return SQRT2 * width * height + 1.0
+
+
+def _distances(width, height, free, dest):
+    """
+    Distance to dest for every cell, inf if unreachable, and how many
+    rounds of sweeps it took.
+    """
+    large = _large(width, height)
+    free = free.reshape(height, width)
+    dist = np.full((height, width), large)
+    dist.flat[dest] = 0.0
+    dist[~free] = large
+
+    # Passes down and up work on rows, passes right and left on columns,
+    # through a transposed view of the same array
+    rows = _Sweep(dist, free, large)
+    columns = _Sweep(dist.T, free.T, large)
+
+    rounds = 0
+    changed = True
+    while changed:
+        rounds += 1
+        changed = rows.sweep(range(height))
+        changed |= rows.sweep(range(height - 1, -1, -1))
+        changed |= columns.sweep(range(width))
+        changed |= columns.sweep(range(width - 1, -1, -1))
+
+    dist = dist.ravel()
+    # Rounding can leave unreachable cells a hair under large, while
+    # real distances are well below it
+    dist[dist > large - 1.0] = np.inf
+    return dist, rounds
+
+
+class _Sweep:
+    """Relaxes the lines of a 2D array one after another"""
+
+    def __init__(self, dist, free, large):
+        self.dist = dist
+        self.free = free
+        self.large = large
+        # Running minimums along a line restart at walls by lowering each
+        # later stretch by this much, more than any distance, so nothing
+        # before the wall can win
+        stretch = large + dist.shape[1]
+        steps = np.arange(dist.shape[1])
+        self.forward = steps + np.cumsum(~free, axis=1) * stretch
+        self.backward = steps + np.cumsum(~free[:, ::-1], axis=1) * stretch
+
+    def sweep(self, order):
+        """
+        Relaxes each line from the one before it in order, then along
+        itself both ways. Returns whether anything got shorter.
+        """
+        dist = self.dist
+        changed = False
+        previous = None
+        for i in order:
+            old = dist[i]
+            line = old.copy()
+            if previous is not None:
+                before = dist[previous]
+                np.minimum(line, before + 1.0, out=line)
+                np.minimum(line[1:], before[:-1] + SQRT2, out=line[1:])
+                np.minimum(line[:-1], before[1:] + SQRT2, out=line[:-1])
+            line[~self.free[i]] = self.large
+
+            offset = self.forward[i]
+            np.minimum(line, np.minimum.accumulate(line - offset) + offset, out=line)
+            line = line[::-1]
+            offset = self.backward[i]
+            np.minimum(line, np.minimum.accumulate(line - offset) + offset, out=line)
+            line = line[::-1]
+
+            if not changed and (old - line).max() > TOLERANCE:
+                changed = True
+            dist[i] = line
+            previous = i
+        return changed
+
+
+def _directions(width, height, dist):
+    """Index into DIRECTIONS of the cheapest move from every cell"""
+    padded = np.full((height + 2, width + 2), np.inf)
+    padded[1:-1, 1:-1] = dist.reshape(height, width)
+    moves = np.stack(
+        [
+            padded[1 + dy : 1 + dy + height, 1 + dx : 1 + dx + width] + cost
+            for dx, dy, cost in DIRECTIONS
+        ]
+    )
+    here = padded[1:-1, 1:-1]
+    best = moves.argmin(axis=0).astype(np.int8)
+    # Only cells that are reached, and not the destination itself, move
+    moving = np.isfinite(here) & (moves.min(axis=0) <= here + TOLERANCE)
+    moving &= here > 0
+    return np.where(moving, best, NO_MOVE).astype(np.int8).ravel()
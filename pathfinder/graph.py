@@ -0,0 +1,397 @@
+"""
+Graphs compiled to compressed sparse rows (CSR).
+
+A Graph holds every node's outgoing edges in three flat arrays, so a
+search reads a node's neighbors by walking a slice, with no per-node
+allocation and no bounds or wall checks:
+
+    offsets  int32    where node n's row starts in targets and costs
+    degrees  int32    how many edges node n has
+    targets  int32    the node each edge leads to
+    costs    float32  the cost of each edge
+
+Rows can hold more edges than they have, up to capacity[n]. A grid
+compiles with room for all 8 moves in every row, so an edit only rewrites
+the rows of the changed cell and its neighbors in place. An edit that
+outgrows a row moves just that row to the end of the arrays.
+
+Graphs can be compiled from a Grid, with the same moves and costs the grid
+searches use, or built from any list of edges, like an imported navmesh or
+road network. Node ids of a compiled grid are its cell ids, y * width + x,
+and (x, y) tuples are accepted wherever a node is. Other graphs can be
+given coordinates per node for heuristics; without them only Dijkstra can
+search them. Heuristics must not overestimate the edge costs, or paths are
+no longer optimal.
+
+a_star() runs on graphs too, so the same search serves both:
+
+Usage:
+    graph = Graph.from_grid(grid)
+    result = a_star(graph, (0, 0), (49, 49), "Octile Dist")
+    grid.set(5, 5, "#")
+    graph.cell_changed(5, 5)
+
+    roads = Graph.from_edges(3, [(0, 1, 2.5), (1, 2, 1.0)], directed=False)
+    a_star(roads, 0, 2, "Dijkstra").path  # [0, 1, 2]
+"""
+
+from array import array
+from heapq import heappop, heappush
+
+from .context import POOL
+from .grid import WALL, as_grid
+from .heuristics import Zero, get_heuristic
+from .search import (
+    CLOSED,
+    DIRECTIONS,
+    NOT_FOUND,
+    OPENED,
+    REPARENTED,
+    TOO_LONG,
+    SearchResult,
+)
+from .stats import SearchStats, clock
+
+ROW = len(DIRECTIONS)  # Capacity of every row of a compiled grid
+
+
+class Graph:
+    """
+    A directed graph in CSR form, see the module docstring.
+
+    Build one with from_grid() or from_edges().
+    """
+
+    def __init__(self, size, coords=None):
+        if coords is not None and len(coords) != size:
+            raise ValueError(f"Expected {size} coordinates, got {len(coords)}")
+        self.size = size
+        self.coords = coords  # (x, y) per node, for heuristics
+        self.offsets = array("i", bytes(4 * size))
+        self.degrees = array("i", bytes(4 * size))
+        self.capacity = array("i", bytes(4 * size))
+        self.targets = array("i")
+        self.costs = array("f")
+        self.grid = None  # The grid it was compiled from, if any
+        self.width = None
+        self.height = None
+        self.version = None  # Grid version the rows match
+        self._field = None  # (key, h-field) of the last coordinates field
+
+    # ----- Building ------------------------- #
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Compiles a grid, with the moves and costs of DIRECTIONS"""
+        grid = as_grid(grid)
+        graph = cls(grid.width * grid.height)
+        graph.grid = grid
+        graph.width = grid.width
+        graph.height = grid.height
+        graph.rebuild()
+        return graph
+
+    @classmethod
+    def from_edges(cls, size, edges, coords=None, directed=True):
+        """
+        Builds a graph of size nodes from (source, target, cost) edges.
+        Unless directed, every edge also goes back the other way.
+        """
+        rows = [[] for _ in range(size)]
+        for source, target, cost in edges:
+            if not (0 <= source < size and 0 <= target < size):
+                raise ValueError(f"Edge {source} -> {target} is outside 0..{size - 1}")
+            if cost < 0:
+                raise ValueError(f"Edge {source} -> {target} has negative cost {cost}")
+            rows[source].append((target, cost))
+            if not directed:
+                rows[target].append((source, cost))
+
+        graph = cls(size, coords)
+        offset = 0
+        for node, row in enumerate(rows):
+            graph.offsets[node] = offset
+            graph.degrees[node] = graph.capacity[node] = len(row)
+            offset += len(row)
+        graph.targets = array("i", (target for row in rows for target, _ in row))
+        graph.costs = array("f", (cost for row in rows for _, cost in row))
+        return graph
+
+    def rebuild(self):
+        """Compiles the grid again from scratch, one NumPy pass per move"""
+        import numpy as np
+
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        size = width * height
+        free = np.frombuffer(grid.cells, dtype=np.uint8).reshape(height, width) != WALL
+        padded = np.zeros((height + 2, width + 2), dtype=bool)
+        padded[1:-1, 1:-1] = free
+        ids = np.arange(size, dtype=np.int32)
+
+        # Every row has ROW slots; valid moves fill the first ones, in the
+        # order of DIRECTIONS
+        targets = np.full(size * ROW, -1, dtype=np.int32)
+        costs = np.zeros(size * ROW, dtype=np.float32)
+        degrees = np.zeros(size, dtype=np.int32)
+        for dx, dy, cost in DIRECTIONS:
+            ok = free & padded[1 + dy : 1 + dy + height, 1 + dx : 1 + dx + width]
+            ok = ok.ravel()
+            slots = ids[ok] * ROW + degrees[ok]
+            targets[slots] = ids[ok] + dy * width + dx
+            costs[slots] = cost
+            degrees += ok
+
+        self.offsets = array("i", (ids * ROW).tobytes())
+        self.degrees = array("i", degrees.tobytes())
+        self.capacity = array("i", [ROW]) * size
+        self.targets = array("i", targets.tobytes())
+        self.costs = array("f", costs.tobytes())
+        self.version = grid.version
+
+    # ----- Nodes and rows ------------------- #
+
+    def node(self, point):
+        """Node id of a node id, or of an (x, y) cell of a compiled grid"""
+        if isinstance(point, tuple):
+            if self.grid is None:
+                raise ValueError(f"Graph has no grid, {point} is not a node id")
+            return self.grid.index(*point)
+        if not 0 <= point < self.size:
+            raise ValueError(f"Node {point} is outside 0..{self.size - 1}")
+        return point
+
+    def edges(self, node):
+        """(target, cost) of every edge leaving a node"""
+        offset = self.offsets[node]
+        end = offset + self.degrees[node]
+        return list(zip(self.targets[offset:end], self.costs[offset:end]))
+
+    def set_edges(self, node, edges):
+        """
+        Replaces the edges leaving a node with (target, cost) pairs.
+        Only that node's row is written.
+        """
+        edges = list(edges)
+        count = len(edges)
+        if count > self.capacity[node]:
+            # Outgrew its slots, move the row to the end
+            self.offsets[node] = len(self.targets)
+            self.capacity[node] = count
+            self.targets.extend(array("i", bytes(4 * count)))
+            self.costs.extend(array("f", bytes(4 * count)))
+        offset = self.offsets[node]
+        for k, (target, cost) in enumerate(edges):
+            self.targets[offset + k] = target
+            self.costs[offset + k] = cost
+        self.degrees[node] = count
+
+    def add_edge(self, source, target, cost):
+        """Adds an edge, or changes its cost if there already is one"""
+        source = self.node(source)
+        target = self.node(target)
+        edges = [edge for edge in self.edges(source) if edge[0] != target]
+        edges.append((target, cost))
+        self.set_edges(source, edges)
+
+    def remove_edge(self, source, target):
+        source = self.node(source)
+        target = self.node(target)
+        self.set_edges(
+            source, [edge for edge in self.edges(source) if edge[0] != target]
+        )
+
+    def cell_changed(self, x, y):
+        """
+        Brings a compiled grid up to date after cell (x, y) changed, by
+        rewriting the rows of the cell and the cells around it.
+        """
+        grid = self.grid
+        self._patch(x, y)
+        for dx, dy, _ in DIRECTIONS:
+            if grid.in_bounds(x + dx, y + dy):
+                self._patch(x + dx, y + dy)
+        self.version = grid.version
+
+    def _patch(self, x, y):
+        grid = self.grid
+        width = grid.width
+        cells = grid.cells
+        edges = []
+        if cells[y * width + x] != WALL:
+            for dx, dy, cost in DIRECTIONS:
+                nx = x + dx
+                ny = y + dy
+                if grid.in_bounds(nx, ny) and cells[ny * width + nx] != WALL:
+                    edges.append((ny * width + nx, cost))
+        self.set_edges(y * width + x, edges)
+
+    # ----- Searching ------------------------ #
+
+    def field(self, method, dest):
+        """
+        h for every node towards node dest, indexed by node id. Grids read
+        it through method.lookup(), other graphs build it from their
+        coordinates.
+        """
+        if self.grid is not None:
+            return method.lookup(self.width, self.height, self.grid.coords(dest))
+        if self.coords is None:
+            if not isinstance(method, Zero):
+                raise ValueError(
+                    f"Graph has no coordinates for {method.name}, use Dijkstra"
+                )
+            return memoryview(array("f", bytes(4 * self.size)))
+
+        key = (method.name or id(method), dest)
+        if self._field is None or self._field[0] != key:
+            import numpy as np
+
+            xs, ys = np.asarray(self.coords, dtype=np.float64).T
+            h = method.distance(np.abs(xs - xs[dest]), np.abs(ys - ys[dest]))
+            self._field = (key, memoryview(h.astype(np.float32)))
+        return self._field[1]
+
+    def path_to(self, context, i):
+        """
+        Follows parents back from node i. Returns node ids, or (x, y)
+        tuples for a compiled grid, from the start to i.
+        """
+        if self.grid is not None:
+            return context.path_to(i, self.grid)
+        parent = context.parent
+        path = []
+        while i != -1:
+            path.append(i)
+            i = parent[i]
+        path.reverse()
+        return path
+
+
+def graph_steps(
+    graph,
+    start,
+    dest,
+    method="Octile Dist",
+    dynamic_weight=False,
+    optimality_bound=10,
+    context=None,
+    events=None,
+):
+    """
+    a_star_steps() on a Graph. Paths on graphs that are not grids are
+    lists of node ids, and their cost is in stats.extra["cost"].
+    """
+    method = get_heuristic(method)
+    if graph.grid is not None and graph.grid.version != graph.version:
+        graph.rebuild()  # The grid changed without cell_changed()
+    args = (method, dynamic_weight, optimality_bound)
+    startID = graph.node(start)
+    destID = graph.node(dest)
+    if context is None:
+        with POOL.context(graph.size) as context:
+            return (yield from _search(graph, startID, destID, *args, context, events))
+    return (yield from _search(graph, startID, destID, *args, context, events))
+
+
+def _search(
+    graph, startID, destID, method, dynamic_weight, optimality_bound, context, events
+):
+    # a_star()'s loop, reading neighbors from the CSR rows
+    started = clock()
+    offsets = graph.offsets
+    degrees = graph.degrees
+    targets = graph.targets
+    costs = graph.costs
+    hField = graph.field(method, destID)
+
+    gScore = context.g
+    cameFrom = context.parent
+    seen = context.seen
+    closedSet = context.closed
+    gen = context.begin()
+
+    seen[startID] = gen
+    gScore[startID] = 0
+    cameFrom[startID] = -1
+
+    startH = hField[startID]
+    openSet = [(startH, startH, startID)]
+
+    cycles = 0
+    generated = 0
+    pushes = 1
+    peakOpen = 1
+
+    emit = events.append if events is not None else None
+    if emit is not None:
+        emit((OPENED, startID, -1))
+
+    while openSet:
+        current = heappop(openSet)[2]
+        if closedSet[current] == gen:
+            continue
+        closedSet[current] = gen
+        if emit is not None:
+            emit((CLOSED, current, cameFrom[current]))
+
+        if current == destID:
+            path = graph.path_to(context, current)
+            stats = _stats(method, cycles, generated, pushes, peakOpen)
+            stats.extra["cost"] = float(gScore[current])
+            return SearchResult.finish(stats, started, path)
+
+        currentG = gScore[current]
+        offset = offsets[current]
+        generated += degrees[current]
+        for k in range(offset, offset + degrees[current]):
+            neighbor = targets[k]
+            if closedSet[neighbor] == gen:
+                continue
+            tempG = currentG + costs[k]
+            if seen[neighbor] != gen or tempG < gScore[neighbor]:
+                pushes += 1
+                if emit is not None:
+                    kind = OPENED if seen[neighbor] != gen else REPARENTED
+                    emit((kind, neighbor, current))
+                seen[neighbor] = gen
+                cameFrom[neighbor] = current
+                gScore[neighbor] = tempG
+                tempH = hField[neighbor]
+                if not dynamic_weight or tempH > tempG:
+                    tempF = tempG + tempH
+                else:
+                    w = optimality_bound
+                    tempF = (tempG + (2 * w - 1) * tempH) / w
+                heappush(openSet, (tempF, tempH, neighbor))
+
+        if len(openSet) > peakOpen:
+            peakOpen = len(openSet)
+        cycles += 1
+        if cycles > graph.size * 10:
+            return SearchResult.finish(
+                _stats(method, cycles, generated, pushes, peakOpen),
+                started,
+                reason=TOO_LONG,
+            )
+
+        yield context, current
+
+    return SearchResult.finish(
+        _stats(method, cycles, generated, pushes, peakOpen), started, reason=NOT_FOUND
+    )
+
+
+def _stats(method, cycles, generated, pushes, peakOpen):
+    return SearchStats(
+        "A*",
+        method.name,
+        extra={"graph": True},
+        expanded=cycles,
+        generated=generated,
+        pushes=pushes,
+        peak_open=peakOpen,
+        heuristic_evals=pushes,
+        duplicates=generated - (pushes - 1),
+    )
@@ -0,0 +1,203 @@
+"""
+Array-backed grid.
+
+Cells are stored one byte each in a flat bytearray, row by row, so cell
+(x, y) lives at index y * width + x. Any width and height works. Any
+other writable buffer of bytes also works, like shared memory or a memory
+mapped file, see pathfinder.gridfile.
+
+version counts the edits that can change a search result, that is cells
+becoming or stopping being walls, and whole-grid loads. Caches use it to
+tell whether what they hold is still current.
+
+Cell codes:
+    EMPTY = 0  "."  Empty space
+    WALL  = 1  "#"  Wall/Barrier
+    START = 2  "O"  Start
+    DEST  = 3  "X"  Destination
+    PATH  = 4  "@"  Path
+"""
+
+from zlib import crc32
+
+EMPTY = 0
+WALL = 1
+START = 2
+DEST = 3
+PATH = 4
+
+CHARS = ".#OX@"  # Indexed by cell code
+
+# bytes.translate tables between characters and cell codes, and from cell
+# codes to 1 for walls and 0 for the rest. Unknown characters load as empty
+# space.
+_TO_CODES = bytes(CHARS.find(chr(i)) if chr(i) in CHARS else EMPTY for i in range(256))
+_TO_CHARS = bytes(ord(CHARS[i]) if i < len(CHARS) else ord(".") for i in range(256))
+_TO_WALLS = bytes(1 if i == WALL else 0 for i in range(256))
+
+
+class Grid:
+    """
+    A width x height grid of cell codes.
+
+    Usage:
+        grid = Grid(50, 50)
+        grid.set(3, 4, "#")
+        grid.get(3, 4)  # "#"
+    """
+
+    def __init__(self, width, height, cells=None):
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Grid must be at least 1x1, got {width}x{height}")
+        self.width = width
+        self.height = height
+        if cells is None:
+            cells = bytearray(width * height)
+        elif len(cells) != width * height:
+            raise ValueError(
+                f"Expected {width * height} cells for {width}x{height}, got {len(cells)}"
+            )
+        self.cells = cells
+        self.version = 0
+
+    @classmethod
+    def from_string(cls, code, width, height):
+        """
+        Builds a grid from one character per cell, row by row.
+        The same format save_to_clip copies.
+        """
+        if isinstance(code, str):
+            code = code.encode("ascii", "replace")
+        return cls(width, height, bytearray(code.translate(_TO_CODES)))
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Builds a grid from text as save_to_clip copies it: one line of
+        characters per row. A single line with a square number of cells,
+        as older versions copied, is read as a square grid.
+        """
+        rows = ["".join(line.split()) for line in text.splitlines()]
+        rows = [row for row in rows if row]
+        if len(rows) == 1:
+            side = round(len(rows[0]) ** 0.5)
+            if side * side != len(rows[0]):
+                raise ValueError(f"Can't tell the shape of {len(rows[0])} cells")
+            return cls.from_string(rows[0], side, side)
+        if not rows:
+            raise ValueError("No rows")
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a grid from a list of rows of cell characters.
+
+        Usage: Grid.from_rows(["O..", ".#.", "..X"])
+        """
+        height = len(rows)
+        width = len(rows[0]) if height else 0
+        for row in rows:
+            if len(row) != width:
+                raise ValueError("All rows must be the same length")
+        return cls.from_string("".join("".join(row) for row in rows), width, height)
+
+    def to_string(self):
+        """One character per cell, row by row"""
+        return bytes(self.cells).translate(_TO_CHARS).decode("ascii")
+
+    def rows(self):
+        """The grid as a list of strings, one per row"""
+        code = self.to_string()
+        return [code[y * self.width : (y + 1) * self.width] for y in range(self.height)]
+
+    def to_text(self):
+        """One line per row, the text from_text() reads"""
+        return "\n".join(self.rows())
+
+    def copy(self):
+        return Grid(self.width, self.height, bytearray(self.cells))
+
+    def load(self, code):
+        """Replaces every cell from a string the same size as the grid"""
+        other = Grid.from_string(code, self.width, self.height)
+        self.cells[:] = other.cells
+        self.version += 1
+
+    def index(self, x, y):
+        return y * self.width + x
+
+    def coords(self, i):
+        return (i % self.width, i // self.width)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        return CHARS[self.cells[y * self.width + x]]
+
+    def set(self, x, y, value):
+        i = y * self.width + x
+        code = CHARS.index(value)
+        if (self.cells[i] == WALL) != (code == WALL):
+            self.version += 1
+        self.cells[i] = code
+
+    def is_wall(self, x, y):
+        return self.cells[y * self.width + x] == WALL
+
+    def _searchable(self):
+        """The cells as something with bytearray's find() and translate()"""
+        cells = self.cells
+        return cells if isinstance(cells, bytearray) else bytes(cells)
+
+    def find(self, value):
+        """Coords of the first cell holding a value, or None"""
+        i = self._searchable().find(CHARS.index(value))
+        if i == -1:
+            return None
+        return self.coords(i)
+
+    def indexes(self, value):
+        """Cell ids of every cell holding a value"""
+        code = CHARS.index(value)
+        cells = self._searchable()
+        found = []
+        i = cells.find(code)
+        while i != -1:
+            found.append(i)
+            i = cells.find(code, i + 1)
+        return found
+
+    def replace(self, value, new="."):
+        """
+        Replaces every instance of a value in one pass.
+
+        Usage: grid.replace("@")
+        """
+        table = bytearray(range(256))
+        table[CHARS.index(value)] = CHARS.index(new)
+        self.cells[:] = self._searchable().translate(table)
+        if value != new and "#" in (value, new):
+            self.version += 1
+
+    def __contains__(self, value):
+        return CHARS.index(value) in self._searchable()
+
+    def __repr__(self):
+        return f"Grid({self.width}x{self.height})"
+
+
+def as_grid(grid):
+    """Accepts a Grid or a list of rows of cell characters"""
+    if isinstance(grid, Grid):
+        return grid
+    return Grid.from_rows(grid)
+
+
+def walls_crc(grid):
+    """
+    CRC-32 of where the walls are, for files built for one map to check
+    they are loaded with the same walls
+    """
+    return crc32(bytes(grid.cells).translate(_TO_WALLS))
@@ -0,0 +1,157 @@
+"""
+Compact binary grid files.
+
+Layout, little-endian:
+    header   24 bytes, see HEADER
+        magic     4s  b"PFGR"
+        version   B   FORMAT_VERSION
+        encoding  B   RAW, BITS or RLE
+        reserved  H   0
+        width     I
+        height    I
+        start     i   cell id of the start, -1 if none
+        dest      i   cell id of the destination, -1 if none
+    payload
+        RAW   width * height cell codes, one byte each, as Grid stores them
+        BITS  one bit per cell, set for walls, rows packed high bit first.
+              Only walls, start and destination survive.
+        RLE   runs, then that many cell codes (uint8), then that many run
+              lengths (uint32). Small for maps with long stretches of wall
+              or floor.
+
+A RAW file is loaded by memory mapping it: the grid's cells are a view of
+the mapped payload, so opening even a huge map costs no time, and pages
+are read from disk as searches touch them. The mapping is copy-on-write,
+edits to the grid never reach the file. The other encodings are decoded
+with NumPy in one go.
+
+Usage:
+    save(grid, "arena.grid", RLE)
+    grid = load("arena.grid")
+"""
+
+from mmap import ACCESS_COPY, mmap
+from struct import Struct
+
+from .grid import CHARS, DEST, START, WALL, Grid
+
+MAGIC = b"PFGR"
+FORMAT_VERSION = 1
+
+RAW = 0
+BITS = 1
+RLE = 2
+ENCODINGS = {"raw": RAW, "bits": BITS, "rle": RLE}
+
+HEADER = Struct("<4sBBHIIii")
+_RUNS = Struct("<I")
+
+
+def encode(grid, encoding=RAW):
+    """The file contents for a grid, as bytes"""
+    cells = grid.cells
+    start = _first(grid, START)
+    dest = _first(grid, DEST)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, encoding, 0, grid.width, grid.height, start, dest
+    )
+    if encoding == RAW:
+        return header + bytes(cells)
+
+    import numpy as np
+
+    codes = np.frombuffer(cells, dtype=np.uint8)
+    if encoding == BITS:
+        return header + np.packbits(codes == WALL).tobytes()
+    if encoding == RLE:
+        starts = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], starts))
+        lengths = np.diff(np.append(starts, len(codes))).astype("<u4")
+        return b"".join(
+            (
+                header,
+                _RUNS.pack(len(starts)),
+                codes[starts].tobytes(),
+                lengths.tobytes(),
+            )
+        )
+    raise ValueError(f"Unknown encoding {encoding!r}")
+
+
+def _first(grid, code):
+    """Cell id of the first cell holding a code, or -1"""
+    found = grid.find(CHARS[code])
+    return -1 if found is None else grid.index(*found)
+
+
+def read_header(data):
+    """(encoding, width, height, start, dest) from the start of a file"""
+    if len(data) < HEADER.size:
+        raise ValueError("Too short for a grid file")
+    magic, version, encoding, _, width, height, start, dest = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a grid file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Grid file version {version} is newer than this reader")
+    if encoding not in ENCODINGS.values():
+        raise ValueError(f"Unknown encoding {encoding}")
+    return encoding, width, height, start, dest
+
+
+def decode(data):
+    """Builds a Grid from the contents of a grid file"""
+    encoding, width, height, start, dest = read_header(data)
+    size = width * height
+    payload = memoryview(data)[HEADER.size :]
+    if encoding == RAW:
+        if len(payload) < size:
+            raise ValueError(f"Expected {size} cells, got {len(payload)}")
+        return Grid(width, height, bytearray(payload[:size]))
+
+    import numpy as np
+
+    if encoding == BITS:
+        if len(payload) < -(-size // 8):
+            raise ValueError(f"Expected {size} bits of cells")
+        walls = np.unpackbits(np.frombuffer(payload, dtype=np.uint8), count=size)
+        cells = bytearray(walls.tobytes())  # 1 is WALL, 0 is EMPTY
+        for i, code in ((start, START), (dest, DEST)):
+            if 0 <= i < size:
+                cells[i] = code
+        return Grid(width, height, cells)
+
+    (runs,) = _RUNS.unpack_from(payload)
+    if len(payload) < _RUNS.size + runs * 5:
+        raise ValueError(f"Expected {runs} runs")
+    codes = np.frombuffer(payload, dtype=np.uint8, count=runs, offset=_RUNS.size)
+    lengths = np.frombuffer(payload, dtype="<u4", count=runs, offset=_RUNS.size + runs)
+    if lengths.sum(dtype=np.int64) != size:
+        raise ValueError(f"Runs add up to {lengths.sum()} cells, expected {size}")
+    if runs and codes.max() >= len(CHARS):
+        raise ValueError(f"Unknown cell code {codes.max()}")
+    return Grid(width, height, bytearray(np.repeat(codes, lengths).tobytes()))
+
+
+def save(grid, path, encoding=RAW):
+    """Writes a grid to a file, see encode()"""
+    with open(path, "wb") as file:
+        file.write(encode(grid, encoding))
+
+
+def load(path, memory_map=True):
+    """
+    Loads a grid file. RAW files are memory mapped unless memory_map is
+    False, in which case they are read into a bytearray like the others.
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+        encoding, width, height, _, _ = read_header(header)
+        if encoding != RAW or not memory_map:
+            return decode(header + file.read())
+
+        size = width * height
+        mapped = mmap(file.fileno(), 0, access=ACCESS_COPY)
+    if len(mapped) < HEADER.size + size:
+        raise ValueError(f"Expected {size} cells, got {len(mapped) - HEADER.size}")
+    # The view keeps the mapping alive as long as the grid
+    return Grid(width, height, memoryview(mapped)[HEADER.size : HEADER.size + size])
@@ -0,0 +1,220 @@
+"""
+Heuristics, used to calculate "H" in the A* algorithm.
+
+Each heuristic is a strategy object. Calling it gives h for one pair of
+points, and field() gives h for every cell of a grid towards one
+destination, built in a single vectorized NumPy pass. Fields are cached
+per heuristic, grid shape and destination, so repeated queries to the same
+goal, and the renderer's color gradient, never recompute them.
+
+A field costs time and memory for every cell of the grid, however few
+cells a search reaches, so searches don't build one. They read h through
+lookup(), which gives the cached field if there is one and otherwise
+computes h for each cell as it is read. Call field() first to have
+searches towards a destination that is queried often use one.
+
+METHODS: ---------------------------------
+
+Manhattan Method:
+    h= |xstart - xdestination| + |ystart - ydestination|
+
+Euclidean Method:
+    h= sqrt of ( xstart - xdestination )^2+( ystart - ydestination )^2
+
+Chebyshev Method:
+    D = 1 and D2 = 1:
+        dx = abs(node.x - goal.x)
+        dy = abs(node.y - goal.y)
+        h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
+
+Octile Method:
+    D = 1 and D2 = sqrt(2):
+        dx = abs(node.x - goal.x)
+        dy = abs(node.y - goal.y)
+        h = D * (dx + dy) + (D2 - 2 * D) * min(dx, dy)
+
+Dijkstra:
+    h = 0
+"""
+
+from collections import OrderedDict
+from math import sqrt
+from threading import Lock
+
+
+class Heuristic:
+    """
+    Base class for heuristics.
+
+    Subclasses set name and implement distance(dx, dy), which must work on
+    both plain numbers and NumPy arrays of absolute coordinate differences.
+    """
+
+    name = None
+
+    def distance(self, dx, dy):
+        raise NotImplementedError
+
+    def __call__(self, start, end):
+        x_start, y_start = start
+        x_end, y_end = end
+        return self.distance(abs(x_start - x_end), abs(y_start - y_end))
+
+    def build_field(self, width, height, dest):
+        """
+        h for every cell towards dest, as a flat float32 NumPy array
+        indexed by cell id. Not cached, see field().
+        """
+        import numpy as np  # Only needed once a field is built
+
+        x_end, y_end = dest
+        dx = np.abs(np.arange(width, dtype=np.float64) - x_end)[np.newaxis, :]
+        dy = np.abs(np.arange(height, dtype=np.float64) - y_end)[:, np.newaxis]
+        h = self.distance(dx, dy)
+        return np.broadcast_to(h, (height, width)).astype(np.float32).ravel()
+
+    def field(self, width, height, dest):
+        """
+        Cached h-field towards dest, as a float32 memoryview indexed by
+        cell id (y * width + x).
+        """
+        return FIELDS.get(self, width, height, dest)
+
+    def lookup(self, width, height, dest):
+        """
+        h towards dest, indexed by cell id: the cached field if one has
+        been built, or else one that computes h per cell when read.
+        """
+        field = FIELDS.peek(self, width, height, dest)
+        if field is not None:
+            return field
+        return _CellH(self, width, dest)
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class Manhattan(Heuristic):
+    name = "Manhattan"
+
+    def distance(self, dx, dy):
+        return dx + dy
+
+
+class Euclidean(Heuristic):
+    name = "Euclidean"
+
+    def distance(self, dx, dy):
+        return (dx * dx + dy * dy) ** 0.5
+
+
+class Chebyshev(Heuristic):
+    name = "Chebyshev"
+
+    def distance(self, dx, dy):
+        D = 1
+        D2 = 1
+        return D * (dx + dy) + (D2 - 2 * D) * _minimum(dx, dy)
+
+
+class Octile(Heuristic):
+    name = "Octile Dist"
+
+    def distance(self, dx, dy):
+        D = 1
+        D2 = sqrt(2)
+        return D * (dx + dy) + (D2 - 2 * D) * _minimum(dx, dy)
+
+
+class Zero(Heuristic):
+    """h = 0, which turns A* into Dijkstra's algorithm"""
+
+    name = "Dijkstra"
+
+    def distance(self, dx, dy):
+        return dx * 0
+
+
+def _minimum(a, b):
+    """min() for numbers, numpy.minimum() for arrays"""
+    if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+        return a if a < b else b  # Per cell, so kept quick
+    import numpy as np
+
+    return np.minimum(a, b)
+
+
+_NUMBERS = {int, float}
+
+
+class _CellH:
+    """h towards dest of any cell id, computed when read"""
+
+    def __init__(self, heuristic, width, dest):
+        self.heuristic = heuristic
+        self.width = width
+        self.dest = tuple(dest)
+
+    def __getitem__(self, i):
+        y, x = divmod(i, self.width)
+        return self.heuristic((x, y), self.dest)
+
+
+class FieldCache:
+    """
+    LRU cache of h-fields, keyed by (heuristic, width, height, dest).
+    Safe to share between threads.
+    """
+
+    def __init__(self, limit=16):
+        self.limit = limit
+        self._fields = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, heuristic, width, height, dest):
+        """The field, built and cached if it isn't yet"""
+        field = self.peek(heuristic, width, height, dest)
+        if field is not None:
+            return field
+
+        key = (heuristic.name or id(heuristic), width, height, tuple(dest))
+        field = memoryview(heuristic.build_field(width, height, dest))
+        with self._lock:
+            self._fields[key] = field
+            while len(self._fields) > self.limit:
+                self._fields.popitem(last=False)
+        return field
+
+    def peek(self, heuristic, width, height, dest):
+        """The field if it is cached, else None"""
+        key = (heuristic.name or id(heuristic), width, height, tuple(dest))
+        with self._lock:
+            field = self._fields.get(key)
+            if field is not None:
+                self._fields.move_to_end(key)
+            return field
+
+    def clear(self):
+        with self._lock:
+            self._fields.clear()
+
+
+FIELDS = FieldCache()
+
+HEURISTICS = {
+    heuristic.name: heuristic
+    for heuristic in (Manhattan(), Octile(), Euclidean(), Chebyshev(), Zero())
+}
+
+
+def get_heuristic(method):
+    """
+    Looks up a heuristic by name, as listed in HEURISTICS.
+    A Heuristic instance is returned as is, so callers can plug in their own.
+    """
+    if isinstance(method, Heuristic):
+        return method
+    try:
+        return HEURISTICS[method]
+    except KeyError:
+        raise ValueError(f"Unknown method {method!r}") from None
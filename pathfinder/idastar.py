@@ -0,0 +1,307 @@
+"""
+Memory-bounded search: IDA* with a transposition table.
+
+A* keeps every cell it reaches, so its memory grows with the explored
+area. IDA* keeps only the path it is on: it runs depth-first searches that
+give up on any cell with f = g + h over a threshold, and raises the
+threshold to the smallest f that went over it until the destination is
+reached.
+
+With real-valued costs, nearly every pass would only raise the threshold
+to the next of many distinct f values. Instead the threshold grows by at
+least GROWTH each pass, and the pass that first reaches the destination
+carries on as a branch and bound search: each path found lowers the
+threshold to its cost, so the last one kept is optimal with an admissible
+heuristic. If the best path doesn't fit in the budget beside the one
+being searched, only its cost is kept, and one more pass finds it again.
+
+Based on: Sarkar, Chakrabarti, Ghose & De Sarkar, "Reducing Reexpansions
+in Iterative-Deepening Search by Controlling Cutoff Bounds" (Artificial
+Intelligence, 1991).
+
+On a grid, depth-first search reaches the same cell along many paths. A
+transposition table remembers the cheapest g each cell was reached with
+in the current pass, and a cell reached again no cheaper is dropped, since
+everything past it was already searched. The table, the path and the best
+path found so far are held to budget cells together. When they are full,
+table entries are dropped, which only costs time. A path longer than the
+budget can't be held at all. A pass that had to cut a branch for that
+reason and found nothing ends the search, with reason OVER_BUDGET. If it
+found a path anyway, the result's stats.extra["cut"] is True and the path
+may not be optimal.
+
+h is computed per cell, as no h-field is built. Besides the grid and the
+budget, the only memory used is one bit per cell, to count re-expansions.
+
+Stats:
+    expanded        cells pushed onto the path, over every pass
+    reopened        expansions of cells that had been expanded before
+    peak_open       the longest the path got
+    extra           iterations, budget, cut, peak_nodes (the memory
+                    high-water mark, path plus table, in cells) and
+                    overhead (expanded / distinct cells expanded), the CPU
+                    paid for the memory saved
+
+Usage:
+    result = ida_star(grid, (0, 0), (49, 49), budget=10_000)
+    result.stats.extra["peak_nodes"], result.stats.extra["overhead"]
+"""
+
+from math import inf as INFINITY
+
+from .grid import WALL, as_grid
+from .heuristics import get_heuristic
+from .search import (
+    CLOSED,
+    DIRECTIONS,
+    NOT_FOUND,
+    OPENED,
+    REPARENTED,
+    SearchResult,
+    run_steps,
+)
+from .stats import SearchStats, clock
+
+OVER_BUDGET = "Path needs more cells than the budget."
+
+TOLERANCE = 1e-6  # f values this close to the threshold are within it
+GROWTH = 1.05  # Smallest factor the threshold grows by between passes
+
+
+def ida_star(
+    grid,
+    start,
+    dest,
+    method="Octile Dist",
+    budget=100_000,
+    on_step=None,
+    events=None,
+):
+    """
+    Finds an optimal path from start to dest, holding at most budget
+    cells at a time. Returns a SearchResult.
+
+    on_step(context, current) and events work as in a_star(), with
+    context None: there are no search arrays to read.
+    """
+    return run_steps(ida_star_steps(grid, start, dest, method, budget, events), on_step)
+
+
+def ida_star_steps(
+    grid, start, dest, method="Octile Dist", budget=100_000, events=None
+):
+    """ida_star() as a generator, see a_star_steps()"""
+    if budget < 1:
+        raise ValueError(f"budget must be at least 1, got {budget}")
+    method = get_heuristic(method)
+    grid = as_grid(grid)
+    return (yield from _search(grid, start, dest, method, budget, events))
+
+
+def _search(grid, start, dest, method, budget, events):
+    started = clock()
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    startID = grid.index(*start)
+    destID = grid.index(*dest)
+    dest = tuple(dest)
+    expandedBits = bytearray((width * height + 7) // 8)
+    expandedBits[startID >> 3] |= 1 << (startID & 7)
+
+    threshold = method(start, dest)
+    iterations = 0
+    cut = False
+    exact = False  # Whether threshold is the cost of the best path
+
+    # Counters for SearchStats
+    expanded = 0
+    generated = 0
+    reopened = 0
+    duplicates = 0
+    heuristicEvals = 1
+    peakDepth = 1
+    peakNodes = 1
+
+    emit = events.append if events is not None else None
+
+    while True:
+        iterations += 1
+        nextThreshold = INFINITY
+        bestPath = None  # Cheapest path found this pass
+        bestG = INFINITY  # Its cost, kept when the path itself doesn't fit
+        kept = 0  # Cells held by bestPath
+
+        # The path as parallel stacks: cell, g, and the next move to try
+        path = [startID]
+        gs = [0.0]
+        moves = [0]
+        onPath = {startID}
+        table = {}  # Cheapest g of each cell this pass, but the start
+        if expanded:
+            reopened += 1
+        expanded += 1
+        if emit is not None:
+            emit((OPENED, startID, -1))
+            emit((CLOSED, startID, -1))
+        if startID == destID:
+            bestPath = path
+            break
+
+        while path:
+            current = path[-1]
+            k = moves[-1]
+            if k == len(DIRECTIONS):
+                path.pop()
+                gs.pop()
+                moves.pop()
+                onPath.discard(current)
+                continue
+            moves[-1] = k + 1
+
+            dx, dy, cost = DIRECTIONS[k]
+            neighborX = current % width + dx
+            neighborY = current // width + dy
+            if not (0 <= neighborX < width and 0 <= neighborY < height):
+                continue
+            neighbor = neighborY * width + neighborX
+            if cells[neighbor] == WALL:
+                continue
+            generated += 1
+            if neighbor in onPath:
+                duplicates += 1
+                continue
+            tempG = gs[-1] + cost
+            best = table.get(neighbor)
+            if best is not None and tempG >= best:
+                duplicates += 1
+                continue  # Already searched from here, no dearer
+
+            tempF = tempG + method((neighborX, neighborY), dest)
+            heuristicEvals += 1
+            if tempF > threshold + TOLERANCE:
+                if tempF < nextThreshold:
+                    nextThreshold = tempF
+                continue
+
+            if neighbor == destID:
+                if exact:
+                    bestPath = path + [neighbor]  # The one being looked for
+                    break
+                # Keep it if it fits, and from now on only look for cheaper
+                bestG = tempG
+                threshold = tempG - 2 * TOLERANCE
+                bestPath = None
+                kept = 0
+                if 2 * len(path) + 1 + len(table) > budget:
+                    continue
+                bestPath = path + [neighbor]
+                kept = len(bestPath)
+                if len(path) + len(table) + kept > peakNodes:
+                    peakNodes = len(path) + len(table) + kept
+                continue
+
+            # Room for one more on the path, dropping table entries if need
+            # be, and in the table if it fits
+            if len(path) + kept >= budget:
+                cut = True
+                continue
+            while len(path) + len(table) + kept >= budget:
+                table.popitem()
+            if neighbor in table or len(path) + len(table) + kept + 2 <= budget:
+                table[neighbor] = tempG
+            bit = 1 << (neighbor & 7)
+            if expandedBits[neighbor >> 3] & bit:
+                reopened += 1
+            else:
+                expandedBits[neighbor >> 3] |= bit
+            if emit is not None:
+                kind = OPENED if best is None else REPARENTED
+                emit((kind, neighbor, current))
+                emit((CLOSED, neighbor, current))
+            path.append(neighbor)
+            gs.append(tempG)
+            moves.append(0)
+            onPath.add(neighbor)
+            expanded += 1
+
+            if len(path) > peakDepth:
+                peakDepth = len(path)
+            if len(path) + len(table) + kept > peakNodes:
+                peakNodes = len(path) + len(table) + kept
+            yield None, neighbor
+
+        if bestPath is not None:
+            break
+        if bestG != INFINITY:
+            # Too long to keep: search again for a path of exactly that cost
+            threshold = bestG
+            exact = True
+            continue
+        if nextThreshold == INFINITY or cut:
+            reason = OVER_BUDGET if cut else NOT_FOUND
+            stats = _stats(
+                method,
+                expanded,
+                generated,
+                reopened,
+                duplicates,
+                heuristicEvals,
+                peakDepth,
+                peakNodes,
+                iterations,
+                budget,
+                cut,
+            )
+            return SearchResult.finish(stats, started, reason=reason)
+        # At least GROWTH more each pass, so passes don't crawl through
+        # every distinct f
+        threshold = max(nextThreshold, threshold * GROWTH)
+
+    stats = _stats(
+        method,
+        expanded,
+        generated,
+        reopened,
+        duplicates,
+        heuristicEvals,
+        peakDepth,
+        peakNodes,
+        iterations,
+        budget,
+        cut,
+    )
+    return SearchResult.finish(stats, started, [grid.coords(i) for i in bestPath])
+
+
+def _stats(
+    method,
+    expanded,
+    generated,
+    reopened,
+    duplicates,
+    heuristicEvals,
+    peakDepth,
+    peakNodes,
+    iterations,
+    budget,
+    cut,
+):
+    return SearchStats(
+        "IDA*",
+        method.name,
+        extra={
+            "iterations": iterations,
+            "budget": budget,
+            "cut": cut,
+            "peak_nodes": peakNodes,
+            "overhead": expanded / max(1, expanded - reopened),
+        },
+        expanded=expanded,
+        generated=generated,
+        pushes=expanded,
+        reopened=reopened,
+        peak_open=peakDepth,
+        heuristic_evals=heuristicEvals,
+        duplicates=duplicates,
+    )
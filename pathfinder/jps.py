@@ -0,0 +1,223 @@
+"""
+Jump Point Search.
+
+JPS only works on uniform-cost 8-connected grids, which is what Grid is:
+straight moves cost 1, diagonal moves sqrt(2), and any free neighbor can
+be entered, diagonals included. Instead of pushing every neighbor like
+A*, it scans along straight and diagonal lines and only stops at "jump
+points", cells where an obstacle forces a turn. Symmetric paths are never
+explored, so open maps take far fewer expansions. Paths are optimal and as
+long as A* with Octile Dist.
+
+Based on: Harabor & Grastien, "Online Graph Pruning for Pathfinding on
+Grid Maps" (AAAI 2011).
+"""
+
+from heapq import heappop, heappush
+
+from .context import POOL
+from .grid import WALL, as_grid
+from .heuristics import Octile
+from .search import CLOSED, NOT_FOUND, OPENED, REPARENTED, SearchResult, run_steps
+from .stats import SearchStats, clock
+
+_OCTILE = Octile()
+
+# Every direction, tried from the start where there is no parent
+_ALL_DIRECTIONS = ((-1, 0), (-1, -1), (-1, 1), (1, 0), (1, -1), (1, 1), (0, -1), (0, 1))
+
+
+def jump_point_search(grid, start, dest, on_step=None, context=None, events=None):
+    """
+    Finds an optimal path from start to dest with Jump Point Search.
+    Returns a SearchResult, with cycles counting expanded jump points.
+
+    on_step(context, current) and events work as in a_star(), for jump
+    points only.
+    """
+    return run_steps(jump_point_steps(grid, start, dest, context, events), on_step)
+
+
+def jump_point_steps(grid, start, dest, context=None, events=None):
+    """jump_point_search() as a generator, see a_star_steps()"""
+    grid = as_grid(grid)
+    if context is None:
+        with POOL.context(grid.width * grid.height) as context:
+            return (yield from _search(grid, start, dest, context, events))
+    return (yield from _search(grid, start, dest, context, events))
+
+
+def _search(grid, start, dest, context, events):
+    started = clock()
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    destX, destY = dest
+    startID = grid.index(*start)
+    destID = grid.index(destX, destY)
+
+    def free(x, y):
+        return 0 <= x < width and 0 <= y < height and cells[y * width + x] != WALL
+
+    def jump(x, y, dx, dy):
+        """
+        Walks from (x, y) in direction (dx, dy) and returns the first
+        jump point found, or None if it runs into a wall or the edge.
+        """
+        while True:
+            x += dx
+            y += dy
+            if not free(x, y):
+                return None
+            if x == destX and y == destY:
+                return x, y
+
+            if dx and dy:  # Diagonal
+                if (not free(x - dx, y) and free(x - dx, y + dy)) or (
+                    not free(x, y - dy) and free(x + dx, y - dy)
+                ):
+                    return x, y  # Forced neighbor
+                # Stop here if a straight scan from this cell finds something
+                if jump(x, y, dx, 0) or jump(x, y, 0, dy):
+                    return x, y
+            elif dx:  # Horizontal
+                if (not free(x, y + 1) and free(x + dx, y + 1)) or (
+                    not free(x, y - 1) and free(x + dx, y - 1)
+                ):
+                    return x, y
+            else:  # Vertical
+                if (not free(x + 1, y) and free(x + 1, y + dy)) or (
+                    not free(x - 1, y) and free(x - 1, y + dy)
+                ):
+                    return x, y
+
+    def directions(x, y, parent):
+        """
+        The directions worth scanning from (x, y), given where we came from.
+        Natural neighbors are always kept, others only when forced.
+        """
+        if parent == -1:
+            return _ALL_DIRECTIONS
+        px = parent % width
+        py = parent // width
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        if dx and dy:
+            dirs = [(dx, 0), (0, dy), (dx, dy)]
+            if not free(x - dx, y):
+                dirs.append((-dx, dy))
+            if not free(x, y - dy):
+                dirs.append((dx, -dy))
+        elif dx:
+            dirs = [(dx, 0)]
+            if not free(x, y + 1):
+                dirs.append((dx, 1))
+            if not free(x, y - 1):
+                dirs.append((dx, -1))
+        else:
+            dirs = [(0, dy)]
+            if not free(x + 1, y):
+                dirs.append((1, dy))
+            if not free(x - 1, y):
+                dirs.append((-1, dy))
+        return dirs
+
+    gScore = context.g
+    cameFrom = context.parent
+    seen = context.seen
+    closedSet = context.closed
+    gen = context.begin()
+
+    seen[startID] = gen
+    gScore[startID] = 0
+    cameFrom[startID] = -1
+
+    startH = _OCTILE(start, dest)
+    openSet = [(startH, startH, startID)]
+
+    # To record the loop cycles, and the counters for SearchStats
+    cycles = 0
+    generated = 0  # Jump points found
+    pushes = 1
+    peakOpen = 1
+
+    emit = events.append if events is not None else None
+    if emit is not None:
+        emit((OPENED, startID, -1))
+
+    while openSet:
+        current = heappop(openSet)[2]
+        if closedSet[current] == gen:
+            continue
+        closedSet[current] = gen
+        if emit is not None:
+            emit((CLOSED, current, cameFrom[current]))
+
+        if current == destID:
+            path = _fill_in(context.path_to(current, grid))
+            return SearchResult.finish(
+                _stats(cycles, generated, pushes, peakOpen), started, path
+            )
+
+        currentX = current % width
+        currentY = current // width
+        currentG = gScore[current]
+        for dx, dy in directions(currentX, currentY, cameFrom[current]):
+            point = jump(currentX, currentY, dx, dy)
+            if point is None:
+                continue
+            jumpX, jumpY = point
+            neighbor = jumpY * width + jumpX
+            generated += 1
+            if closedSet[neighbor] == gen:
+                continue
+            # Jumps are straight or diagonal lines, so octile distance is the cost
+            tempG = currentG + _OCTILE.distance(
+                abs(jumpX - currentX), abs(jumpY - currentY)
+            )
+            if seen[neighbor] != gen or tempG < gScore[neighbor]:
+                pushes += 1
+                if emit is not None:
+                    kind = OPENED if seen[neighbor] != gen else REPARENTED
+                    emit((kind, neighbor, current))
+                seen[neighbor] = gen
+                cameFrom[neighbor] = current
+                gScore[neighbor] = tempG
+                tempH = _OCTILE(point, dest)
+                heappush(openSet, (tempG + tempH, tempH, neighbor))
+
+        if len(openSet) > peakOpen:
+            peakOpen = len(openSet)
+        cycles += 1
+        yield context, current
+
+    return SearchResult.finish(
+        _stats(cycles, generated, pushes, peakOpen), started, reason=NOT_FOUND
+    )
+
+
+def _stats(cycles, generated, pushes, peakOpen):
+    return SearchStats(
+        "JPS",
+        _OCTILE.name,
+        expanded=cycles,
+        generated=generated,
+        pushes=pushes,
+        peak_open=peakOpen,
+        heuristic_evals=pushes,  # One octile distance per push
+        duplicates=generated - (pushes - 1),
+    )
+
+
+def _fill_in(jumpPoints):
+    """Expands a list of jump points into every cell walked between them"""
+    path = [jumpPoints[0]]
+    for x, y in jumpPoints[1:]:
+        px, py = path[-1]
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        while (px, py) != (x, y):
+            px += dx
+            py += dy
+            path.append((px, py))
+    return path
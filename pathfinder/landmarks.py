@@ -0,0 +1,344 @@
+"""
+ALT heuristics: A*, Landmarks and the Triangle inequality.
+
+A few cells are picked as landmarks, and the distance from each of them to
+every cell is computed once, with Dijkstra's algorithm over the grid
+compiled to a Graph. For any cell v and
+destination t, and every landmark L,
+
+    d(v, t) >= |d(L, t) - d(L, v)|
+
+so the largest of these, or Octile Dist if that is larger, is a lower
+bound that knows about walls. On maze-like maps it is far tighter than
+any distance formula, and A* expands a fraction of the cells.
+
+Landmarks are picked with one of STRATEGIES:
+
+    farthest
+        each landmark is the cell farthest from the ones picked so far,
+        starting from the cell farthest from a random one. Spreads them to
+        the edges of the map.
+    avoid
+        grows the shortest path tree from a random cell, weighs every cell
+        by how much the current bound underestimates its distance, and
+        puts the next landmark at the leaf of the heaviest branch with no
+        landmark in it. Picks landmarks where queries need them.
+
+Based on: Goldberg & Harrelson, "Computing the Shortest Path: A* Search
+Meets Graph Theory" (SODA 2005).
+
+The tables are float32, one row per landmark, and can be saved to a file
+and memory mapped back, so a map's landmarks are built once, offline.
+
+File layout, little-endian:
+    header      24 bytes, see HEADER
+        magic     4s  b"PFLM"
+        version   B   FORMAT_VERSION
+        reserved  B, H
+        width     I
+        height    I
+        count     I   landmarks
+        walls     I   CRC-32 of the grid's walls, checked on load
+    landmarks   count cell ids, int32
+    tables      count * width * height distances, float32, inf where a
+                landmark can't reach
+
+The tables only hold for the walls they were built on. Once the grid
+changes, h falls back to Octile Dist until they are built again.
+
+Usage:
+    landmarks = Landmarks.build(grid, 8, "avoid")
+    solve(grid, (0, 0), (49, 49), landmarks)
+    landmarks.save("arena.alt")
+    landmarks = Landmarks.load("arena.alt", grid)
+"""
+
+from array import array
+from collections import OrderedDict
+from heapq import heappop, heappush
+from math import inf as INFINITY
+from random import Random
+from struct import Struct
+
+import numpy as np
+
+from .graph import Graph
+from .grid import WALL, as_grid, walls_crc
+from .heuristics import HEURISTICS, Heuristic
+
+STRATEGIES = ("farthest", "avoid")
+
+MAGIC = b"PFLM"
+FORMAT_VERSION = 1
+HEADER = Struct("<4sBBHIIII")
+
+_OCTILE = HEURISTICS["Octile Dist"]
+
+
+class Landmarks(Heuristic):
+    """
+    An ALT heuristic for one grid. Pass it anywhere a method is taken.
+
+    landmarks holds the landmarks' cell ids, and tables[k] the distance
+    from landmark k to every cell.
+    """
+
+    name = "ALT"
+
+    def __init__(self, grid, landmarks, tables):
+        self.grid = as_grid(grid)
+        self.landmarks = list(landmarks)
+        self.tables = tables
+        self.version = self.grid.version
+        self.limit = 16  # h-fields kept, see field()
+        self._fields = OrderedDict()
+
+    @classmethod
+    def build(cls, grid, count=8, strategy="avoid", seed=0):
+        """Picks count landmarks with a strategy from STRATEGIES"""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}")
+        if count < 1:
+            raise ValueError(f"count must be at least 1, got {count}")
+        grid = as_grid(grid)
+        free = np.flatnonzero(np.frombuffer(grid.cells, dtype=np.uint8) != WALL)
+        if not len(free):
+            raise ValueError("The grid has no free cells")
+        graph = Graph.from_grid(grid)
+        random = Random(seed)
+        pick = _farthest if strategy == "farthest" else _avoid
+        landmarks = []
+        tables = []
+        for _ in range(count):
+            cell = pick(graph, free, landmarks, tables, random)
+            if cell is None or cell in landmarks:
+                break  # Nowhere left that a landmark would help
+            landmarks.append(cell)
+            tables.append(_distances(graph, cell)[0])
+        return cls(grid, landmarks, np.stack(tables))
+
+    @property
+    def current(self):
+        """False once walls have changed since the tables were built"""
+        return self.grid.version == self.version
+
+    # ----- Heuristic ------------------------ #
+
+    def distance(self, dx, dy):
+        return _OCTILE.distance(dx, dy)
+
+    def __call__(self, start, end):
+        h = _OCTILE(start, end)
+        if not self.current:
+            return h
+        i = self.grid.index(*start)
+        j = self.grid.index(*end)
+        for table in self.tables:
+            bound = abs(float(table[j]) - float(table[i]))
+            if bound > h and bound != np.inf:
+                h = bound
+        return h
+
+    def field(self, width, height, dest):
+        """
+        Cached h-field towards dest, as a float32 memoryview indexed by
+        cell id. Octile Dist's while the tables are out of date.
+        """
+        grid = self.grid
+        if not self.current or (width, height) != (grid.width, grid.height):
+            return _OCTILE.field(width, height, dest)
+        dest = tuple(dest)
+        field = self._fields.get(dest)
+        if field is not None:
+            self._fields.move_to_end(dest)
+            return field
+
+        h = np.array(_OCTILE.field(width, height, dest))
+        target = grid.index(*dest)
+        for table in self.tables:
+            toDest = table[target]
+            if toDest == np.inf:
+                continue  # The landmark can't reach dest, so it knows nothing
+            # Cells the landmark can't reach get inf, rightly, since dest
+            # can't reach them either
+            np.maximum(h, np.abs(table - toDest), out=h)
+        field = memoryview(h)
+        self._fields[dest] = field
+        while len(self._fields) > self.limit:
+            self._fields.popitem(last=False)
+        return field
+
+    def lookup(self, width, height, dest):
+        """
+        h towards dest, indexed by cell id: the cached field if one has
+        been built, or else one that computes h per cell when read
+        """
+        grid = self.grid
+        if not self.current or (width, height) != (grid.width, grid.height):
+            return _OCTILE.lookup(width, height, dest)
+        field = self._fields.get(tuple(dest))
+        if field is not None:
+            self._fields.move_to_end(tuple(dest))
+            return field
+        return Heuristic.lookup(self, width, height, dest)
+
+    # ----- Files ---------------------------- #
+
+    def save(self, path):
+        """Writes the landmarks and tables to a file, see the module docstring"""
+        grid = self.grid
+        header = HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            0,
+            0,
+            grid.width,
+            grid.height,
+            len(self.landmarks),
+            walls_crc(grid),
+        )
+        with open(path, "wb") as file:
+            file.write(header)
+            file.write(np.asarray(self.landmarks, dtype="<i4").tobytes())
+            file.write(np.asarray(self.tables, dtype="<f4").tobytes())
+
+    @classmethod
+    def load(cls, path, grid, memory_map=True):
+        """
+        Loads the tables saved for grid. They are memory mapped read-only
+        unless memory_map is False. Raises ValueError if the file was saved
+        for other walls.
+        """
+        grid = as_grid(grid)
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError("Too short for a landmark file")
+            magic, version, _, _, width, height, count, walls = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError("Not a landmark file")
+            if version > FORMAT_VERSION:
+                raise ValueError(
+                    f"Landmark file version {version} is newer than this reader"
+                )
+            if (width, height) != (grid.width, grid.height):
+                raise ValueError(
+                    f"Landmarks are for {width}x{height}, "
+                    f"not {grid.width}x{grid.height}"
+                )
+            if walls != walls_crc(grid):
+                raise ValueError("Landmarks were built for other walls")
+            landmarks = np.frombuffer(file.read(4 * count), dtype="<i4").tolist()
+            shape = (count, width * height)
+            offset = HEADER.size + 4 * count
+            if not memory_map:
+                tables = np.fromfile(file, dtype="<f4", count=count * width * height)
+                if tables.size != count * width * height:
+                    raise ValueError(f"Expected {count} tables")
+                return cls(grid, landmarks, tables.reshape(shape))
+        try:
+            tables = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=shape)
+        except ValueError:
+            raise ValueError(f"Expected {count} tables") from None
+        return cls(grid, landmarks, tables)
+
+    def __repr__(self):
+        return f"Landmarks({len(self.landmarks)} on {self.grid!r})"
+
+
+def _distances(graph, source):
+    """
+    Distance from source to every node as float32, inf where it can't
+    reach, and each node's parent in the shortest path tree, -1 for
+    source and unreached nodes
+    """
+    offsets = graph.offsets
+    degrees = graph.degrees
+    targets = graph.targets
+    costs = graph.costs
+    distance = array("d", [INFINITY]) * graph.size
+    parent = array("i", [-1]) * graph.size
+    done = bytearray(graph.size)
+    distance[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        current, node = heappop(heap)
+        if done[node]:
+            continue
+        done[node] = 1
+        offset = offsets[node]
+        for k in range(offset, offset + degrees[node]):
+            target = targets[k]
+            tentative = current + costs[k]
+            if tentative < distance[target]:
+                distance[target] = tentative
+                parent[target] = node
+                heappush(heap, (tentative, target))
+    return (
+        np.frombuffer(distance, dtype=np.float64).astype(np.float32),
+        np.frombuffer(parent, dtype=np.int32),
+    )
+
+
+# ----- Strategies ----------------------- #
+
+
+def _farthest(graph, free, landmarks, tables, random):
+    if not tables:
+        # The cell farthest from a random one is on the edge of the map
+        seed = int(free[random.randrange(len(free))])
+        distance = _distances(graph, seed)[0]
+    else:
+        distance = np.min(tables, axis=0)
+    # Cells no landmark reaches are left to other components
+    reached = np.where(np.isfinite(distance), distance, -1)
+    best = int(reached.argmax())
+    return best if reached[best] >= 0 else None
+
+
+def _avoid(graph, free, landmarks, tables, random):
+    root = int(free[random.randrange(len(free))])
+    distance, tree = _distances(graph, root)
+
+    # Weigh each cell by how much the bound so far falls short of its
+    # distance from root
+    bound = np.array(_OCTILE.field(graph.width, graph.height, graph.grid.coords(root)))
+    for table in tables:
+        if table[root] != np.inf:
+            np.maximum(bound, np.abs(table - table[root]), out=bound)
+    reached = np.isfinite(distance)
+    weight = np.zeros(len(distance))
+    weight[reached] = np.maximum(distance[reached] - bound[reached], 0)
+
+    cells = np.flatnonzero(tree != -1)
+    parents = tree[cells]
+    # Children come before their parents when sorted by distance, far first
+    order = np.argsort(-distance[cells], kind="stable")
+
+    # Sum the weights of every branch, children into parents. Branches
+    # holding a landmark are worth nothing.
+    size = weight.tolist()
+    blocked = [False] * len(size)
+    for cell in landmarks:
+        blocked[cell] = True
+    bestChild = {}
+    for cell, parent in zip(cells[order].tolist(), parents[order].tolist()):
+        if blocked[cell]:
+            blocked[parent] = True
+            size[cell] = 0.0
+            continue
+        size[parent] += size[cell]
+        best = bestChild.get(parent)
+        if best is None or size[cell] > size[best]:
+            bestChild[parent] = cell
+    size = np.array(size)
+    size[np.array(blocked)] = 0.0
+
+    # Follow the heaviest branch down to a leaf
+    cell = int(size.argmax())
+    if size[cell] <= 0:
+        # The bound is already exact from root, as on open maps
+        return _farthest(graph, free, landmarks, tables, random)
+    while cell in bestChild:
+        cell = bestChild[cell]
+    return cell
@@ -0,0 +1,114 @@
+"""
+Loaders for the MovingAI benchmark formats, see https://movingai.com/benchmarks/
+
+.map files:
+    type octile
+    height 512
+    width 512
+    map
+    (height rows of width characters)
+
+    "." and "G" are ground and "S" swamp, all passable. "@" and "O" are out
+    of bounds, "T" trees and "W" water, all loaded as walls.
+
+.scen files:
+    version 1
+    (one line per problem, tab separated)
+    bucket  map  map width  map height  start x  start y  goal x  goal y  optimal length
+
+Scenario optimal lengths assume diagonal moves can't cut corners. Searches
+on a Grid can, so their paths may come out slightly shorter.
+
+Usage:
+    grid = read_map("arena.map")
+    for scenario in read_scen("arena.map.scen"):
+        result = solve(grid, scenario.start, scenario.goal, "Octile Dist")
+"""
+
+from .grid import EMPTY, WALL, Grid
+
+PASSABLE = ".GS"
+
+# bytes.translate table from map characters to cell codes
+_TO_CODES = bytes(EMPTY if chr(i) in PASSABLE else WALL for i in range(256))
+
+
+class Scenario:
+    """One start and goal on a map, with the length of the best path"""
+
+    def __init__(self, bucket, map_name, width, height, start, goal, optimal):
+        self.bucket = bucket
+        self.map_name = map_name  # File name of the map, as written in the .scen
+        self.width = width
+        self.height = height
+        self.start = start
+        self.goal = goal
+        self.optimal = optimal
+
+    def __repr__(self):
+        return (
+            f"Scenario({self.map_name!r}, {self.start} -> {self.goal}, {self.optimal})"
+        )
+
+
+def parse_map(text):
+    """Builds a Grid from the text of a .map file"""
+    lines = text.splitlines()
+    header = {}
+    for i, line in enumerate(lines):
+        if line.strip() == "map":
+            rows = lines[i + 1 :]
+            break
+        key, _, value = line.partition(" ")
+        header[key] = value.strip()
+    else:
+        raise ValueError("No 'map' line in .map file")
+
+    try:
+        width = int(header["width"])
+        height = int(header["height"])
+    except (KeyError, ValueError):
+        raise ValueError("The .map header needs a width and a height") from None
+    rows = [row.rstrip("\r\n") for row in rows[:height]]
+    if len(rows) != height or any(len(row) != width for row in rows):
+        raise ValueError(f"Expected {height} rows of {width} characters")
+    code = "".join(rows).encode("ascii", "replace")
+    return Grid(width, height, bytearray(code.translate(_TO_CODES)))
+
+
+def read_map(path):
+    """Loads a .map file as a Grid"""
+    with open(path) as file:
+        return parse_map(file.read())
+
+
+def parse_scen(text):
+    """Returns the Scenarios in the text of a .scen file"""
+    scenarios = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.startswith("version"):
+            continue
+        fields = line.split("\t")
+        if len(fields) != 9:
+            fields = line.split()  # Some files use spaces
+        if len(fields) != 9:
+            raise ValueError(f"Line {number} of .scen file has {len(fields)} fields")
+        bucket, mapName, width, height, startX, startY, goalX, goalY, optimal = fields
+        scenarios.append(
+            Scenario(
+                int(bucket),
+                mapName,
+                int(width),
+                int(height),
+                (int(startX), int(startY)),
+                (int(goalX), int(goalY)),
+                float(optimal),
+            )
+        )
+    return scenarios
+
+
+def read_scen(path):
+    """Loads the Scenarios of a .scen file"""
+    with open(path) as file:
+        return parse_scen(file.read())
@@ -0,0 +1,535 @@
+"""
+Compressed path databases, for static maps queried often.
+
+For every source cell, the database holds the first move of a shortest
+path towards every target cell. A query then reads its path one move at a
+time: look up the first move from start to dest, take it, and look up the
+first move from there, with no search at all. Paths are optimal, with the
+moves and costs a_star() uses.
+
+A full table would take a byte per pair of cells. Most rows are long
+stretches of the same move, though, so each row is run-length encoded:
+only the positions where the move changes are stored, and a lookup is a
+binary search in its row. Several moves are often equally good, so the
+builder keeps every optimal first move and picks, along each row, the one
+that keeps the current run going. Targets that are walls, and the source
+itself, fit any run.
+
+How long the runs are depends on the order cells are numbered in along
+each row. ORDERINGS:
+
+    dfs   depth-first order through the free cells, so cells close
+          together on the map are close together in a row (the default)
+    row   cell ids, row after row of the grid
+
+Based on: Strasser, Botea & Harabor, "Compressing Optimal Paths with Run
+Length Encoding" (JAIR, 2015).
+
+Building runs one Dijkstra search per free cell. That is slow on big
+maps but is done once, offline, optionally across processes. The result
+is saved to a file that is memory mapped when loaded, so opening a
+database costs no time and queries only touch the rows they read.
+
+File layout, little-endian:
+    header      32 bytes, see HEADER
+        magic     4s  b"PFPD"
+        version   B   FORMAT_VERSION
+        ordering  B   index into ORDERINGS
+        reserved  H
+        width     I
+        height    I
+        walls     I   CRC-32 of the grid's walls, checked on load
+        reserved  I
+        runs      Q   runs in all rows
+    offsets     width * height + 1 run indexes, uint64: row n's runs are
+                offsets[n] to offsets[n + 1]
+    rank        width * height positions of each cell in the ordering,
+                uint32
+    starts      runs rank where each run starts, uint32
+    moves       runs moves, uint8: an index into DIRECTIONS, or NO_PATH
+
+Usage:
+    database = PathDatabase.build(grid)
+    database.save("arena.pdb")
+    database = PathDatabase.load("arena.pdb", grid)
+    result = database.path((0, 0), (49, 49))
+
+    python -m pathfinder.pathdb build arena.txt arena.pdb [--workers 4]
+    python -m pathfinder.pathdb verify arena.txt arena.pdb [--queries 1000]
+
+Map files hold the text "Save to Clipboard" copies, one line per row.
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from heapq import heappop, heappush
+from math import inf as INFINITY
+from random import Random
+from struct import Struct
+from time import perf_counter
+
+import numpy as np
+
+from .flowfield import NO_MOVE
+from .grid import WALL, Grid, as_grid, walls_crc
+from .search import DIRECTIONS, NOT_FOUND, SearchResult, a_star
+from .stats import SearchStats, clock, record
+
+ORDERINGS = ("dfs", "row")
+
+NO_PATH = len(DIRECTIONS)  # The move stored for targets that can't be reached
+
+MAGIC = b"PFPD"
+FORMAT_VERSION = 1
+HEADER = Struct("<4sBBHIIIIQ")
+
+TOLERANCE = 1e-6  # Paths this close in cost are equally short
+
+# First-move sets are bitmasks, one bit per move, and one for NO_PATH
+_UNREACHED = 1 << NO_PATH
+_ANY = (1 << (NO_PATH + 1)) - 1
+
+# Set in each worker by _attach()
+_neighbors = None
+_order = None
+_template = None
+
+
+class PathDatabase:
+    """
+    First moves from every cell to every other of one grid, see the module
+    docstring. Build one with build() or load().
+    """
+
+    def __init__(self, grid, ordering, offsets, rank, starts, moves):
+        self.grid = as_grid(grid)
+        self.ordering = ordering
+        self.offsets = offsets
+        self.rank = rank
+        self.starts = starts
+        self.moves = moves
+        self.version = self.grid.version
+
+    @classmethod
+    def build(cls, grid, ordering="dfs", workers=1, progress=None):
+        """
+        Runs a search from every cell of grid. workers > 1 spreads them
+        across processes, None uses every CPU. progress(done, total) is
+        called every so many rows.
+        """
+        if ordering not in ORDERINGS:
+            raise ValueError(f"Unknown ordering {ordering!r}")
+        grid = as_grid(grid)
+        size = grid.width * grid.height
+        neighbors = _neighbor_lists(grid)
+        order = _ordering(grid, neighbors, ordering)
+        rank = np.empty(size, dtype="<u4")
+        rank[order] = np.arange(size, dtype="<u4")
+        template = [_UNREACHED if cell != WALL else _ANY for cell in grid.cells]
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, size))
+        if workers == 1:
+            _attach(neighbors, order, template)
+            rows = map(_compress_row, range(size))
+            pool = None
+        else:
+            from multiprocessing import Pool
+
+            pool = Pool(workers, _attach, (neighbors, order, template))
+            chunksize = max(1, size // (workers * 16))
+            rows = pool.imap(_compress_row, range(size), chunksize)
+
+        offsets = np.zeros(size + 1, dtype="<u8")
+        starts = []
+        moves = []
+        try:
+            for source, (rowStarts, rowMoves) in enumerate(rows):
+                offsets[source + 1] = offsets[source] + len(rowMoves)
+                starts.append(rowStarts)
+                moves.append(rowMoves)
+                done = source + 1
+                if progress is not None and done % 256 == 0 and done < size:
+                    progress(done, size)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if progress is not None:
+            progress(size, size)
+        return cls(
+            grid,
+            ordering,
+            offsets,
+            rank,
+            np.frombuffer(b"".join(starts), dtype="<u4"),
+            np.frombuffer(b"".join(moves), dtype=np.uint8),
+        )
+
+    @property
+    def current(self):
+        """False once walls have changed since the database was built"""
+        return self.grid.version == self.version
+
+    @property
+    def runs(self):
+        return len(self.moves)
+
+    @property
+    def nbytes(self):
+        """Size of the database, as saved"""
+        parts = (self.offsets, self.rank, self.starts, self.moves)
+        return HEADER.size + sum(part.nbytes for part in parts)
+
+    # ----- Queries -------------------------- #
+
+    def _lookup(self, source, rank):
+        """The move stored in source's row for the target of rank"""
+        first = int(self.offsets[source])
+        last = int(self.offsets[source + 1])
+        k = first + int(np.searchsorted(self.starts[first:last], rank, "right")) - 1
+        return int(self.moves[k])
+
+    def first_move(self, start, dest):
+        """
+        Index into DIRECTIONS of the first move from start towards dest,
+        or NO_MOVE if there is none
+        """
+        grid = self.grid
+        source = grid.index(*start)
+        target = grid.index(*dest)
+        if source == target or WALL in (grid.cells[source], grid.cells[target]):
+            return NO_MOVE
+        move = self._lookup(source, int(self.rank[target]))
+        return NO_MOVE if move == NO_PATH else move
+
+    def path(self, start, dest):
+        """
+        Reads the path from start to dest one move at a time.
+        Returns a SearchResult, with cycles counting the lookups made.
+        Walls have no row, so there are no paths from or to them.
+        Raises ValueError if the walls changed since the database was built.
+        """
+        if not self.current:
+            raise ValueError("The path database was built for other walls")
+        started = clock()
+        stats = SearchStats("Path Database", "Octile Dist")
+        grid = self.grid
+        width = grid.width
+        x, y = start
+        cell = grid.index(x, y)
+        target = grid.index(*dest)
+        path = [(x, y)]
+        lookups = 0
+        found = WALL not in (grid.cells[cell], grid.cells[target])
+        if found:
+            rank = int(self.rank[target])
+            while cell != target:
+                move = self._lookup(cell, rank)
+                lookups += 1
+                if move == NO_PATH:
+                    found = False
+                    break
+                dx, dy, _ = DIRECTIONS[move]
+                x += dx
+                y += dy
+                cell = y * width + x
+                path.append((x, y))
+        stats.extra["lookups"] = lookups
+        record(stats, started)
+        if not found:
+            return SearchResult(None, lookups, round(stats.wall_ms), NOT_FOUND, stats)
+        return SearchResult(path, lookups, round(stats.wall_ms), stats=stats)
+
+    # ----- Files ---------------------------- #
+
+    def save(self, path):
+        """Writes the database to a file, see the module docstring"""
+        grid = self.grid
+        header = HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            ORDERINGS.index(self.ordering),
+            0,
+            grid.width,
+            grid.height,
+            walls_crc(grid),
+            0,
+            self.runs,
+        )
+        with open(path, "wb") as file:
+            file.write(header)
+            file.write(np.asarray(self.offsets, dtype="<u8").tobytes())
+            file.write(np.asarray(self.rank, dtype="<u4").tobytes())
+            file.write(np.asarray(self.starts, dtype="<u4").tobytes())
+            file.write(np.asarray(self.moves, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, path, grid, memory_map=True):
+        """
+        Loads the database saved for grid. It is memory mapped read-only
+        unless memory_map is False. Raises ValueError if the file was saved
+        for other walls.
+        """
+        grid = as_grid(grid)
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("Too short for a path database")
+        magic, version, ordering, _, width, height, walls, _, runs = HEADER.unpack(
+            header
+        )
+        if magic != MAGIC:
+            raise ValueError("Not a path database")
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                f"Path database version {version} is newer than this reader"
+            )
+        if (width, height) != (grid.width, grid.height):
+            raise ValueError(
+                f"Path database is for {width}x{height}, "
+                f"not {grid.width}x{grid.height}"
+            )
+        if walls != walls_crc(grid):
+            raise ValueError("Path database was built for other walls")
+
+        size = width * height
+        if memory_map:
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            data = np.fromfile(path, dtype=np.uint8)
+        if len(data) != HEADER.size + 12 * size + 8 + 5 * runs:
+            raise ValueError(f"Expected {runs} runs")
+        offset = HEADER.size
+        arrays = []
+        for dtype, count in (("<u8", size + 1), ("<u4", size), ("<u4", runs)):
+            arrays.append(np.frombuffer(data, dtype, count, offset))
+            offset += arrays[-1].nbytes
+        moves = np.frombuffer(data, np.uint8, runs, offset)
+        return cls(grid, ORDERINGS[ordering], *arrays, moves)
+
+    def __repr__(self):
+        return f"PathDatabase({self.runs} runs on {self.grid!r})"
+
+
+# ----- Building ------------------------- #
+
+
+def _neighbor_lists(grid):
+    """(neighbor, cost, move bit) of every move from each cell"""
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    neighbors = []
+    for cell in range(width * height):
+        row = []
+        if cells[cell] != WALL:
+            x = cell % width
+            y = cell // width
+            for move, (dx, dy, cost) in enumerate(DIRECTIONS):
+                neighborX = x + dx
+                neighborY = y + dy
+                if 0 <= neighborX < width and 0 <= neighborY < height:
+                    neighbor = neighborY * width + neighborX
+                    if cells[neighbor] != WALL:
+                        row.append((neighbor, cost, 1 << move))
+        neighbors.append(row)
+    return neighbors
+
+
+def _ordering(grid, neighbors, ordering):
+    """Cell ids in the order rows list their targets, see ORDERINGS"""
+    size = grid.width * grid.height
+    if ordering == "row":
+        return list(range(size))
+    order = []
+    seen = bytearray(size)
+    for root in range(size):
+        if seen[root] or grid.cells[root] == WALL:
+            continue
+        stack = [root]
+        while stack:
+            cell = stack.pop()
+            if seen[cell]:
+                continue
+            seen[cell] = 1
+            order.append(cell)
+            # Reversed, so the first move in DIRECTIONS is visited first
+            for neighbor, _, _ in reversed(neighbors[cell]):
+                if not seen[neighbor]:
+                    stack.append(neighbor)
+    # Walls fit any run, so where they go hardly matters
+    order.extend(cell for cell in range(size) if not seen[cell])
+    return order
+
+
+def _attach(neighbors, order, template):
+    """Worker initializer, and the same for a build in this process"""
+    global _neighbors, _order, _template
+    _neighbors = neighbors
+    _order = order
+    _template = template
+
+
+def _first_moves(source):
+    """
+    Every optimal first move from source to each cell, as bitmasks:
+    _UNREACHED where source can't reach, _ANY for walls and source
+    """
+    neighbors = _neighbors
+    masks = _template[:]
+    masks[source] = _ANY
+    if not neighbors[source]:
+        return masks
+    distance = [INFINITY] * len(masks)
+    distance[source] = 0.0
+    heap = []
+    for neighbor, cost, bit in neighbors[source]:
+        distance[neighbor] = cost
+        masks[neighbor] = bit
+        heappush(heap, (cost, neighbor))
+    while heap:
+        current, cell = heappop(heap)
+        if current > distance[cell]:
+            continue  # Stale entry
+        mask = masks[cell]
+        for neighbor, cost, _ in neighbors[cell]:
+            tentative = current + cost
+            known = distance[neighbor]
+            if tentative < known - TOLERANCE:
+                distance[neighbor] = tentative
+                masks[neighbor] = mask
+                heappush(heap, (tentative, neighbor))
+            elif tentative <= known + TOLERANCE:
+                masks[neighbor] |= mask  # Just as short another way
+    return masks
+
+
+def _compress_row(source):
+    """
+    Source's row as (starts, moves) bytes, with the fewest runs the
+    ordering allows: each run goes on while some move is optimal for all
+    of its targets
+    """
+    masks = _first_moves(source)
+    starts = array("I")
+    moves = bytearray()
+    runStart = 0
+    common = _ANY
+    for rank, cell in enumerate(_order):
+        mask = masks[cell]
+        if common & mask:
+            common &= mask
+            continue
+        starts.append(runStart)
+        moves.append((common & -common).bit_length() - 1)
+        runStart = rank
+        common = mask
+    starts.append(runStart)
+    moves.append((common & -common).bit_length() - 1)
+    if sys.byteorder != "little":
+        starts.byteswap()
+    return starts.tobytes(), bytes(moves)
+
+
+# ----- Command line --------------------- #
+
+
+def verify(database, queries=1000, seed=0):
+    """
+    Checks queries random pairs of free cells against a_star() with
+    Octile Dist. Returns (start, dest, expected, got) for each mismatch,
+    and the total seconds spent by each.
+    """
+    grid = database.grid
+    free = [
+        grid.coords(i) for i in range(grid.width * grid.height) if grid.cells[i] != WALL
+    ]
+    random = Random(seed)
+    mismatches = []
+    searchTime = lookupTime = 0.0
+    for _ in range(queries if len(free) > 1 else 0):
+        start, dest = random.sample(free, 2)
+        oldtime = perf_counter()
+        expected = a_star(grid, start, dest, "Octile Dist")
+        searchTime += perf_counter() - oldtime
+        oldtime = perf_counter()
+        got = database.path(start, dest)
+        lookupTime += perf_counter() - oldtime
+        if got.found != expected.found or (
+            got.found and abs(got.length - expected.length) > 1e-3
+        ):
+            mismatches.append((start, dest, expected, got))
+    return mismatches, searchTime, lookupTime
+
+
+def _read_map(path):
+    with open(path) as file:
+        return Grid.from_text(file.read())
+
+
+def _print_progress(done, total):
+    print(f"\r{done}/{total} rows", end="", file=sys.stderr, flush=True)
+    if done == total:
+        print(file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Builds and checks compressed path databases.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a database for a map")
+    build.add_argument("map", help="map as text, one line per row")
+    build.add_argument("output", help="database file to write")
+    build.add_argument("--ordering", choices=ORDERINGS, default="dfs")
+    build.add_argument(
+        "--workers", type=int, default=1, help="processes to build with (default 1)"
+    )
+    check = commands.add_parser("verify", help="check a database against A*")
+    check.add_argument("map", help="map as text, one line per row")
+    check.add_argument("database", help="database file to check")
+    check.add_argument(
+        "--queries", type=int, default=1000, help="random pairs to check (default 1000)"
+    )
+    check.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid = _read_map(args.map)
+    size = grid.width * grid.height
+    if args.command == "build":
+        oldtime = perf_counter()
+        database = PathDatabase.build(
+            grid, args.ordering, args.workers, progress=_print_progress
+        )
+        database.save(args.output)
+        print(
+            f"{grid.width}x{grid.height}: {database.runs} runs, "
+            f"{database.nbytes / 1024:.1f} KiB "
+            f"({database.nbytes / max(1, size * size):.1%} of a full table), "
+            f"built in {perf_counter() - oldtime:.1f}s"
+        )
+        return
+
+    try:
+        database = PathDatabase.load(args.database, grid)
+    except ValueError as error:
+        parser.exit(2, f"{args.database}: {error}\n")
+    mismatches, searchTime, lookupTime = verify(database, args.queries, args.seed)
+    for start, dest, expected, got in mismatches:
+        print(f"{start} -> {dest}: A* {expected.length}, database {got.length}")
+    queries = max(1, args.queries)
+    print(
+        f"{args.queries - len(mismatches)}/{args.queries} paths match A*, "
+        f"A* {searchTime / queries * 1000:.3f} ms, "
+        f"database {lookupTime / queries * 1000:.3f} ms per query"
+    )
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""
+Headless A* search.
+
+Nothing in here touches pygame or tkinter, so it can be imported by server
+workers and batch jobs without a display. The GUI in main.py is a client of
+this module.
+
+Searches run on a pathfinder.grid.Grid. A list of rows of cell characters
+is also accepted and converted:
+
+    "." = Empty space
+    "#" = Wall/Barrier
+    "O" = Start
+    "X" = Destination
+    "@" = Path
+"""
+
+from heapq import heappop, heappush
+from math import sqrt
+
+from .context import POOL
+from .grid import WALL, as_grid
+from .heuristics import HEURISTICS, get_heuristic
+from .stats import SearchStats, clock, publish, record
+
+METHODS = tuple(HEURISTICS)
+ALGORITHMS = ("A*", "JPS", "Bidirectional", "ARA*", "IDA*")
+
+SQRT2 = sqrt(2)
+
+# (dx, dy, cost) of every move, diagonals included
+DIRECTIONS = (
+    (-1, 0, 1.0),  # Left
+    (-1, -1, SQRT2),  # Top left
+    (-1, 1, SQRT2),  # Bottom left
+    (1, 0, 1.0),  # Right
+    (1, -1, SQRT2),  # Top right
+    (1, 1, SQRT2),  # Bottom right
+    (0, -1, 1.0),  # Top
+    (0, 1, 1.0),  # Bottom
+)
+
+NOT_FOUND = "Path not found."
+TOO_LONG = "Path took too long."
+
+# Kinds of search event, see a_star(events=...)
+OPENED = "opened"  # A cell was reached for the first time
+CLOSED = "closed"  # A cell was expanded
+REPARENTED = "reparented"  # A cell was reached again by a cheaper path
+
+
+class SearchResult:
+    """
+    The outcome of a single search.
+
+    path is a list of (x, y) tuples from start to dest, or None on failure,
+    in which case reason says why. stats is the search's SearchStats, see
+    pathfinder.stats.
+    """
+
+    def __init__(self, path, cycles, ms, reason=None, stats=None):
+        self.path = path
+        self.cycles = cycles  # Loop cycles (expansions)
+        self.ms = ms  # Wall time in milliseconds
+        self.reason = reason
+        self.stats = stats if stats is not None else SearchStats()
+
+    @classmethod
+    def finish(cls, stats, started, path=None, reason=None):
+        """
+        The result of a search that just ended, timed from started (see
+        pathfinder.stats.clock()). The stats are published to the hooks.
+        """
+        record(stats, started)
+        return cls(path, stats.expanded, round(stats.wall_ms), reason, stats)
+
+    @classmethod
+    def rejected(cls, algorithm, method):
+        """
+        The not found result of a query turned down without a search, as
+        by a ComponentIndex. The stats are published to the hooks.
+        """
+        stats = SearchStats(
+            algorithm, get_heuristic(method).name, extra={"rejected": True}
+        )
+        publish(stats)
+        return cls(None, 0, 0, NOT_FOUND, stats)
+
+    @property
+    def found(self):
+        return self.path is not None
+
+    @property
+    def length(self):
+        if not self.found:
+            return None
+        if not isinstance(self.path[0], tuple):
+            # Node ids of a pathfinder.graph.Graph, which knows the cost
+            return round(self.stats.extra["cost"] * 1000) / 1000
+        return path_length(self.path)
+
+    def __repr__(self):
+        if not self.found:
+            return f"SearchResult({self.reason!r}, cycles={self.cycles})"
+        return f"SearchResult(length={self.length}, cycles={self.cycles})"
+
+
+def heuristic(start, end, method="Manhattan"):
+    """
+    Usage: Tuple inputs for start and end coords.
+    Calculate distance from point to point with a method from METHODS,
+    see pathfinder.heuristics.
+    """
+    return get_heuristic(method)(start, end)
+
+
+def calc_cost(start, end):
+    """Cost of a single step, 1 for straight moves and sqrt(2) for diagonals"""
+    sx, sy = start
+    ex, ey = end
+    if (sx == ex) or (sy == ey):
+        return 1.0
+    else:
+        return SQRT2
+
+
+def find_neighbors(grid, node):
+    """
+    Returns every non-wall cell around a node, diagonals included.
+    """
+    neighbors = []
+    x, y = node
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    for nx, ny in (
+        (x - 1, y),  # Left
+        (x - 1, y - 1),  # Top left
+        (x - 1, y + 1),  # Bottom left
+        (x + 1, y),  # Right
+        (x + 1, y - 1),  # Top right
+        (x + 1, y + 1),  # Bottom right
+        (x, y - 1),  # Top
+        (x, y + 1),  # Bottom
+    ):
+        if 0 <= nx < width and 0 <= ny < height:  # Account for edges
+            if cells[ny * width + nx] != WALL:  # If it is not a wall,
+                neighbors.append((nx, ny))  # add to neighbors list
+
+    return neighbors
+
+
+def path_length(path):
+    """Sum of the step costs along a path, rounded to 3 places"""
+    length = 0
+    oldnode = path[0]
+    for node in path[1:]:
+        length += calc_cost(oldnode, node)
+        oldnode = node
+
+    return round(length * 1000) / 1000
+
+
+def a_star(
+    grid,
+    start,
+    dest,
+    method="Manhattan",
+    dynamic_weight=False,
+    optimality_bound=10,
+    on_step=None,
+    context=None,
+    events=None,
+):
+    """
+    The A* pathfinding algorithm.
+
+    Takes a starting point and ending point and calculates the fastest path
+    between them. Returns a SearchResult.
+
+    method is a name from METHODS or a pathfinder.heuristics.Heuristic.
+
+    WEIGHTING: -------------------------------
+    USES:
+
+    Weighted A* (pwXD), when dynamic_weight is set
+        [h > g]: f = g+h; [h ≤ g]: f = (g+(2w-1)h)/w
+
+    on_step(context, current) is called after every cycle with the cell id
+    just expanded, which lets a caller visualize the search or keep a window
+    responsive. context.path_to(current, grid) gives the path to it.
+
+    events, if given, is anything with an append() method, usually a list.
+    The search appends (kind, cell, parent) tuples to it as it goes, with
+    kind one of OPENED, CLOSED and REPARENTED, so a visualizer can replay
+    the search at its own pace.
+
+    The search arrays come from a shared ContextPool unless a SearchContext
+    is passed in.
+
+    grid may also be a pathfinder.graph.Graph, which is searched through
+    its compiled rows.
+    """
+    steps = a_star_steps(
+        grid, start, dest, method, dynamic_weight, optimality_bound, context, events
+    )
+    return run_steps(steps, on_step)
+
+
+def a_star_steps(
+    grid,
+    start,
+    dest,
+    method="Manhattan",
+    dynamic_weight=False,
+    optimality_bound=10,
+    context=None,
+    events=None,
+):
+    """
+    a_star() as a generator, so a search can run a slice at a time.
+    Yields (context, cell) after every cycle and returns the SearchResult.
+    Closing it early gives the search arrays back to the pool.
+
+    Usage: see pathfinder.tasks.Search
+    """
+    from .graph import Graph, graph_steps  # graph imports this module
+
+    if isinstance(grid, Graph):
+        return (
+            yield from graph_steps(
+                grid,
+                start,
+                dest,
+                method,
+                dynamic_weight,
+                optimality_bound,
+                context,
+                events,
+            )
+        )
+    method = get_heuristic(method)
+    grid = as_grid(grid)
+    if context is None:
+        with POOL.context(grid.width * grid.height) as context:
+            return (
+                yield from _search(
+                    grid,
+                    start,
+                    dest,
+                    method,
+                    dynamic_weight,
+                    optimality_bound,
+                    context,
+                    events,
+                )
+            )
+    return (
+        yield from _search(
+            grid, start, dest, method, dynamic_weight, optimality_bound, context, events
+        )
+    )
+
+
+def run_steps(steps, on_step=None):
+    """
+    Runs a search generator to the end and returns its SearchResult,
+    calling on_step(context, cell) after every step.
+    """
+    while True:
+        try:
+            context, current = next(steps)
+        except StopIteration as done:
+            return done.value
+        if on_step is not None:
+            on_step(context, current)
+
+
+def _search(
+    grid, start, dest, method, dynamic_weight, optimality_bound, context, events
+):
+    ## heuristic() is used as h() ##
+    ## Inspired by https://en.wikipedia.org/wiki/A*_search_algorithm
+    started = clock()
+    width = grid.width
+    height = grid.height
+    cells = grid.cells
+    # Cells are referred to by id, y * width + x
+    startID = grid.index(*start)
+    destID = grid.index(*dest)
+
+    # h per cell id, from a cached field or computed as cells are pushed
+    hField = method.lookup(width, height, dest)
+
+    # For cell n, gScore[n] is the cost of the cheapest path from
+    # start to n currently known, and cameFrom[n] is the cell immediately
+    # preceding it on that path. Both only count where seen[n] == gen.
+    gScore = context.g
+    cameFrom = context.parent
+    seen = context.seen
+    # Cells that have been expanded, where closedSet[n] == gen
+    closedSet = context.closed
+    gen = context.begin()
+
+    seen[startID] = gen
+    gScore[startID] = 0
+    cameFrom[startID] = -1
+
+    # The set of discovered cells that may need to be expanded, as a
+    # binary heap of (f, h, cell) entries. Ties on f go to the lower h,
+    # then to the cell id, so the search order is deterministic.
+    # Entries are never removed from the middle of the heap; when a cell
+    # gets a better g it is pushed again, and the old entry is skipped
+    # when it comes off the top because the cell is closed by then
+    # (lazy deletion).
+    startH = hField[startID]
+    openSet = [(startH, startH, startID)]
+
+    # To record the loop cycles, and the counters for SearchStats
+    cycles = 0
+    generated = 0
+    pushes = 1
+    peakOpen = 1
+
+    emit = events.append if events is not None else None
+    if emit is not None:
+        emit((OPENED, startID, -1))
+
+    while openSet:  # While not empty
+        # Take the cell in the openSet with the lowest f value
+        current = heappop(openSet)[2]
+        if closedSet[current] == gen:
+            continue  # Stale entry, the cell was already expanded
+        closedSet[current] = gen
+        if emit is not None:
+            emit((CLOSED, current, cameFrom[current]))
+
+        if current == destID:
+            # We found the destination
+            path = context.path_to(current, grid)  # Recreate path to destination
+            return SearchResult.finish(
+                _stats(method, cycles, generated, pushes, peakOpen), started, path
+            )
+
+        currentX = current % width
+        currentY = current // width
+        currentG = gScore[current]
+        # Go through all valid neighbors
+        for dx, dy, cost in DIRECTIONS:
+            neighborX = currentX + dx
+            neighborY = currentY + dy
+            if not (0 <= neighborX < width and 0 <= neighborY < height):
+                continue  # Account for edges
+            neighbor = neighborY * width + neighborX
+            if cells[neighbor] == WALL:
+                continue
+            generated += 1
+            if closedSet[neighbor] == gen:
+                continue
+            # tempG is the distance from the start to the neighbor, through current cell
+            tempG = currentG + cost
+            if seen[neighbor] != gen or tempG < gScore[neighbor]:
+                # This is the best path so far to the neighbor
+                pushes += 1
+                if emit is not None:
+                    kind = OPENED if seen[neighbor] != gen else REPARENTED
+                    emit((kind, neighbor, current))
+                # Record values
+                seen[neighbor] = gen
+                cameFrom[neighbor] = current
+                gScore[neighbor] = tempG
+                tempH = hField[neighbor]
+                if not dynamic_weight:
+                    tempF = tempG + tempH
+                else:
+                    """
+                    (A* pwXD)
+                    [h > g]: f = g+h;
+                    [h ≤ g]: f = (g+(2w-1)h)/w
+                    """
+                    if tempH > tempG:
+                        tempF = tempG + tempH
+                    else:
+                        w = optimality_bound
+                        tempF = (tempG + (2 * w - 1) * tempH) / w
+
+                heappush(openSet, (tempF, tempH, neighbor))
+
+        if len(openSet) > peakOpen:
+            peakOpen = len(openSet)
+        cycles += 1
+        if cycles > width * height * 10:
+            return SearchResult.finish(
+                _stats(method, cycles, generated, pushes, peakOpen),
+                started,
+                reason=TOO_LONG,
+            )
+
+        yield context, current
+
+    return SearchResult.finish(
+        _stats(method, cycles, generated, pushes, peakOpen), started, reason=NOT_FOUND
+    )
+
+
+def _stats(method, cycles, generated, pushes, peakOpen):
+    return SearchStats(
+        "A*",
+        method.name,
+        expanded=cycles,
+        generated=generated,
+        pushes=pushes,
+        peak_open=peakOpen,
+        heuristic_evals=pushes,  # One hField lookup per push
+        duplicates=generated - (pushes - 1),  # Every push but the start's
+    )
+
+
+def solve(
+    grid,
+    start,
+    dest,
+    method="Manhattan",
+    dynamic_weight=False,
+    algorithm="A*",
+    on_step=None,
+    **kwargs,
+):
+    """
+    Finds a path from start to dest on a grid with one of ALGORITHMS.
+
+    method, dynamic_weight and optimality_bound only apply to A*, method
+    to Bidirectional, and method and optimality_bound, the first weight, to
+    ARA*. IDA* takes method and a budget of cells. JPS always searches with
+    Octile Dist.
+
+    Usage: solve(["O..", ".#.", "..X"], (0, 0), (2, 2), "Octile Dist")
+    """
+    steps = solve_steps(grid, start, dest, method, dynamic_weight, algorithm, **kwargs)
+    return run_steps(steps, on_step)
+
+
+def solve_steps(
+    grid,
+    start,
+    dest,
+    method="Manhattan",
+    dynamic_weight=False,
+    algorithm="A*",
+    **kwargs,
+):
+    """solve() as a generator, see a_star_steps()"""
+    if algorithm == "A*":
+        return a_star_steps(grid, start, dest, method, dynamic_weight, **kwargs)
+    elif algorithm == "JPS":
+        from .jps import jump_point_steps  # jps imports this module
+
+        kwargs.pop("optimality_bound", None)
+        return jump_point_steps(grid, start, dest, **kwargs)
+    elif algorithm == "Bidirectional":
+        from .bidirectional import bidirectional_steps
+
+        kwargs.pop("optimality_bound", None)
+        return bidirectional_steps(grid, start, dest, method, **kwargs)
+    elif algorithm == "ARA*":
+        from .ara import ara_star_steps
+
+        return ara_star_steps(grid, start, dest, method, **kwargs)
+    elif algorithm == "IDA*":
+        from .idastar import ida_star_steps
+
+        kwargs.pop("optimality_bound", None)
+        return ida_star_steps(grid, start, dest, method, **kwargs)
+    raise ValueError(f"Unknown algorithm {algorithm!r}")
@@ -0,0 +1,182 @@
+"""
+Per-search statistics, and hooks to gather them across many searches.
+
+Every search returns its counters as result.stats, a SearchStats, and
+hands them to each registered hook as it finishes. Hooks are called from
+whichever thread ran the search.
+
+Usage:
+    totals = StatsAggregator()
+    add_hook(totals)
+    solve(grid, (0, 0), (49, 49), "Octile Dist").stats.expanded
+    totals.summary()["A*"]["totals"]["pushes"]
+    remove_hook(totals)
+"""
+
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter, thread_time
+
+# Counters every search reports, zero where an algorithm has no such thing
+COUNTERS = (
+    "expanded",  # Cells (or abstract nodes) taken off the open list
+    "generated",  # Free neighbors looked at while expanding
+    "pushes",  # Entries pushed onto the open list
+    "reopened",  # Closed cells put back on the open list
+    "peak_open",  # Largest the open list got
+    "heuristic_evals",  # h values computed or looked up
+    "duplicates",  # Generated cells dropped, already closed or no cheaper
+    "wall_ms",  # Wall time, pauses between slices included
+    "cpu_ms",  # CPU time of the thread that ran the search
+)
+
+_hooks = []
+_lock = Lock()
+
+
+class SearchStats:
+    """
+    The counters of one search, see COUNTERS.
+
+    extra holds counters only one algorithm has, like the expansions on
+    each side of a bidirectional search.
+    """
+
+    def __init__(self, algorithm=None, method=None, extra=None, **counters):
+        self.algorithm = algorithm
+        self.method = method
+        for name in COUNTERS:
+            setattr(self, name, counters.pop(name, 0))
+        if counters:
+            raise TypeError(f"Unknown counters {sorted(counters)}")
+        self.extra = extra if extra is not None else {}
+
+    def as_dict(self):
+        """Every counter, plus algorithm, method and the extras"""
+        stats = {"algorithm": self.algorithm, "method": self.method}
+        for name in COUNTERS:
+            stats[name] = getattr(self, name)
+        stats.update(self.extra)
+        return stats
+
+    def __repr__(self):
+        return (
+            f"SearchStats({self.algorithm}, expanded={self.expanded}, "
+            f"pushes={self.pushes}, wall_ms={self.wall_ms:.3f})"
+        )
+
+
+def add_hook(hook):
+    """Calls hook(stats) after every search from now on"""
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _lock:
+        _hooks.remove(hook)
+
+
+def clear_hooks():
+    with _lock:
+        _hooks.clear()
+
+
+def publish(stats):
+    """Hands a finished search's stats to every hook. Called by the searches."""
+    for hook in tuple(_hooks):
+        hook(stats)
+
+
+def clock():
+    """The wall and CPU clocks, for record()"""
+    return perf_counter(), thread_time()
+
+
+def elapsed(stats, started):
+    """Sets wall_ms and cpu_ms to the time since started, a clock() reading"""
+    wall, cpu = started
+    stats.wall_ms = (perf_counter() - wall) * 1000
+    stats.cpu_ms = (thread_time() - cpu) * 1000
+    return stats
+
+
+def record(stats, started):
+    """elapsed(), then publishes the stats. Returns them."""
+    elapsed(stats, started)
+    publish(stats)
+    return stats
+
+
+class Histogram:
+    """
+    Counts values into buckets. bounds are the upper edges, inclusive, and
+    one more bucket holds everything above the last.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+
+    def as_dict(self):
+        """Bucket label to count, labelled "<=bound" and ">last" """
+        labels = [f"<={bound:g}" for bound in self.bounds]
+        labels.append(f">{self.bounds[-1]:g}")
+        return dict(zip(labels, self.counts))
+
+
+class StatsAggregator:
+    """
+    A hook that totals the counters of many searches per algorithm, with
+    histograms of wall time and expansions.
+    """
+
+    WALL_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+    EXPANDED = (10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+    def __init__(self):
+        self._lock = Lock()
+        self._groups = {}
+
+    def __call__(self, stats):
+        with self._lock:
+            group = self._groups.get(stats.algorithm)
+            if group is None:
+                group = self._groups[stats.algorithm] = {
+                    "searches": 0,
+                    "totals": dict.fromkeys(COUNTERS, 0),
+                    "wall_ms": Histogram(self.WALL_MS),
+                    "expanded": Histogram(self.EXPANDED),
+                }
+            group["searches"] += 1
+            totals = group["totals"]
+            for name in COUNTERS:
+                if name == "peak_open":
+                    totals[name] = max(totals[name], stats.peak_open)
+                else:
+                    totals[name] += getattr(stats, name)
+            group["wall_ms"].add(stats.wall_ms)
+            group["expanded"].add(stats.expanded)
+
+    def summary(self):
+        """
+        Per algorithm: searches, totals of every counter (the largest
+        peak_open rather than a sum), and both histograms, as plain dicts.
+        """
+        with self._lock:
+            return {
+                algorithm: {
+                    "searches": group["searches"],
+                    "totals": dict(group["totals"]),
+                    "wall_ms": group["wall_ms"].as_dict(),
+                    "expanded": group["expanded"].as_dict(),
+                }
+                for algorithm, group in self._groups.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
@@ -0,0 +1,162 @@
+"""
+Searches that run a slice at a time, or in a worker thread.
+
+A Search wraps one of the search generators (see a_star_steps()) so a
+caller can advance it by a number of expansions or for a time budget, and
+pick it up again later. A BackgroundSearch runs one in a worker thread, and
+stops between slices once its CancelToken is set.
+
+Usage:
+    search = Search(grid, (0, 0), (49, 49), "Octile Dist")
+    while not search.done:
+        search.run(deadline_ms=4)  # One frame's worth
+        ...  # Draw, handle input
+
+    job = BackgroundSearch(search, on_done=print).start()
+    job.cancel()
+"""
+
+from threading import Event, Thread
+from time import perf_counter
+
+from .search import solve_steps
+
+SLICE = 256  # Expansions between deadline and cancel checks
+
+
+class Search:
+    """
+    A resumable search, with the same arguments as solve().
+
+    result is None until the search finishes, then its SearchResult. The
+    result's ms is wall time from the first step to the last, pauses
+    included.
+
+    on_finish(result) is called once when the search finishes, not when it
+    is cancelled.
+    """
+
+    def __init__(
+        self,
+        grid,
+        start,
+        dest,
+        method="Manhattan",
+        dynamic_weight=False,
+        algorithm="A*",
+        on_finish=None,
+        **kwargs,
+    ):
+        self._steps = solve_steps(
+            grid, start, dest, method, dynamic_weight, algorithm, **kwargs
+        )
+        self.on_finish = on_finish
+        self.result = None
+        self.cancelled = False
+        self.expansions = 0  # Steps taken so far
+        self.context = None  # Search arrays of the last step
+        self.current = None  # Cell id expanded in the last step
+
+    @property
+    def done(self):
+        return self.result is not None or self.cancelled
+
+    def step(self, max_expansions=1):
+        """
+        Runs up to max_expansions expansions.
+        Returns the SearchResult once the search is over, None until then.
+        """
+        if self.done:
+            return self.result
+        steps = self._steps
+        taken = 0
+        try:
+            while taken < max_expansions:
+                context, current = next(steps)
+                taken += 1
+        except StopIteration as finished:
+            self.result = finished.value
+        else:
+            if taken:
+                self.context = context
+                self.current = current
+        self.expansions += taken
+        if self.result is not None and self.on_finish is not None:
+            self.on_finish(self.result)
+        return self.result
+
+    def run(self, deadline_ms=None):
+        """
+        Runs until the search is over, or until deadline_ms have passed.
+        Returns the SearchResult once the search is over, None until then.
+        """
+        if deadline_ms is None:
+            while not self.done:
+                self.step(SLICE)
+            return self.result
+        deadline = perf_counter() + deadline_ms / 1000
+        while not self.done and perf_counter() < deadline:
+            self.step(SLICE)
+        return self.result
+
+    def cancel(self):
+        """Stops the search for good, and gives its arrays back"""
+        if self.done:
+            return
+        self.cancelled = True
+        self._steps.close()
+
+
+class CancelToken:
+    """Set from any thread to stop the searches that watch it"""
+
+    def __init__(self):
+        self._event = Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class BackgroundSearch:
+    """
+    Runs a Search in a daemon worker thread.
+
+    on_done(result) is called from the worker thread when it stops, with
+    None if the search was cancelled. Several jobs can share one token to
+    be cancelled together.
+    """
+
+    def __init__(self, search, on_done=None, token=None):
+        self.search = search
+        self.on_done = on_done
+        self.token = token if token is not None else CancelToken()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        search = self.search
+        token = self.token
+        while not search.done:
+            if token.cancelled:
+                search.cancel()
+                break
+            search.step(SLICE)
+        if self.on_done is not None:
+            self.on_done(search.result)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
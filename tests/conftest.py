@@ -0,0 +1,22 @@
+import pytest
+
+from pathfinder import Grid
+from pathfinder.grid import WALL
+
+
+@pytest.fixture
+def random_grid():
+    """
+    make(rnd, width, height, walls) gives a Grid whose cells are each a
+    wall with odds walls, and the list of its free cells
+    """
+
+    def make(rnd, width, height, walls):
+        grid = Grid(width, height)
+        for i in range(width * height):
+            if rnd.random() < walls:
+                grid.cells[i] = WALL
+        free = [grid.coords(i) for i in range(width * height) if grid.cells[i] != WALL]
+        return grid, free
+
+    return make
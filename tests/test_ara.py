@@ -0,0 +1,24 @@
+from pathfinder import Grid, add_hook, remove_hook
+from pathfinder.ara import ara_star
+from pathfinder.search import TOO_LONG
+
+
+def test_deadline_before_any_path():
+    grid = Grid(300, 300)
+    seen = []
+    add_hook(seen.append)
+    try:
+        result = ara_star(grid, (0, 0), (299, 299), "Dijkstra", deadline_ms=0)
+    finally:
+        remove_hook(seen.append)
+    assert result.reason == TOO_LONG
+    assert result.stats.algorithm == "ARA*"
+    assert result.stats.method == "Dijkstra"
+    assert result.stats.wall_ms > 0
+    assert seen == [result.stats]
+
+
+def test_finds_optimal_path():
+    result = ara_star(["O..", ".#.", "..X"], (0, 0), (2, 2), optimality_bound=3)
+    assert result.found
+    assert result.stats.extra["bound"] == 1.0
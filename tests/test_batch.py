@@ -0,0 +1,21 @@
+from pathfinder import ComponentIndex, Grid, add_hook, remove_hook
+from pathfinder.batch import solve_many
+
+ROWS = ["..#..", "..#..", "..#.."]
+
+
+def test_rejected_pairs_are_published():
+    grid = Grid.from_rows(ROWS)
+    pairs = [((0, 0), (4, 2)), ((0, 0), (1, 2))]
+    seen = []
+    add_hook(seen.append)
+    try:
+        results = solve_many(grid, pairs, workers=1, components=ComponentIndex(grid))
+    finally:
+        remove_hook(seen.append)
+    assert not results[0].found
+    assert results[0].stats.extra["rejected"]
+    assert results[1].found
+    assert len(seen) == 2
+    assert seen[0] is results[0].stats
+    assert seen[0].method == "Manhattan"
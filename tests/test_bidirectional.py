@@ -0,0 +1,26 @@
+import random
+
+from pathfinder import Grid, a_star
+from pathfinder.bidirectional import bidirectional_search
+
+
+def test_wall_endpoints():
+    grid = Grid.from_rows(["....", ".#..", "...."])
+    assert not bidirectional_search(grid, (0, 0), (1, 1)).found
+    assert not bidirectional_search(grid, (1, 1), (3, 2)).found
+    assert not bidirectional_search(grid, (1, 1), (1, 1)).found
+
+
+def test_matches_a_star(random_grid):
+    rnd = random.Random(2)
+    for _ in range(30):
+        width, height = rnd.randint(2, 25), rnd.randint(2, 25)
+        grid, free = random_grid(rnd, width, height, 0.3)
+        if len(free) < 2:
+            continue
+        start, dest = rnd.sample(free, 2)
+        expected = a_star(grid, start, dest, "Octile Dist")
+        result = bidirectional_search(grid, start, dest, "Octile Dist")
+        assert result.found == expected.found
+        if expected.found:
+            assert abs(result.length - expected.length) < 1e-3
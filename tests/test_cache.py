@@ -0,0 +1,69 @@
+from pathfinder import Grid, PathCache, add_hook, remove_hook
+
+ROWS = ["..#..", "..#..", "..#.."]
+
+
+def test_rejections_are_published():
+    cache = PathCache(Grid.from_rows(ROWS))
+    seen = []
+    add_hook(seen.append)
+    try:
+        result = cache.find_path((0, 0), (4, 2), "Octile Dist")
+    finally:
+        remove_hook(seen.append)
+    assert not result.found
+    assert cache.rejections == 1
+    assert seen == [result.stats]
+    assert result.stats.extra["rejected"]
+    assert result.stats.method == "Octile Dist"
+
+
+def test_unreported_edits_drop_everything():
+    grid = Grid(6, 3)
+    cache = PathCache(grid)
+    first = cache.find_path((0, 1), (5, 1), "Octile Dist")
+    assert len(cache) == 1
+    x, y = first.path[2]
+    grid.set(x, y, "#")  # Never reported
+    grid.set(0, 0, "#")
+    cache.cell_changed(0, 0)
+    assert len(cache) == 0
+    assert cache.invalidations == 1
+    assert (x, y) not in cache.find_path((0, 1), (5, 1), "Octile Dist").path
+
+
+def test_wall_on_a_path_drops_only_that_entry():
+    grid = Grid(8, 8)
+    cache = PathCache(grid)
+    top = cache.find_path((0, 0), (7, 0), "Octile Dist")
+    bottom = cache.find_path((0, 7), (7, 7), "Octile Dist")
+    x, y = top.path[3]
+    grid.set(x, y, "#")
+    cache.cell_changed(x, y)
+    assert cache.invalidations == 1
+    assert cache.lookup((0, 7), (7, 7), "Octile Dist") is bottom
+    assert cache.lookup((0, 0), (7, 0), "Octile Dist") is None
+
+
+def test_removed_wall_drops_entries_that_explored_it():
+    grid = Grid.from_rows(
+        ["............", "............", "###########.", "............"]
+    )
+    cache = PathCache(grid)
+    cache.find_path((8, 0), (11, 0), "Octile Dist")
+    cache.find_path((0, 3), (0, 0), "Octile Dist")
+    grid.set(0, 2, ".")
+    cache.cell_changed(0, 2)
+    assert cache.lookup((8, 0), (11, 0), "Octile Dist") is not None
+    assert cache.lookup((0, 3), (0, 0), "Octile Dist") is None
+    assert cache.find_path((0, 3), (0, 0), "Octile Dist").length == 3
+
+
+def test_rejects_walled_off_queries_after_edits():
+    grid = Grid.from_rows(ROWS)
+    cache = PathCache(grid)
+    assert not cache.find_path((0, 0), (4, 0), "Octile Dist").found
+    grid.set(2, 1, ".")
+    cache.cell_changed(2, 1)
+    assert cache.find_path((0, 0), (4, 0), "Octile Dist").found
+    assert cache.rejections == 1
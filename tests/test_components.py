@@ -0,0 +1,54 @@
+import random
+
+from pathfinder import ComponentIndex, Grid, a_star
+
+
+def test_removed_wall_merges():
+    grid = Grid.from_rows(["..#..", "..#..", "..#.."])
+    index = ComponentIndex(grid)
+    assert index.count() == 2
+    assert not index.connected((0, 0), (4, 2))
+    grid.set(2, 1, ".")
+    index.cell_changed(2, 1)
+    assert index.count() == 1
+    assert index.connected((0, 0), (4, 2))
+    assert index.size(0, 0) == 13
+
+
+def test_added_wall_splits():
+    grid = Grid.from_rows(["..#..", ".....", "..#.."])
+    index = ComponentIndex(grid)
+    assert index.count() == 1
+    grid.set(2, 1, "#")
+    index.cell_changed(2, 1)
+    assert index.count() == 2
+    assert not index.connected((0, 0), (4, 2))
+    assert index.size(4, 2) == 6
+    assert index.component(2, 1) is None
+
+
+def test_added_wall_around_a_corner_keeps_one():
+    # The cells around the new wall still meet diagonally past it
+    grid = Grid.from_rows(["...", "...", "..."])
+    index = ComponentIndex(grid)
+    grid.set(1, 1, "#")
+    index.cell_changed(1, 1)
+    assert index.count() == 1
+
+
+def test_edits_match_a_star(random_grid):
+    rnd = random.Random(5)
+    grid, _ = random_grid(rnd, 12, 12, 0.35)
+    index = ComponentIndex(grid)
+    for _ in range(200):
+        x, y = rnd.randrange(12), rnd.randrange(12)
+        grid.set(x, y, "." if grid.is_wall(x, y) else "#")
+        index.cell_changed(x, y)
+        assert index.version == grid.version  # Updated, not rebuilt
+        assert index.count() == ComponentIndex(grid).count()
+        free = [grid.coords(i) for i in range(144) if grid.cells[i] != 1]
+        if len(free) < 2:
+            continue
+        start, dest = rnd.sample(free, 2)
+        expected = a_star(grid, start, dest, "Octile Dist").found
+        assert index.connected(start, dest) == expected
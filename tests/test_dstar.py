@@ -0,0 +1,56 @@
+import random
+
+from pathfinder import Grid, a_star
+from pathfinder.dstar import DStarLite
+
+
+def test_replans_match_a_star(random_grid):
+    rnd = random.Random(3)
+    for _ in range(20):
+        width, height = rnd.randint(2, 20), rnd.randint(2, 20)
+        grid, free = random_grid(rnd, width, height, 0.25)
+        if len(free) < 2:
+            continue
+        start, dest = rnd.sample(free, 2)
+        planner = DStarLite(grid, start, dest)
+        for _ in range(10):
+            expected = a_star(grid, start, dest, "Octile Dist")
+            result = planner.find_path(start)
+            assert result.found == expected.found
+            if not result.found:
+                break
+            assert abs(result.length - expected.length) < 1e-3
+            if len(result.path) > 2:
+                start = result.path[1]
+            x, y = rnd.randrange(width), rnd.randrange(height)
+            if (x, y) not in (start, dest):
+                grid.set(x, y, rnd.choice("#."))
+                planner.cell_changed(x, y)
+
+
+def test_wall_on_path_repairs_locally(random_grid):
+    grid, _ = random_grid(random.Random(4), 60, 60, 0.2)
+    grid.set(0, 0, ".")
+    grid.set(59, 59, ".")
+    planner = DStarLite(grid, (0, 0), (59, 59))
+    first = planner.find_path()
+    x, y = first.path[len(first.path) // 2]
+    grid.set(x, y, "#")
+    planner.cell_changed(x, y)
+    result = planner.find_path()
+    fresh = DStarLite(grid, (0, 0), (59, 59)).find_path()
+    assert (x, y) not in result.path
+    assert abs(result.length - fresh.length) < 1e-3
+    assert result.cycles < fresh.cycles
+
+
+def test_walk_that_gets_stuck_finds_nothing():
+    grid = Grid(5, 5)
+    planner = DStarLite(grid, (2, 2), (4, 4))
+    assert planner.find_path().found
+    # Wall the start in without reporting it, so the walk has nowhere to go
+    for x, y in ((1, 1), (2, 1), (3, 1), (1, 2), (3, 2), (1, 3), (2, 3), (3, 3)):
+        grid.set(x, y, "#")
+    result = planner.find_path()
+    assert not result.found
+    assert result.path is None
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from pathfinder import Graph, a_star
+
+
+def edge_sets(graph):
+    return [sorted(graph.edges(node)) for node in range(graph.size)]
+
+
+def test_cell_changed_matches_a_rebuild(random_grid):
+    rnd = random.Random(6)
+    grid, _ = random_grid(rnd, 10, 8, 0.3)
+    graph = Graph.from_grid(grid)
+    for _ in range(100):
+        x, y = rnd.randrange(10), rnd.randrange(8)
+        grid.set(x, y, "." if grid.is_wall(x, y) else "#")
+        graph.cell_changed(x, y)
+        assert edge_sets(graph) == edge_sets(Graph.from_grid(grid))
+    assert graph.version == grid.version
+
+
+def test_searches_match_grid_searches(random_grid):
+    rnd = random.Random(7)
+    grid, free = random_grid(rnd, 20, 20, 0.3)
+    graph = Graph.from_grid(grid)
+    for _ in range(20):
+        start, dest = rnd.sample(free, 2)
+        expected = a_star(grid, start, dest, "Octile Dist")
+        result = a_star(graph, start, dest, "Octile Dist")
+        assert result.found == expected.found
+        if expected.found:
+            assert result.length == pytest.approx(expected.length, abs=1e-3)
+
+
+def test_edge_graph():
+    roads = Graph.from_edges(3, [(0, 1, 2.5), (1, 2, 1.0)], directed=False)
+    result = a_star(roads, 0, 2, "Dijkstra")
+    assert result.path == [0, 1, 2]
+    assert result.length == 3.5
+    with pytest.raises(ValueError):
+        a_star(roads, 0, 2, "Octile Dist")  # No coordinates
@@ -0,0 +1,47 @@
+import pytest
+
+from pathfinder import Grid, a_star
+from pathfinder.gridfile import BITS, RAW, RLE, decode, encode, load, save
+
+ROWS = ["O..#....", "..##..#.", "......#X"]
+
+
+@pytest.mark.parametrize("encoding", [RAW, RLE])
+def test_round_trip(encoding):
+    grid = Grid.from_rows(ROWS)
+    assert decode(encode(grid, encoding)).rows() == grid.rows()
+
+
+def test_bits_keep_walls_start_and_dest():
+    grid = Grid.from_rows(ROWS)
+    grid.set(1, 1, "@")
+    loaded = decode(encode(grid, BITS))
+    grid.set(1, 1, ".")
+    assert loaded.rows() == grid.rows()
+
+
+@pytest.mark.parametrize("memory_map", [True, False])
+def test_load_raw(tmp_path, memory_map):
+    grid = Grid.from_rows(ROWS)
+    path = tmp_path / "arena.grid"
+    save(grid, path, RAW)
+    loaded = load(path, memory_map)
+    assert isinstance(loaded.cells, memoryview) == memory_map
+    assert loaded.rows() == grid.rows()
+    assert a_star(loaded, (0, 0), (7, 2), "Octile Dist").found
+
+
+def test_mapped_edits_never_reach_the_file(tmp_path):
+    path = tmp_path / "arena.grid"
+    save(Grid.from_rows(ROWS), path, RAW)
+    loaded = load(path)
+    loaded.set(1, 0, "#")
+    assert loaded.get(1, 0) == "#"
+    assert load(path).get(1, 0) == "."
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / "arena.grid"
+    path.write_bytes(encode(Grid.from_rows(ROWS), RAW)[:-3])
+    with pytest.raises(ValueError):
+        load(path)
@@ -0,0 +1,24 @@
+from pathfinder import Grid, a_star
+from pathfinder.heuristics import FIELDS, get_heuristic
+
+
+def test_searches_build_no_field():
+    FIELDS.clear()
+    grid = Grid(200, 200)
+    result = a_star(grid, (5, 5), (8, 9), "Octile Dist")
+    assert result.found
+    assert FIELDS.peek(get_heuristic("Octile Dist"), 200, 200, (8, 9)) is None
+
+
+def test_cached_field_gives_the_same_path():
+    FIELDS.clear()
+    grid = Grid.from_rows(["......", ".####.", "......"])
+    octile = get_heuristic("Octile Dist")
+    lookup = octile.lookup(6, 3, (5, 2))
+    expected = a_star(grid, (0, 0), (5, 2), octile)
+    field = octile.field(6, 3, (5, 2))
+    assert octile.lookup(6, 3, (5, 2)) is field
+    assert [round(lookup[i], 5) for i in range(18)] == [
+        round(h, 5) for h in field.tolist()
+    ]
+    assert a_star(grid, (0, 0), (5, 2), octile).path == expected.path
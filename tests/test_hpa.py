@@ -0,0 +1,39 @@
+import random
+
+from pathfinder import Grid, a_star
+from pathfinder.hpa import HierarchicalMap
+
+
+def test_diagonal_border_crossing():
+    # The only way from the first cluster to the second is (4, 0) -> (5, 1)
+    grid = Grid.from_rows([".#...#", "##..#.", "#...##"])
+    result = HierarchicalMap(grid, cluster_size=5).find_path((3, 0), (5, 1))
+    assert result.found
+    assert result.length == a_star(grid, (3, 0), (5, 1), "Octile Dist").length
+
+
+def test_diagonal_corner_crossing():
+    # Clusters (0, 0) and (1, 1) only touch at the corner (1, 1) -> (2, 2)
+    grid = Grid.from_rows(["..#.", "..#.", "##..", "...."])
+    result = HierarchicalMap(grid, cluster_size=2).find_path((0, 0), (3, 3))
+    assert result.found
+    assert (1, 1) in result.path and (2, 2) in result.path
+
+
+def test_finds_what_a_star_finds(random_grid):
+    rnd = random.Random(1)
+    for _ in range(30):
+        width, height = rnd.randint(4, 30), rnd.randint(4, 30)
+        grid, free = random_grid(rnd, width, height, 0.3)
+        hierarchy = HierarchicalMap(grid, cluster_size=rnd.choice((2, 3, 5)))
+        for _ in range(10):
+            start, dest = rnd.sample(free, 2)
+            expected = a_star(grid, start, dest, "Octile Dist")
+            assert hierarchy.find_path(start, dest).found == expected.found
+
+
+def test_wall_endpoints():
+    grid = Grid.from_rows(["....", ".#..", "...."])
+    hierarchy = HierarchicalMap(grid, cluster_size=2)
+    assert not hierarchy.find_path((0, 0), (1, 1)).found
+    assert not hierarchy.find_path((1, 1), (3, 2)).found
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from pathfinder import a_star
+from pathfinder.pathdb import PathDatabase
+
+
+@pytest.mark.parametrize("ordering", ["dfs", "row"])
+def test_every_pair_matches_a_star(random_grid, ordering):
+    rnd = random.Random(8)
+    grid, free = random_grid(rnd, 9, 7, 0.3)
+    database = PathDatabase.build(grid, ordering)
+    for start in free:
+        for dest in free:
+            expected = a_star(grid, start, dest, "Octile Dist")
+            result = database.path(start, dest)
+            assert result.found == expected.found
+            if expected.found:
+                assert result.length == pytest.approx(expected.length, abs=1e-3)
+                assert result.path[0] == start and result.path[-1] == dest
+
+
+def test_saved_and_loaded(random_grid, tmp_path):
+    grid, free = random_grid(random.Random(9), 16, 12, 0.25)
+    database = PathDatabase.build(grid)
+    database.save(tmp_path / "arena.pdb")
+    loaded = PathDatabase.load(tmp_path / "arena.pdb", grid)
+    assert loaded.nbytes == database.nbytes
+    for start, dest in zip(free, reversed(free)):
+        assert loaded.path(start, dest).path == database.path(start, dest).path
+
+
+def test_stale_walls(random_grid, tmp_path):
+    grid, free = random_grid(random.Random(10), 8, 8, 0.2)
+    database = PathDatabase.build(grid)
+    database.save(tmp_path / "arena.pdb")
+    x, y = free[0]
+    grid.set(x, y, "#")
+    assert not database.current
+    with pytest.raises(ValueError):
+        database.path(free[1], free[2])
+    with pytest.raises(ValueError):
+        PathDatabase.load(tmp_path / "arena.pdb", grid)
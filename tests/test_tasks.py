@@ -0,0 +1,23 @@
+from pathfinder.tasks import Search
+
+ROWS = ["O....", ".###.", "....X"]
+
+
+def test_step_zero():
+    search = Search(ROWS, (0, 0), (4, 2), "Octile Dist")
+    assert search.step(0) is None
+    assert search.expansions == 0
+    assert search.context is None and search.current is None
+    search.step(1)
+    assert search.expansions == 1
+    current = search.current
+    assert search.step(0) is None
+    assert search.current == current
+
+
+def test_step_to_the_end():
+    search = Search(ROWS, (0, 0), (4, 2), "Octile Dist")
+    while search.step(3) is None:
+        pass
+    assert search.done
+    assert search.result.path[-1] == (4, 2)